@@ -2,13 +2,19 @@
  * HeartSync LED Controller — Arduino FastLED Version
  *
  * Drives a WS2812B strip of 30 LEDs on pin 6.
- * Receives sync score and heart rate data over Serial from a host
- * (e.g., a Python bridge script that polls the Flask server).
+ * Receives sync score and heart rate data over Serial from the host
+ * bridge (hardware/serial_bridge.py), which forwards the server's LED feed.
  *
- * Serial Protocol (9600 baud):
- *   S0.75\n   — Set sync score (0.00 to 1.00)
- *   HA72\n    — Set Person A heart rate (BPM)
- *   HB74\n    — Set Person B heart rate (BPM)
+ * Serial Protocol (115200 baud, binary, see hardware/serial_protocol.py):
+ *   0xA5 | type | length | payload | CRC-8 (poly 0x07) of type, length, payload
+ *   0x01 SCORE  uint16 LE   sync score in thousandths (0..1000)
+ *   0x02 HR_A   uint16 LE   Person A heart rate in tenths of a BPM
+ *   0x03 HR_B   uint16 LE   Person B heart rate in tenths of a BPM
+ *   0x04 STATE  3x uint16   SCORE, HR_A, HR_B
+ *   0x10 PING   uint16 seq  answered with 0x11 PONG carrying the same seq
+ * Frames with a bad CRC are dropped; the bridge resends the full state
+ * every 2 seconds, so a frame lost (e.g. while FastLED.show() has
+ * interrupts off) is repaired on the next keepalive.
  *
  * Wiring:
  *   - LED Data  -> Pin 6 (through a 330-ohm resistor)
@@ -33,9 +39,27 @@ float syncScore  = 0.0;   // 0.0 to 1.0
 float hrA        = 70.0;  // Person A BPM
 float hrB        = 70.0;  // Person B BPM
 
-// Serial input buffer
-char serialBuf[32];
-int  serialIdx = 0;
+// Serial frame parser
+const uint8_t FRAME_SYNC   = 0xA5;
+const uint8_t FRAME_SCORE  = 0x01;
+const uint8_t FRAME_HR_A   = 0x02;
+const uint8_t FRAME_HR_B   = 0x03;
+const uint8_t FRAME_STATE  = 0x04;
+const uint8_t FRAME_PING   = 0x10;
+const uint8_t FRAME_PONG   = 0x11;
+const uint8_t MAX_PAYLOAD  = 8;
+
+enum ParseState { WAIT_SYNC, READ_TYPE, READ_LENGTH, READ_PAYLOAD, READ_CRC };
+ParseState parseState = WAIT_SYNC;
+uint8_t frameType = 0;
+uint8_t frameLength = 0;
+uint8_t frameIdx = 0;
+uint8_t frameCrc = 0;
+uint8_t framePayload[MAX_PAYLOAD];
+
+// Render at roughly 30 FPS without blocking serial reads
+unsigned long lastFrameTime = 0;
+const unsigned long FRAME_INTERVAL_MS = 33;
 
 // Idle detection: switch to idle animation if no serial data for 5 seconds
 unsigned long lastSerialTime = 0;
@@ -136,37 +160,94 @@ void getSyncColors(CRGB &colorA, CRGB &colorB) {
 // ---------- Serial Parsing ----------
 
 /**
- * Process a complete line received over Serial.
- * Supported commands:
- *   S<float>   — sync score (e.g., "S0.75")
- *   HA<float>  — Person A heart rate (e.g., "HA72")
- *   HB<float>  — Person B heart rate (e.g., "HB74")
+ * CRC-8 (polynomial 0x07, init 0x00), updated one byte at a time.
  */
-void processSerialLine(const char *line) {
+uint8_t crc8Update(uint8_t crc, uint8_t data) {
+    crc ^= data;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+        crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+    return crc;
+}
+
+uint16_t readUint16(const uint8_t *p) {
+    return (uint16_t)p[0] | ((uint16_t)p[1] << 8);
+}
+
+/**
+ * Send a frame back to the host (used for PONG).
+ */
+void sendFrame(uint8_t type, const uint8_t *payload, uint8_t length) {
+    uint8_t crc = crc8Update(crc8Update(0, type), length);
+    Serial.write(FRAME_SYNC);
+    Serial.write(type);
+    Serial.write(length);
+    for (uint8_t i = 0; i < length; i++) {
+        Serial.write(payload[i]);
+        crc = crc8Update(crc, payload[i]);
+    }
+    Serial.write(crc);
+}
+
+/**
+ * Apply a complete frame whose CRC checked out.
+ */
+void processFrame(uint8_t type, const uint8_t *payload, uint8_t length) {
     lastSerialTime = millis();
-    if (line[0] == 'S') {
-        syncScore = constrain(atof(line + 1), 0.0, 1.0);
-    } else if (line[0] == 'H' && line[1] == 'A') {
-        hrA = constrain(atof(line + 2), 0.0, 250.0);
-    } else if (line[0] == 'H' && line[1] == 'B') {
-        hrB = constrain(atof(line + 2), 0.0, 250.0);
+    if (type == FRAME_SCORE && length == 2) {
+        syncScore = constrain(readUint16(payload) / 1000.0, 0.0, 1.0);
+    } else if (type == FRAME_HR_A && length == 2) {
+        hrA = constrain(readUint16(payload) / 10.0, 0.0, 250.0);
+    } else if (type == FRAME_HR_B && length == 2) {
+        hrB = constrain(readUint16(payload) / 10.0, 0.0, 250.0);
+    } else if (type == FRAME_STATE && length == 6) {
+        syncScore = constrain(readUint16(payload) / 1000.0, 0.0, 1.0);
+        hrA = constrain(readUint16(payload + 2) / 10.0, 0.0, 250.0);
+        hrB = constrain(readUint16(payload + 4) / 10.0, 0.0, 250.0);
+    } else if (type == FRAME_PING && length == 2) {
+        sendFrame(FRAME_PONG, payload, length);
     }
 }
 
 /**
- * Read all available Serial data and process complete lines.
+ * Read all available Serial bytes through the frame state machine.
+ * A bad length or CRC drops the frame and waits for the next sync byte.
  */
 void readSerial() {
     while (Serial.available() > 0) {
-        char c = Serial.read();
-        if (c == '\n' || c == '\r') {
-            if (serialIdx > 0) {
-                serialBuf[serialIdx] = '\0';
-                processSerialLine(serialBuf);
-                serialIdx = 0;
-            }
-        } else if (serialIdx < (int)(sizeof(serialBuf) - 1)) {
-            serialBuf[serialIdx++] = c;
+        uint8_t b = Serial.read();
+        switch (parseState) {
+            case WAIT_SYNC:
+                if (b == FRAME_SYNC) parseState = READ_TYPE;
+                break;
+            case READ_TYPE:
+                frameType = b;
+                frameCrc = crc8Update(0, b);
+                parseState = READ_LENGTH;
+                break;
+            case READ_LENGTH:
+                frameLength = b;
+                frameCrc = crc8Update(frameCrc, b);
+                frameIdx = 0;
+                if (b > MAX_PAYLOAD) {
+                    parseState = (b == FRAME_SYNC) ? READ_TYPE : WAIT_SYNC;
+                } else {
+                    parseState = (b == 0) ? READ_CRC : READ_PAYLOAD;
+                }
+                break;
+            case READ_PAYLOAD:
+                framePayload[frameIdx++] = b;
+                frameCrc = crc8Update(frameCrc, b);
+                if (frameIdx >= frameLength) parseState = READ_CRC;
+                break;
+            case READ_CRC:
+                if (b == frameCrc) {
+                    processFrame(frameType, framePayload, frameLength);
+                    parseState = WAIT_SYNC;
+                } else {
+                    parseState = (b == FRAME_SYNC) ? READ_TYPE : WAIT_SYNC;
+                }
+                break;
         }
     }
 }
@@ -238,7 +319,7 @@ void idleAnimation() {
 // ---------- Arduino Entry Points ----------
 
 void setup() {
-    Serial.begin(9600);
+    Serial.begin(115200);
 
     FastLED.addLeds<LED_TYPE, LED_PIN, COLOR_ORDER>(leds, NUM_LEDS)
         .setCorrection(TypicalLEDStrip);
@@ -249,19 +330,20 @@ void setup() {
     FastLED.show();
 
     Serial.println("HeartSync Arduino LED Controller ready");
-    Serial.println("Commands: S<score> HA<bpm> HB<bpm>");
 }
 
 void loop() {
+    // Read every pass: a blocking delay() would let the 64-byte RX buffer overflow
     readSerial();
 
+    unsigned long now = millis();
+    if (now - lastFrameTime < FRAME_INTERVAL_MS) return;
+    lastFrameTime = now;
+
     // Fall back to idle animation if no serial data for 5 seconds
-    if (millis() - lastSerialTime > IDLE_TIMEOUT_MS) {
+    if (now - lastSerialTime > IDLE_TIMEOUT_MS) {
         idleAnimation();
     } else {
         updateLEDs();
     }
-
-    // Run at roughly 30 FPS
-    delay(33);
 }
@@ -7,131 +7,230 @@ Wiring:
 - LED 5V   -> 5V power (Pin 2 or external supply for long strips)
 - LED GND  -> GND (Pin 6)
 
-Install: sudo pip3 install rpi_ws281x adafruit-circuitpython-neopixel
+State is pushed by the server over UDP (server/led_feed.py): the strip
+subscribes to its booth, keeps the latest datagram and renders from it at
+its own frame rate, so it never polls the server.
+
+Install: sudo pip3 install rpi_ws281x adafruit-circuitpython-neopixel numpy
 Run with sudo: sudo python3 led_controller.py
+Headless benchmark (no strip needed): python3 led_controller.py --bench [lengths]
+(the strip fps column needs adafruit_pixelbuf, installed with the neopixel library)
 """
 
 import time
-import math
-import requests
-import board
-import neopixel
+import socket
+import struct
+import sys
+
+from led_renderer import COLORS, FakePixelSink, LedRenderer, NeoPixelSink, heartbeat_pulse, lerp_color
 
 # Configuration
 LED_COUNT = 30         # Number of LEDs on your strip
-LED_PIN = board.D18    # GPIO pin
+LED_PIN = "D18"        # GPIO pin (board attribute)
 BRIGHTNESS = 0.5       # 0.0 to 1.0
-SERVER_URL = "http://localhost:5000/api/state"
-
-# Initialize strip
-pixels = neopixel.NeoPixel(
-    LED_PIN, LED_COUNT,
-    brightness=BRIGHTNESS,
-    auto_write=False  # We'll call show() manually for performance
-)
-
-# Color palettes for each sync level
-COLORS = {
-    "disconnected": {
-        "a": (30, 60, 200),    # Cool blue
-        "b": (200, 40, 40),    # Warm red
-    },
-    "warming_up": {
-        "a": (100, 50, 180),   # Purple-blue
-        "b": (180, 50, 100),   # Purple-red
-    },
-    "connecting": {
-        "a": (170, 50, 130),   # Magenta
-        "b": (170, 50, 130),   # Same - blending
-    },
-    "deeply_connected": {
-        "a": (220, 40, 80),    # Warm rose
-        "b": (220, 40, 80),    # Unified
-    },
-}
-
-
-def lerp_color(c1, c2, t):
-    """Linear interpolation between two RGB colors."""
-    return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
-
-
-def heartbeat_pulse(t, bpm):
-    """
-    Generate a heartbeat-like brightness curve.
-    Returns 0.0 to 1.0.
-    """
-    if bpm <= 0:
-        return 0.5
-    period = 60.0 / bpm
-    phase = (t % period) / period
-    # Double-bump heartbeat shape
-    if phase < 0.15:
-        return 0.4 + 0.6 * math.sin(phase / 0.15 * math.pi)
-    elif phase < 0.35:
-        return 0.4 + 0.4 * math.sin((phase - 0.15) / 0.2 * math.pi)
-    else:
-        return 0.3 + 0.1 * math.sin((phase - 0.35) / 0.65 * math.pi)
+SESSION_ID = "default"  # Booth this strip belongs to
+SERVER_ADDRESS = ("localhost", 5005)  # Server host and LED_FEED_PORT
+FRAME_INTERVAL = 0.033  # ~30fps
+SUBSCRIBE_EVERY = 5.0   # Seconds between subscription keepalives
+STALE_AFTER = 3.0       # Seconds without a datagram before the idle animation
+
+# LED feed datagram, see server/led_feed.py
+PACKET = struct.Struct("<2sBHfBff")
+LEVELS = ("disconnected", "warming_up", "connecting", "deeply_connected")
+
+# Strip, renderer and sink are created in main() (board/neopixel need the Pi)
+pixels = None
+renderer = None
+sink = None
 
 
 def update_leds(state):
     """Update LED strip based on current state."""
+    sink.write(renderer.render(state, time.time()))
+
+
+def decode_state(data):
+    """LED feed datagram -> (seq, state dict in the shape update_leds expects), or None."""
+    if len(data) != PACKET.size:
+        return None
+    magic, version, seq, score, level, hr_a, hr_b = PACKET.unpack(data)
+    if magic != b"HS" or version != 1:
+        return None
+    state = {
+        "sync": {"score": score, "level": LEVELS[level] if level < len(LEVELS) else LEVELS[0]},
+        "person_a": {"heart_rate": hr_a},
+        "person_b": {"heart_rate": hr_b},
+    }
+    return seq, state
+
+
+def show_idle():
+    """Idle animation while there is no live state (server down or booth inactive)."""
+    sink.write(renderer.render_idle(time.time()))
+
+
+class FeedClient:
+    """Subscription to the server's UDP LED feed, keeping the newest state."""
+
+    def __init__(self, session_id=SESSION_ID, address=SERVER_ADDRESS):
+        self.address = address
+        self.subscribe = b"HSUB" + session_id.encode("utf-8")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.state, self.last_seq = None, None
+        self.received_at = self.next_subscribe = 0.0
+
+    def poll(self, now):
+        """Renew the subscription when due and drain pending datagrams; True if the state changed."""
+        if now >= self.next_subscribe:
+            try:
+                self.sock.sendto(self.subscribe, self.address)
+            except OSError as e:
+                print(f"LED feed subscribe error: {e}")
+            self.next_subscribe = now + SUBSCRIBE_EVERY
+
+        changed = False
+        while True:
+            try:
+                data = self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break  # e.g. ICMP port unreachable while the server is down
+            decoded = decode_state(data)
+            if decoded is None:
+                continue
+            seq, new_state = decoded
+            if self.last_seq is not None and 0 < (self.last_seq - seq) % 65536 < 32768:
+                continue  # Older than what we have
+            self.state, self.last_seq, self.received_at = new_state, seq, now
+            changed = True
+        return changed
+
+    def live_state(self, now):
+        """Newest state, or None if nothing arrived for STALE_AFTER seconds."""
+        if self.state is not None and now - self.received_at < STALE_AFTER:
+            return self.state
+        return None
+
+
+def main():
+    """Main loop: keep the latest pushed state and render it every frame."""
+    global pixels, renderer, sink
+    import board
+    import neopixel
+
+    pixels = neopixel.NeoPixel(
+        getattr(board, LED_PIN), LED_COUNT,
+        brightness=BRIGHTNESS,
+        auto_write=False  # NeoPixelSink shows each whole frame at once
+    )
+    renderer = LedRenderer(LED_COUNT)
+    sink = NeoPixelSink(pixels)
+    print("HeartSync LED Controller started")
+
+    feed = FeedClient()
+    while True:
+        now = time.monotonic()
+        feed.poll(now)
+        state = feed.live_state(now)
+        try:
+            if state is not None:
+                update_leds(state)
+            else:
+                show_idle()
+        except Exception as e:
+            print(f"LED error: {e}")
+
+        time.sleep(max(0.0, FRAME_INTERVAL - (time.monotonic() - now)))
+
+
+def render_per_pixel(state, t, out):
+    """The original per-pixel render loop (benchmark baseline)."""
     sync = state.get("sync", {})
     score = sync.get("score", 0)
     level = sync.get("level", "disconnected")
     hr_a = state.get("person_a", {}).get("heart_rate", 70)
     hr_b = state.get("person_b", {}).get("heart_rate", 70)
-
     colors = COLORS.get(level, COLORS["disconnected"])
-    t = time.time()
-
-    # Compute heartbeat brightness
     pulse_a = heartbeat_pulse(t, hr_a)
     pulse_b = heartbeat_pulse(t, hr_b)
-
-    # At high sync, use averaged pulse; at low sync, use individual
     avg_pulse = (pulse_a + pulse_b) / 2
-    blend = score  # 0 = fully separate, 1 = fully unified
-
-    half = LED_COUNT // 2
-
-    for i in range(LED_COUNT):
+    blend = score
+    half = len(out) // 2
+    for i in range(len(out)):
         if i < half:
-            # Person A's side
             pulse = pulse_a * (1 - blend) + avg_pulse * blend
             color = lerp_color(colors["a"], colors["b"], blend)
         else:
-            # Person B's side
             pulse = pulse_b * (1 - blend) + avg_pulse * blend
             color = lerp_color(colors["b"], colors["a"], blend)
+        out[i] = tuple(int(c * pulse) for c in color)
 
-        # Apply pulse brightness
-        pixels[i] = tuple(int(c * pulse) for c in color)
 
-    pixels.show()
+def bench_strip(count):
+    """
+    A strip running the real adafruit_pixelbuf write path (NeoPixelSink's
+    slice assignment, byte order, brightness) minus the GPIO transmit, or
+    None if the library is not installed.
+    """
+    try:
+        import adafruit_pixelbuf
+    except ImportError:
+        return None
 
+    class BenchStrip(adafruit_pixelbuf.PixelBuf):
+        def _transmit(self, buffer):
+            pass
 
-def main():
-    """Main loop: poll server state and update LEDs."""
-    print("HeartSync LED Controller started")
+    return BenchStrip(count, byteorder="GRB", brightness=BRIGHTNESS)
 
-    while True:
-        try:
-            resp = requests.get(SERVER_URL, timeout=1)
-            state = resp.json()
-            update_leds(state)
-        except requests.exceptions.ConnectionError:
-            # Server not ready yet - show idle animation
-            for i in range(LED_COUNT):
-                t = time.time()
-                brightness = 0.3 + 0.2 * math.sin(t * 2 + i * 0.3)
-                pixels[i] = (int(50 * brightness), int(10 * brightness), int(30 * brightness))
-            pixels.show()
-        except Exception as e:
-            print(f"LED error: {e}")
 
-        time.sleep(0.033)  # ~30fps
+def bench(lengths, seconds=1.0):
+    """
+    Frames per second: per-pixel loop vs vectorized renderer into a fake
+    sink, then the vectorized renderer through NeoPixelSink into
+    adafruit_pixelbuf (strip fps), against the most a WS2812 strip can
+    show (800 kbit/s, 24 bits per LED).
+    """
+    state = {
+        "sync": {"score": 0.62, "level": "connecting"},
+        "person_a": {"heart_rate": 74.0},
+        "person_b": {"heart_rate": 81.0},
+    }
+    print(f"{'LEDs':>6} {'per-pixel fps':>14} {'vectorized fps':>15} {'speedup':>8}"
+          f" {'strip fps':>10} {'wire max fps':>13}")
+    for count in lengths:
+        fake = [(0, 0, 0)] * count
+        frames, started = 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            render_per_pixel(state, time.time(), fake)
+            bytes(bytearray(c for p in fake for c in p))  # The strip's byte copy
+            frames += 1
+        loop_fps = frames / (time.perf_counter() - started)
+
+        fast, fake_sink = LedRenderer(count), FakePixelSink()
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            fake_sink.write(fast.render(state, time.time()))
+        fast_fps = fake_sink.frames / (time.perf_counter() - started)
+
+        strip = bench_strip(count)
+        strip_fps = "-"
+        if strip is not None:
+            sink, frames, started = NeoPixelSink(strip), 0, time.perf_counter()
+            while time.perf_counter() - started < seconds:
+                sink.write(fast.render(state, time.time()))
+                frames += 1
+            strip_fps = f"{frames / (time.perf_counter() - started):.0f}"
+        wire_fps = 800000 / (24 * count)
+        print(f"{count:>6} {loop_fps:>14.0f} {fast_fps:>15.0f} {fast_fps / loop_fps:>7.1f}x"
+              f" {strip_fps:>10} {wire_fps:>13.0f}")
 
 
 if __name__ == "__main__":
-    main()
+    if "--bench" in sys.argv:
+        args = [a for a in sys.argv[1:] if a != "--bench"]
+        bench([int(a) for a in args] or [30, 300, 1500, 3000])
+    else:
+        main()
@@ -0,0 +1,154 @@
+"""
+Vectorized LED frame renderer for HeartSync.
+
+Renders a whole strip per frame as one NumPy (N, 3) uint8 buffer instead
+of a Python loop over pixels: the heartbeat curve is sampled from a
+precomputed table (HEARTBEAT_TABLE) rather than evaluated with math.sin,
+and the buffer goes to the strip in one slice assignment (NeoPixelSink).
+
+No GPIO imports here, so the renderer also runs headless with a
+FakePixelSink (see `led_controller.py --bench`).
+"""
+
+import math
+
+import numpy as np
+
+# Color palettes for each sync level
+COLORS = {
+    "disconnected": {
+        "a": (30, 60, 200),    # Cool blue
+        "b": (200, 40, 40),    # Warm red
+    },
+    "warming_up": {
+        "a": (100, 50, 180),   # Purple-blue
+        "b": (180, 50, 100),   # Purple-red
+    },
+    "connecting": {
+        "a": (170, 50, 130),   # Magenta
+        "b": (170, 50, 130),   # Same - blending
+    },
+    "deeply_connected": {
+        "a": (220, 40, 80),    # Warm rose
+        "b": (220, 40, 80),    # Unified
+    },
+}
+
+TABLE_SIZE = 4096
+
+
+def lerp_color(c1, c2, t):
+    """Linear interpolation between two RGB colors."""
+    return tuple(int(c1[i] + (c2[i] - c1[i]) * t) for i in range(3))
+
+
+def heartbeat_pulse(t, bpm):
+    """
+    Generate a heartbeat-like brightness curve.
+    Returns 0.0 to 1.0.
+    """
+    if bpm <= 0:
+        return 0.5
+    period = 60.0 / bpm
+    phase = (t % period) / period
+    # Double-bump heartbeat shape
+    if phase < 0.15:
+        return 0.4 + 0.6 * math.sin(phase / 0.15 * math.pi)
+    elif phase < 0.35:
+        return 0.4 + 0.4 * math.sin((phase - 0.15) / 0.2 * math.pi)
+    else:
+        return 0.3 + 0.1 * math.sin((phase - 0.35) / 0.65 * math.pi)
+
+
+# heartbeat_pulse over one beat, sampled at TABLE_SIZE phases
+HEARTBEAT_TABLE = np.array([heartbeat_pulse(i / TABLE_SIZE, 60.0) for i in range(TABLE_SIZE)])
+
+
+def table_pulse(t, bpm):
+    """heartbeat_pulse(t, bpm) looked up in HEARTBEAT_TABLE."""
+    if bpm <= 0:
+        return 0.5
+    phase = (t * bpm / 60.0) % 1.0
+    return HEARTBEAT_TABLE[int(phase * TABLE_SIZE) % TABLE_SIZE]
+
+
+class LedRenderer:
+    """Renders HeartSync states into an (N, 3) uint8 frame buffer."""
+
+    def __init__(self, count):
+        self.count = count
+        self.half = count // 2
+        self.frame = np.zeros((count, 3), dtype=np.uint8)
+        self.rows = np.zeros((2, 3))
+        # Row 0 (person A) for the first half of the strip, row 1 (B) for the rest
+        self.side = (np.arange(count) >= self.half).astype(np.intp)
+        self.phase = np.arange(count) * 0.3  # Idle animation offsets
+
+    def render(self, state, t):
+        """Frame for `state` at wall time t (same picture as the per-pixel loop)."""
+        sync = state.get("sync", {})
+        score = sync.get("score", 0)
+        level = sync.get("level", "disconnected")
+        hr_a = state.get("person_a", {}).get("heart_rate", 70)
+        hr_b = state.get("person_b", {}).get("heart_rate", 70)
+
+        colors = COLORS.get(level, COLORS["disconnected"])
+        pulse_a = table_pulse(t, hr_a)
+        pulse_b = table_pulse(t, hr_b)
+
+        # At high sync, use averaged pulse; at low sync, use individual
+        avg_pulse = (pulse_a + pulse_b) / 2
+        blend = score  # 0 = fully separate, 1 = fully unified
+
+        rows = self.rows
+        rows[0] = np.floor(np.add(colors["a"], np.subtract(colors["b"], colors["a"]) * blend))
+        rows[1] = np.floor(np.add(colors["b"], np.subtract(colors["a"], colors["b"]) * blend))
+        rows[0] *= pulse_a * (1 - blend) + avg_pulse * blend
+        rows[1] *= pulse_b * (1 - blend) + avg_pulse * blend
+        np.take(rows.astype(np.uint8), self.side, axis=0, out=self.frame)
+        return self.frame
+
+    def render_idle(self, t):
+        """Idle animation frame (no live state)."""
+        brightness = 0.3 + 0.2 * np.sin(t * 2 + self.phase)
+        self.frame[:, 0] = 50 * brightness
+        self.frame[:, 1] = 10 * brightness
+        self.frame[:, 2] = 30 * brightness
+        return self.frame
+
+
+class NeoPixelSink:
+    """
+    Writes frames to an adafruit NeoPixel strip through its public API:
+    colors are packed to 0xRRGGBB ints in NumPy and set with one slice
+    assignment, then shown. The library applies brightness, byte order
+    and (on RGBW strips) the white channel.
+
+    adafruit_pixelbuf has no public raw buffer, so that assignment is a
+    per-pixel loop inside the library; `led_controller.py --bench` times
+    it (strip fps) next to the strip's own wire limit.
+    """
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.packed = np.zeros(len(pixels), dtype=np.uint32)
+
+    def write(self, frame):
+        packed = self.packed
+        np.left_shift(frame[:, 0], 16, out=packed, dtype=np.uint32)
+        packed |= frame[:, 1].astype(np.uint32) << 8
+        packed |= frame[:, 2]
+        self.pixels[:] = packed.tolist()
+        self.pixels.show()
+
+
+class FakePixelSink:
+    """Headless sink: takes a copy of each frame's bytes, like a strip buffer."""
+
+    def __init__(self):
+        self.frames = 0
+        self.last = b""
+
+    def write(self, frame):
+        self.last = frame.tobytes()
+        self.frames += 1
@@ -0,0 +1,129 @@
+"""
+Serial bridge for the Arduino LED controller (arduino_led/arduino_led.ino).
+
+Subscribes to the server's UDP LED feed (the same subscription as
+led_controller.py) and forwards the booth state to the board over USB
+serial as binary frames (serial_protocol.py): only fields whose quantized
+value changed are sent, plus a full STATE frame every KEEPALIVE seconds
+so the board does not drop to its idle animation. When the feed goes
+stale the bridge stops sending and the board idles on its own.
+
+Install: pip3 install pyserial numpy
+Run: python3 serial_bridge.py [port]   (default /dev/ttyACM0)
+Loopback harness (no board needed): python3 serial_loopback.py
+"""
+
+import struct
+import sys
+import time
+
+from led_controller import FRAME_INTERVAL, FeedClient
+from serial_protocol import PING, PONG, FrameParser, encode_changes, encode_frame, quantize
+
+SERIAL_PORT = "/dev/ttyACM0"
+BAUD = 115200           # Must match Serial.begin() in the sketch
+KEEPALIVE = 2.0         # Seconds between full STATE frames (board idles after 5 s)
+PING_EVERY = 5.0        # Seconds between round-trip probes
+PING_TIMEOUT = 2 * PING_EVERY  # Unanswered PINGs older than this are forgotten
+
+
+class SerialBridge:
+    """Turns booth states into serial frames on an open pyserial port."""
+
+    def __init__(self, port, keepalive=KEEPALIVE):
+        self.port = port
+        self.keepalive = keepalive
+        self.parser = FrameParser()
+        self.values = None
+        self.sent_at = 0.0
+        self.ping_seq = 0
+        self.pings = {}  # Seq -> perf_counter when sent (unanswered ones only)
+        self.lost_pings = 0
+
+        self.updates = 0
+        self.skipped = 0
+        self.bytes_sent = 0
+        self.rtt_ms = None
+
+    def update(self, state, now):
+        """Send what changed in `state` (everything when a keepalive is due)."""
+        values = quantize(state)
+        previous = self.values
+        if now - self.sent_at >= self.keepalive:
+            previous = None
+        elif values == previous:
+            self.skipped += 1
+            return 0
+        data = encode_changes(values, previous)
+        self.port.write(data)
+        self.values, self.sent_at = values, now
+        self.updates += 1
+        self.bytes_sent += len(data)
+        return len(data)
+
+    def ping(self):
+        """Send a PING; the board echoes the seq back in a PONG."""
+        now = time.perf_counter()
+        expired = [seq for seq, sent in self.pings.items() if now - sent > PING_TIMEOUT]
+        for seq in expired:
+            del self.pings[seq]
+        self.lost_pings += len(expired)
+        self.ping_seq = (self.ping_seq + 1) & 0xFFFF
+        self.pings[self.ping_seq] = now
+        self.port.write(encode_frame(PING, struct.pack("<H", self.ping_seq)))
+
+    def read_replies(self):
+        """Parse whatever the board sent; returns the round trips (ms) of answered PINGs."""
+        waiting = self.port.in_waiting
+        if not waiting:
+            return []
+        rtts = []
+        for kind, payload in self.parser.feed(self.port.read(waiting)):
+            if kind == PONG and len(payload) == 2:
+                sent = self.pings.pop(struct.unpack("<H", payload)[0], None)
+                if sent is not None:
+                    self.rtt_ms = (time.perf_counter() - sent) * 1000
+                    rtts.append(self.rtt_ms)
+        return rtts
+
+    def get_stats(self):
+        return {
+            "updates": self.updates,
+            "skipped_unchanged": self.skipped,
+            "bytes_sent": self.bytes_sent,
+            "rtt_ms": round(self.rtt_ms, 2) if self.rtt_ms is not None else None,
+            "lost_pings": self.lost_pings,
+            "checksum_errors_in": self.parser.errors,
+        }
+
+
+def main(device):
+    """Forward the LED feed to the board until interrupted."""
+    import serial
+
+    port = serial.Serial(device, BAUD, timeout=0)
+    time.sleep(2.0)  # Opening the port resets most Arduinos
+    bridge = SerialBridge(port)
+    feed = FeedClient()
+    print(f"HeartSync serial bridge: LED feed -> {device} @ {BAUD} baud")
+
+    next_ping = 0.0
+    while True:
+        now = time.monotonic()
+        feed.poll(now)
+        state = feed.live_state(now)
+        try:
+            if state is not None:
+                bridge.update(state, now)
+                if now >= next_ping:
+                    bridge.ping()
+                    next_ping = now + PING_EVERY
+            bridge.read_replies()
+        except serial.SerialException as e:
+            print(f"Serial error: {e}")
+            time.sleep(1.0)
+        time.sleep(max(0.0, FRAME_INTERVAL - (time.monotonic() - now)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else SERIAL_PORT)
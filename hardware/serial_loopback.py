@@ -0,0 +1,212 @@
+"""
+Loopback harness for the serial bridge: no board needed.
+
+Opens a pseudo-terminal pair, points a SerialBridge (pyserial) at one end
+and runs a board emulator on the other. The emulator behaves like the
+sketch's receive path: bytes come off the wire at BAUD/10 bytes per
+second (a pty itself has no baud rate), land in a 64-byte RX buffer that
+is drained every --poll-ms (bytes beyond it are dropped, like the AVR
+ring buffer), are parsed with the same framing and CRC, and PINGs are
+answered with PONGs.
+
+Reports:
+  - update latency (bridge write -> frame parsed on the "board"),
+  - PING/PONG round trip,
+  - delivered rate, drops and latency at increasing offered update rates,
+    and the old ASCII protocol's wire limit at 9600 baud for comparison.
+
+Run: python3 serial_loopback.py [--baud 115200] [--poll-ms 1] [--seconds 1]
+(Linux/macOS, needs pyserial.)
+"""
+
+import argparse
+import os
+import pty
+import queue
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+
+import serial
+
+from serial_bridge import BAUD, SerialBridge
+from serial_protocol import HR_A, HR_B, PING, PONG, SCORE, STATE, FrameParser, encode_frame
+
+RX_BUFFER = 64  # Arduino HardwareSerial receive buffer (bytes)
+
+
+class BoardEmulator(threading.Thread):
+    """The sketch's serial receive path on the master side of a pty."""
+
+    def __init__(self, fd, baud, poll_ms, rx_buffer=RX_BUFFER):
+        super().__init__(daemon=True)
+        self.fd = fd
+        self.rate = baud / 10.0  # 8N1: 10 bits per byte
+        self.poll = poll_ms / 1000.0
+        self.rx_buffer = rx_buffer
+        self.parser = FrameParser()
+        self.received = queue.Queue()  # (score thousandths, perf_counter)
+        self.dropped_bytes = 0
+        self.running = True
+        os.set_blocking(fd, False)
+
+    def run(self):
+        last, carry = time.perf_counter(), 0.0
+        while self.running:
+            time.sleep(self.poll)
+            now = time.perf_counter()
+            budget = carry + (now - last) * self.rate
+            last = now
+            try:
+                data = os.read(self.fd, int(budget)) if budget >= 1 else b""
+            except BlockingIOError:
+                data = b""
+            # Unused wire time does not accumulate while the line is idle
+            carry = budget - len(data) if len(data) == int(budget) else 0.0
+            if len(data) > self.rx_buffer:
+                self.dropped_bytes += len(data) - self.rx_buffer
+                data = data[:self.rx_buffer]
+            for kind, payload in self.parser.feed(data):
+                if kind == PING:
+                    os.write(self.fd, encode_frame(PONG, payload))
+                elif kind in (SCORE, STATE):
+                    self.received.put((struct.unpack_from("<H", payload)[0], now))
+                elif kind not in (HR_A, HR_B):
+                    self.parser.errors += 1
+
+
+def state_for(i):
+    """Synthetic state whose quantized score, hr_a and hr_b all differ from state_for(i - 1)."""
+    return {
+        "sync": {"score": (i % 1000) / 1000},
+        "person_a": {"heart_rate": 60 + (i % 400) / 10},
+        "person_b": {"heart_rate": 70 + (i % 300) / 10},
+    }
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def drain(board, idle=0.2):
+    """Collect arrivals until the line has been quiet for `idle` seconds."""
+    arrivals = []
+    while True:
+        try:
+            arrivals.append(board.received.get(timeout=idle))
+        except queue.Empty:
+            return arrivals
+
+
+def measure_latency(bridge, board, samples=200, spacing=0.01):
+    """One update in flight at a time: write -> parsed latency in ms."""
+    latencies, counter = [], 10000
+    for _ in range(samples):
+        counter += 1
+        sent = time.perf_counter()
+        bridge.update(state_for(counter), time.monotonic())
+        try:
+            _, arrived = board.received.get(timeout=1.0)
+            latencies.append((arrived - sent) * 1000)
+        except queue.Empty:
+            pass
+        time.sleep(spacing)
+    return latencies
+
+
+def measure_rtt(bridge, samples=50):
+    rtts = []
+    for _ in range(samples):
+        bridge.ping()
+        deadline = time.perf_counter() + 1.0
+        while time.perf_counter() < deadline:
+            got = bridge.read_replies()
+            if got:
+                rtts.extend(got)
+                break
+            time.sleep(0.0002)
+    return rtts
+
+
+def measure_rate(bridge, board, rate, seconds, start):
+    """Offer `rate` full-state updates per second for `seconds`."""
+    pending = defaultdict(deque)  # Score thousandths -> send times
+    interval, count = 1.0 / rate, int(rate * seconds)
+    dropped_before, errors_before = board.dropped_bytes, board.parser.errors
+    began = time.perf_counter()
+    for n in range(count):
+        target = began + n * interval
+        delay = target - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        i = start + n
+        pending[i % 1000].append(time.perf_counter())
+        bridge.update(state_for(i), time.monotonic())
+    offered = time.perf_counter() - began
+
+    latencies = []
+    for score, arrived in drain(board):
+        if pending[score]:
+            latencies.append((arrived - pending[score].popleft()) * 1000)
+    return {
+        "offered": count / offered,
+        "delivered": len(latencies),
+        "count": count,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "dropped_bytes": board.dropped_bytes - dropped_before,
+        "bad_frames": board.parser.errors - errors_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--baud", type=int, default=BAUD)
+    parser.add_argument("--poll-ms", type=float, default=1.0,
+                        help="how often the board drains its RX buffer")
+    parser.add_argument("--seconds", type=float, default=1.0, help="per offered rate")
+    args = parser.parse_args()
+
+    master, slave = pty.openpty()
+    port = serial.Serial(os.ttyname(slave), args.baud, timeout=0)
+    board = BoardEmulator(master, args.baud, args.poll_ms)
+    board.start()
+    bridge = SerialBridge(port, keepalive=float("inf"))
+
+    full = len(encode_frame(STATE, bytes(6)))
+    single = len(encode_frame(SCORE, bytes(2)))
+    ascii_full = len("S0.750\nHA72.0\nHB74.0\n")
+    print(f"Link: {args.baud} baud, board polls every {args.poll_ms:g} ms, {RX_BUFFER}-byte RX buffer")
+    print(f"Frame sizes: full state {full} B, one field {single} B "
+          f"(old ASCII full update {ascii_full} B)")
+    print(f"Wire limit: {args.baud / 10 / full:.0f} full updates/s "
+          f"(old ASCII at 9600 baud: {9600 / 10 / ascii_full:.0f}/s)")
+
+    latencies = measure_latency(bridge, board)
+    print(f"\nUpdate latency over {len(latencies)} updates: p50 {percentile(latencies, 50):.2f} ms, "
+          f"p99 {percentile(latencies, 99):.2f} ms, max {max(latencies):.2f} ms")
+    rtts = measure_rtt(bridge)
+    print(f"PING round trip: p50 {percentile(rtts, 50):.2f} ms, p99 {percentile(rtts, 99):.2f} ms")
+
+    print(f"\n{'offered/s':>10} {'delivered':>10} {'p50 ms':>8} {'p99 ms':>8} {'dropped B':>10} {'bad':>5}")
+    sustained, start = 0, 0
+    for rate in (30, 100, 300, 600, 1000, 1500, 3000):
+        result = measure_rate(bridge, board, rate, args.seconds, start)
+        start += result["count"]
+        print(f"{result['offered']:>10.0f} {result['delivered']:>5}/{result['count']:<4} "
+              f"{result['p50']:>8.2f} {result['p99']:>8.2f} "
+              f"{result['dropped_bytes']:>10} {result['bad_frames']:>5}")
+        if result["delivered"] == result["count"] and result["p99"] < 50:
+            sustained = rate
+    print(f"\nSustainable: {sustained} full-state updates/s with no loss and p99 < 50 ms")
+
+    board.running = False
+    port.close()
+
+
+if __name__ == "__main__":
+    main()
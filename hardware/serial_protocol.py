@@ -0,0 +1,118 @@
+"""
+Binary serial protocol between serial_bridge.py and the Arduino sketch
+(arduino_led/arduino_led.ino).
+
+Frame:
+    0xA5 | type | length | payload (length bytes) | CRC-8 of type, length, payload
+
+CRC-8 uses polynomial 0x07 (init 0x00). Multi-byte values are little-endian.
+
+Types:
+    SCORE  0x01  uint16 sync score in thousandths (0..1000)
+    HR_A   0x02  uint16 person A heart rate in tenths of a BPM
+    HR_B   0x03  uint16 person B heart rate in tenths of a BPM
+    STATE  0x04  SCORE, HR_A, HR_B payloads back to back (6 bytes)
+    PING   0x10  uint16 sequence number; the board answers with PONG
+    PONG   0x11  uint16 sequence number of the PING
+"""
+
+import struct
+
+SYNC = 0xA5
+SCORE = 0x01
+HR_A = 0x02
+HR_B = 0x03
+STATE = 0x04
+PING = 0x10
+PONG = 0x11
+MAX_PAYLOAD = 8
+
+
+def _crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(kind, payload=b""):
+    body = bytes((kind, len(payload))) + payload
+    return bytes((SYNC,)) + body + bytes((crc8(body),))
+
+
+def quantize(state):
+    """Bridge state dict -> (score thousandths, hr_a tenths, hr_b tenths)."""
+    def clamp(value, high):
+        return max(0, min(high, int(round(value))))
+
+    return (
+        clamp(state["sync"]["score"] * 1000, 1000),
+        clamp(state["person_a"]["heart_rate"] * 10, 2500),
+        clamp(state["person_b"]["heart_rate"] * 10, 2500),
+    )
+
+
+def encode_changes(values, previous):
+    """
+    Frames for the fields of `values` (from quantize) that differ from
+    `previous` (None sends everything). All three changed -> one STATE frame.
+    """
+    if previous is None or all(v != p for v, p in zip(values, previous)):
+        return encode_frame(STATE, struct.pack("<HHH", *values))
+    frames = b""
+    for kind, value, old in zip((SCORE, HR_A, HR_B), values, previous):
+        if value != old:
+            frames += encode_frame(kind, struct.pack("<H", value))
+    return frames
+
+
+class FrameParser:
+    """Incremental frame decoder: feed() bytes, get complete (type, payload) frames."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.errors = 0  # Bad checksums or lengths (bytes skipped to resync)
+
+    def feed(self, data):
+        self.buffer += data
+        frames = []
+        buf = self.buffer
+        while True:
+            start = buf.find(SYNC)
+            if start < 0:
+                buf.clear()
+                break
+            if start:
+                del buf[:start]
+            if len(buf) < 3:
+                break
+            length = buf[2]
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                del buf[:1]
+                continue
+            end = 3 + length + 1
+            if len(buf) < end:
+                break
+            if crc8(buf[1:end - 1]) != buf[end - 1]:
+                self.errors += 1
+                del buf[:1]
+                continue
+            frames.append((buf[1], bytes(buf[3:end - 1])))
+            self.frames += 1
+            del buf[:end]
+        return frames
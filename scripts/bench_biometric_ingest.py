@@ -0,0 +1,110 @@
+"""
+Benchmark: server cost per biometric sample, one reading per POST (the
+original /api/biometrics form) vs. batched POSTs vs. batches over the
+persistent Socket.IO ingest channel (server/biometric_ingest.py).
+
+Runs the real request path in-process with Flask's and Flask-SocketIO's
+test clients (no network), so the numbers are server-side overhead only:
+routing, JSON decoding, validation and buffering. The booth stand-in
+only has the history buffers (the real BoothSession needs the camera stack).
+
+Run: python scripts/bench_biometric_ingest.py [samples]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+from flask import Flask, jsonify, request
+from flask_socketio import SocketIO
+
+from biometric_ingest import INGEST_NAMESPACE, BiometricIngest
+from history_store import BoothHistory
+
+
+class Booth:
+    def __init__(self):
+        self.history = BoothHistory()
+
+    def ingest_samples(self, person_id, rows):
+        return self.history.add_samples(person_id, rows)
+
+
+class Registry:
+    def __init__(self):
+        self.booths = {}
+
+    def get_or_create(self, session_id):
+        return self.booths.setdefault(session_id, Booth())
+
+    def get(self, session_id):
+        return self.booths.get(session_id)
+
+
+app = Flask(__name__)
+socketio = SocketIO(app, async_mode="threading")
+ingest = BiometricIngest(Registry())
+
+
+@app.route("/api/biometrics", methods=["POST"])
+def receive_biometrics():
+    data = request.get_json(silent=True)
+    result = ingest.handle(data, data.get("session_id", "default"), "http")
+    return jsonify(result), (400 if result["status"] == "error" else 200)
+
+
+@socketio.on("biometrics", namespace=INGEST_NAMESPACE)
+def ingest_biometrics(data):
+    return ingest.handle(data, data.get("session_id", "default"), "socket")
+
+
+def samples_for(count, start):
+    return [[start + i * 0.01, 70 + (i % 20) * 0.5, 14.0] for i in range(count)]
+
+
+def run(name, count, batch, send):
+    ingest.registry.get_or_create(name)  # Booths exist before phones send
+    rows = samples_for(count, time.time() - count * 0.01 - 1)
+    started = time.perf_counter()
+    accepted = 0
+    for i in range(0, count, batch):
+        chunk = rows[i:i + batch]
+        if batch == 1:
+            t, hr, br = chunk[0]
+            body = {"session_id": name, "person_id": "A",
+                    "timestamp": t, "heart_rate": hr, "breathing_rate": br}
+        else:
+            body = {"session_id": name, "person_id": "A", "samples": chunk}
+        accepted += send(body)["accepted"]
+    elapsed = time.perf_counter() - started
+    messages = -(-count // batch)
+    print(f"{name:<26} {messages:>8} {elapsed / count * 1e6:>12.1f} {count / elapsed:>12.0f} {accepted:>9}")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    http = app.test_client()
+    socket = socketio.test_client(app, namespace=INGEST_NAMESPACE)
+
+    def post(body):
+        return http.post("/api/biometrics", json=body).get_json()
+
+    def emit(body):
+        return socket.emit("biometrics", body, namespace=INGEST_NAMESPACE, callback=True)
+
+    print(f"{count} samples for one person\n")
+    print(f"{'transport':<26} {'messages':>8} {'us/sample':>12} {'samples/s':>12} {'accepted':>9}")
+    baseline = run("POST, 1 per request", count, 1, post)
+    for batch in (10, 50):
+        elapsed = run(f"POST, batches of {batch}", count, batch, post)
+        print(f"{'':<26} {'':>8} {baseline / elapsed:>11.1f}x faster")
+    for batch in (1, 10, 50):
+        elapsed = run(f"Socket.IO, batches of {batch}", count, batch, emit)
+        print(f"{'':<26} {'':>8} {baseline / elapsed:>11.1f}x faster")
+    print(f"\ningest stats: {ingest.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
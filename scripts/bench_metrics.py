@@ -0,0 +1,70 @@
+"""
+Benchmark: cost of the /metrics instrumentation (server/metrics.py).
+
+Times one observe() and one timed block, then a simulated tick with the
+same number of timed stages as _tick_session, from several threads at
+once (as the update loop, vision and narration workers do). Reports the
+share of one core the instrumentation would take at a few tick rates and
+booth counts, and the cost of rendering a scrape.
+
+Run: python scripts/bench_metrics.py [iterations]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+from metrics import REGISTRY, UPDATE_PASS, UPDATE_STAGE, VISION_INFERENCE
+
+STAGES = ("vision", "sync", "history", "build_state", "emit", "music", "commentary", "mongo")
+
+
+def tick():
+    with UPDATE_PASS.time("tick"):
+        for stage in STAGES:
+            with UPDATE_STAGE.time(stage):
+                pass
+
+
+def per_call(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    observe = per_call(lambda: UPDATE_STAGE.observe(0.0004, "sync"), iterations)
+    tick_cost = per_call(tick, iterations // 10)
+    print(f"observe():        {observe * 1e6:6.2f} us")
+    print(f"tick ({len(STAGES)} stages): {tick_cost * 1e6:6.2f} us")
+
+    # Contended: 4 threads recording at once
+    def worker():
+        for _ in range(iterations // 10):
+            VISION_INFERENCE.observe(0.012, "default", "face")
+            tick()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    contended = (time.perf_counter() - started) / (4 * (iterations // 10))
+    print(f"tick, 4 threads:  {contended * 1e6:6.2f} us")
+
+    print(f"\n{'ticks/s':>8} {'booths':>7} {'CPU':>8}")
+    for rate in (2, 30, 100):
+        for booths in (1, 8):
+            print(f"{rate:>8} {booths:>7} {rate * booths * contended * 100:>7.3f}%")
+
+    render = per_call(REGISTRY.render, 200)
+    print(f"\nscrape render:    {render * 1e3:6.2f} ms ({len(REGISTRY.render())} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: bytes and server-side encode time per state_update tick,
+full JSON state vs. delta-encoded JSON vs. delta-encoded MessagePack
+(server/state_stream.py).
+
+States are synthetic but shaped like _build_state's output: heart and
+breathing rates that change every few ticks, a slowly drifting score,
+vision fields updated by the tracker between ticks.
+
+Run: python scripts/bench_state_stream.py [ticks]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+from state_stream import StateStream, msgpack
+
+
+def make_states(ticks, rate=10.0):
+    states = []
+    hr_a, hr_b, score = 72.0, 75.0, 0.4
+    for t in range(ticks):
+        if random.random() < 0.1:
+            hr_a += random.choice((-1, 1))
+        if random.random() < 0.1:
+            hr_b += random.choice((-1, 1))
+        score = min(1.0, max(0.0, score + random.gauss(0, 0.01)))
+        smiling = random.random() < 0.3
+        states.append({
+            "session_id": "default",
+            "person_a": {"heart_rate": hr_a, "breathing_rate": 14, "data_fresh": True},
+            "person_b": {"heart_rate": hr_b, "breathing_rate": 15, "data_fresh": True},
+            "sync": {
+                "score": round(score, 3), "level": "connecting" if score >= 0.5 else "warming_up",
+                "hr_sync": round(1 - abs(hr_a - hr_b) / 20, 3), "br_sync": 0.9,
+                "eye_contact": random.random() < 0.5, "both_smiling": smiling,
+                "hand_score": 0.0, "raw_score": round(score + random.gauss(0, 0.05), 3),
+                "hr_xcorr": 0.0, "br_xcorr": 0.0, "hr_plv": 0.0, "trend_sync": 0.0, "hr_lag": 0.0,
+            },
+            "vision": {
+                "eye_contact": random.random() < 0.5, "both_smiling": smiling,
+                "smile_scores": [random.random(), random.random()], "face_count": 2,
+                "face_distance": 0.35 + random.gauss(0, 0.01),
+                "hand_distance": 999.0, "hands_touching": False,
+                "frame_age": random.uniform(0.01, 0.08),
+            },
+            "session_duration": t / rate,
+            "session_active": True,
+            "timestamp": 1_700_000_000 + t / rate,
+        })
+    return states
+
+
+def bench(name, states, protocol):
+    stream = StateStream(protocol=protocol, keyframe_every=20)
+    total_bytes = 0
+    started = time.perf_counter()
+    for state in states:
+        message = stream.encode(state)
+        if message is None:
+            continue
+        payload = message[1]
+        # Socket.IO serializes dict payloads with json.dumps once per room
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        total_bytes += len(data)
+    per_tick = (time.perf_counter() - started) / len(states)
+    print(f"{name:<14} {total_bytes / len(states):8.1f} bytes/tick   {per_tick * 1e6:7.1f} us/tick")
+    return total_bytes
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(0)
+    states = make_states(ticks)
+    print(f"{ticks} ticks, keyframe every 20")
+    full = bench("full json", states, "json")
+    delta = bench("delta json", states, "delta")
+    print(f"delta json saves {100 * (1 - delta / full):.0f}% of bytes")
+    if msgpack is not None:
+        packed = bench("delta msgpack", states, "msgpack")
+        print(f"delta msgpack saves {100 * (1 - packed / full):.0f}% of bytes")
+    else:
+        print("msgpack not installed, skipping binary frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: StemMixer (server/stem_mixer.py) on long stems, headless.
+
+Writes three synthetic 16-bit WAV stems of the given length to a temp
+directory, then mixes them with the gains changing every 500 ms (as
+update_sync does) and reports mix time per block against the block's
+real-time budget, plus resident memory before and after. Resident
+memory should stay flat however long the stems are.
+
+Finally runs the null sink on its real-time clock for a few seconds
+and reports underruns.
+
+Run: python scripts/bench_stem_mixer.py [stem_seconds]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+from stem_mixer import StemMixer
+
+RATE = 44100
+
+
+def rss_mb():
+    """Resident set size of this process (Linux), in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return float("nan")
+
+
+def write_stem(path, seconds, freq):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        chunk = RATE * 10
+        for start in range(0, int(seconds * RATE), chunk):
+            t = (start + np.arange(chunk)) / RATE
+            tone = (np.sin(2 * np.pi * freq * t) * 8000).astype("<i2")
+            w.writeframes(np.repeat(tone[:, None], 2, axis=1).tobytes())
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 600
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Writing three {seconds:.0f} s stems...")
+        paths = {}
+        for name, freq in (("harmony", 440), ("neutral", 330), ("tension", 466)):
+            paths[name] = os.path.join(tmp, f"{name}.wav")
+            write_stem(paths[name], seconds, freq)
+
+        mixer = StemMixer(sample_rate=RATE, sink="null", realtime=False)
+        for name, path in paths.items():
+            mixer.add_stem(name, path)
+        before = rss_mb()
+
+        blocks = int(seconds * RATE / mixer.block)
+        blocks_per_update = max(1, int(0.5 * RATE / mixer.block))
+        started = time.perf_counter()
+        for i in range(blocks):
+            if i % blocks_per_update == 0:
+                s = random.random()
+                mixer.set_gains({"harmony": s, "neutral": 0.4, "tension": max(0.0, 0.7 - s)})
+            mixer.mix_block()
+        elapsed = time.perf_counter() - started
+        after = rss_mb()
+
+        block_us = 1e6 * mixer.block / RATE
+        per_block = 1e6 * elapsed / blocks
+        print(f"{blocks} blocks of {mixer.block} frames ({seconds:.0f} s of audio)")
+        print(f"  mix: {per_block:.1f} us/block, {per_block / block_us:.1%} of real time")
+        print(f"  rss: {before:.1f} MB before, {after:.1f} MB after "
+              f"(stems total {3 * seconds * RATE * 4 / 2**20:.0f} MB on disk)")
+
+        mixer.realtime = True
+        mixer.start()
+        time.sleep(3)
+        stats = mixer.get_stats()
+        mixer.close()
+        print(f"  null sink, 3 s real time: {stats['blocks_played']} blocks played, "
+              f"{stats['underruns']} underruns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: heart-rate tempo music (server/tempo_variants.py,
+MusicController.update_heart_rate).
+
+Writes three synthetic 16-bit WAV stems (a tone with a click on every
+beat at MUSIC_BPM) to a temp directory, then reports:
+- cache build time: every stem rendered at every ladder tempo
+- runtime CPU: process CPU time per second of audio while the null sink
+  plays in real time, with the tempo fixed and with the heart rate
+  sweeping across the ladder (crossfades on beat boundaries)
+
+Run: python scripts/bench_tempo_music.py [stem_seconds] [run_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+
+RATE = 44100
+
+
+def write_stem(path, seconds, freq, bpm):
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = np.sin(2 * np.pi * freq * t) * 6000
+    beat = RATE * 60.0 / bpm
+    clicks = (np.arange(len(t)) % beat) < 400  # Short click at each beat
+    tone[clicks] += 8000 * np.sin(2 * np.pi * 1800 * t[clicks])
+    samples = np.repeat(tone.astype("<i2")[:, None], 2, axis=1)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(samples.tobytes())
+
+
+def run(music, seconds, heart_rates=None):
+    """Play for `seconds` of real time; returns CPU seconds per audio second."""
+    music.start()
+    cpu = time.process_time()
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        elapsed = time.monotonic() - started
+        music.update_sync(0.5 + 0.4 * np.sin(elapsed))
+        if heart_rates:
+            music.update_heart_rate(heart_rates[int(elapsed) % len(heart_rates)])
+        time.sleep(0.5)
+    cpu = time.process_time() - cpu
+    stats = music.get_stats()
+    music.stop()
+    return cpu / seconds, stats
+
+
+def main():
+    stem_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    run_seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["MUSIC_TEMPO_CACHE"] = os.path.join(tmp, "tempo_cache")
+        os.environ["MUSIC_SINK"] = "null"
+        import tempo_variants
+        from music_controller import MusicController
+
+        native, ladder, _ = tempo_variants.tempo_settings()
+        paths = []
+        for name, freq in (("harmony", 440), ("neutral", 330), ("tension", 466)):
+            paths.append(os.path.join(tmp, f"{name}.wav"))
+            write_stem(paths[-1], stem_seconds, freq, native)
+
+        print(f"Building tempo cache: 3 x {stem_seconds:.0f} s stems, ladder {ladder}")
+        report = tempo_variants.build_cache(tmp)
+        audio_seconds = 3 * stem_seconds * (len(ladder) - (native in ladder))
+        print(f"  {report['built']} variants in {report['seconds']} s "
+              f"({audio_seconds / max(report['seconds'], 1e-9):.0f}x real time)")
+
+        fixed = MusicController()
+        fixed.load_stems(*paths)
+        fixed.tempos = [native]  # Ignore the cache: recorded tempo only
+        cpu_fixed, _ = run(fixed, run_seconds)
+        fixed.mixer.close()
+
+        music = MusicController()
+        music.load_stems(*paths)
+        sweep = [ladder[0], ladder[len(ladder) // 2], ladder[-1], ladder[len(ladder) // 2]]
+        cpu_sweep, stats = run(music, run_seconds, sweep)
+        music.mixer.close()
+
+        print(f"Runtime CPU ({run_seconds:.0f} s real time, null sink):")
+        print(f"  fixed tempo:        {cpu_fixed:.1%} of one core")
+        print(f"  heart-rate sweep:   {cpu_sweep:.1%} of one core, "
+              f"{stats['tempo_switches']} tempo switches, {stats['beat_changes']} on-beat changes, "
+              f"{stats['underruns']} underruns")
+
+
+if __name__ == "__main__":
+    main()
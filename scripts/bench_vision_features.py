@@ -0,0 +1,156 @@
+"""
+Micro-benchmark: per-frame cost of the vision geometry before and after
+the array-backed landmark analyzers (vision/landmarks.py).
+
+"Before" is the original per-landmark implementation (one np.array per
+landmark, Python double loop over palm centres), kept here for
+comparison. Landmarks are synthetic objects shaped like MediaPipe's
+(.landmark[i].x/.y/.z), so no camera or MediaPipe install is needed.
+
+Run: python scripts/bench_vision_features.py [frames]
+"""
+
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vision.landmarks import FaceAnalyzer, HandAnalyzer, empty_face_state, empty_hand_state
+
+W, H = 640, 480
+
+
+# ---------- Before: per-landmark implementation ----------
+
+def legacy_detect_smile(face_landmarks, w, h):
+    landmarks = face_landmarks.landmark
+    mouth_left = np.array([landmarks[61].x * w, landmarks[61].y * h])
+    mouth_right = np.array([landmarks[291].x * w, landmarks[291].y * h])
+    mouth_width = np.linalg.norm(mouth_right - mouth_left)
+    upper_lip = np.array([landmarks[13].x * w, landmarks[13].y * h])
+    lower_lip = np.array([landmarks[14].x * w, landmarks[14].y * h])
+    mouth_height = np.linalg.norm(lower_lip - upper_lip)  # noqa: F841 (as before)
+    face_left = np.array([landmarks[234].x * w, landmarks[234].y * h])
+    face_right = np.array([landmarks[454].x * w, landmarks[454].y * h])
+    face_width = np.linalg.norm(face_right - face_left)
+    if face_width == 0:
+        return 0.0
+    width_ratio = mouth_width / face_width
+    return float(np.clip((width_ratio - 0.28) / 0.15, 0.0, 1.0))
+
+
+def legacy_detect_eye_contact(face1, face2, w, h):
+    lm1 = face1.landmark
+    lm2 = face2.landmark
+    nose1_x = lm1[1].x
+    nose2_x = lm2[1].x
+    face1_direction = lm1[1].x - (lm1[234].x + lm1[454].x) / 2
+    face2_direction = lm2[1].x - (lm2[234].x + lm2[454].x) / 2
+    if nose1_x < nose2_x:
+        facing_each_other = face1_direction > -0.01 and face2_direction < 0.01
+    else:
+        facing_each_other = face1_direction < 0.01 and face2_direction > -0.01
+    at_eye_level = abs(lm1[1].y - lm2[1].y) < 0.15
+    return facing_each_other and at_eye_level
+
+
+def legacy_face_distance(face1, face2, w, h):
+    center1 = np.array([face1.landmark[1].x, face1.landmark[1].y])
+    center2 = np.array([face2.landmark[1].x, face2.landmark[1].y])
+    return float(np.clip(np.linalg.norm(center2 - center1), 0, 1))
+
+
+def legacy_closest_hand_distance(hands_list, w, h):
+    palm_centers = []
+    for hand in hands_list:
+        palm = hand.landmark[9]
+        palm_centers.append(np.array([palm.x, palm.y]))
+    min_dist = 999.0
+    for i in range(len(palm_centers)):
+        for j in range(i + 1, len(palm_centers)):
+            dist = np.linalg.norm(palm_centers[i] - palm_centers[j])
+            min_dist = min(min_dist, dist)
+    return float(np.clip(min_dist, 0, 1))
+
+
+def legacy_frame(face_results, hand_results):
+    state = {**empty_face_state(), **empty_hand_state()}
+    faces = face_results.multi_face_landmarks
+    state["face_count"] = len(faces)
+    for i, face in enumerate(faces[:2]):
+        state["smile_scores"][i] = legacy_detect_smile(face, W, H)
+    state["both_smiling"] = state["smile_scores"][0] > 0.5 and state["smile_scores"][1] > 0.5
+    state["eye_contact"] = legacy_detect_eye_contact(faces[0], faces[1], W, H)
+    state["face_distance"] = legacy_face_distance(faces[0], faces[1], W, H)
+    min_dist = legacy_closest_hand_distance(hand_results.multi_hand_landmarks, W, H)
+    state["hand_distance"] = min_dist
+    state["hands_touching"] = min_dist < 0.05
+    return state
+
+
+# ---------- After: array-backed analyzers ----------
+
+face_analyzer = FaceAnalyzer()
+hand_analyzer = HandAnalyzer()
+
+
+def array_frame(face_results, hand_results):
+    return {**face_analyzer(face_results, W, H), **hand_analyzer(hand_results, W, H)}
+
+
+# ---------- Synthetic MediaPipe-shaped results ----------
+
+def fake_landmarks(count, cx, cy, spread):
+    return SimpleNamespace(landmark=[
+        SimpleNamespace(x=cx + random.uniform(-spread, spread),
+                        y=cy + random.uniform(-spread, spread),
+                        z=random.uniform(-0.05, 0.05))
+        for _ in range(count)
+    ])
+
+
+def fake_frame():
+    faces = SimpleNamespace(multi_face_landmarks=[
+        fake_landmarks(478, 0.3, 0.4, 0.08), fake_landmarks(478, 0.7, 0.4, 0.08),
+    ])
+    hands = SimpleNamespace(multi_hand_landmarks=[
+        fake_landmarks(21, x, 0.75, 0.03) for x in (0.2, 0.45, 0.55, 0.8)
+    ])
+    return faces, hands
+
+
+def bench(name, fn, frames):
+    fn(*frames[0])  # Warm up
+    started = time.perf_counter()
+    for face_results, hand_results in frames:
+        fn(face_results, hand_results)
+    per_frame = (time.perf_counter() - started) / len(frames)
+    print(f"{name:<8} {per_frame * 1e6:8.1f} us/frame")
+    return per_frame
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(0)
+    frames = [fake_frame() for _ in range(200)]
+    frames = (frames * (n // len(frames) + 1))[:n]
+
+    # Both implementations must agree (up to float32 landmark storage)
+    for face_results, hand_results in frames[:200]:
+        before = legacy_frame(face_results, hand_results)
+        after = array_frame(face_results, hand_results)
+        for key, value in before.items():
+            assert np.allclose(after[key], value, atol=1e-5), (key, value, after[key])
+
+    print(f"{n} frames, 2 faces + 4 hands each")
+    before = bench("before", legacy_frame, frames)
+    after = bench("after", array_frame, frames)
+    print(f"speedup  {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,170 +11,396 @@ load_dotenv()
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-from flask import Flask, request, jsonify, send_from_directory
-from flask_socketio import SocketIO
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask_socketio import SocketIO, emit, join_room
 from flask_cors import CORS
 
 # Import our modules
-from sync_engine import SyncEngine
 from gemini_client import GeminiCommentary
 from elevenlabs_client import VoiceNarrator
 from mongo_client import SessionLogger
 from music_controller import MusicController
-from vision.mediapipe_tracker import ConnectionTracker
+from commentary_worker import CommentaryWorker
+from biometric_ingest import BiometricIngest, INGEST_NAMESPACE
+from led_feed import LedFeed
+from history_store import SERIES as HISTORY_SERIES
+from metrics import REGISTRY, SOCKET_CLIENTS, UPDATE_ERRORS, UPDATE_PASS, UPDATE_STAGE
+from session_registry import SessionRegistry, DEFAULT_SESSION_ID, room_for
+from tick_scheduler import TickScheduler
 
 app = Flask(__name__, static_folder='../display')
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# --- Initialize components ---
-sync_engine = SyncEngine()
-vision_tracker = ConnectionTracker()
-gemini = GeminiCommentary()
-narrator = VoiceNarrator()
-mongo = SessionLogger()
-music = MusicController()
-
-# Try to load music stems
-audio_dir = os.path.join(project_root, "audio")
-harmony_path = os.path.join(audio_dir, "harmony.wav")
-neutral_path = os.path.join(audio_dir, "neutral.wav")
-tension_path = os.path.join(audio_dir, "tension.wav")
-if os.path.exists(harmony_path) and os.path.exists(neutral_path) and os.path.exists(tension_path):
-    music.load_stems(harmony_path, neutral_path, tension_path)
-    print("Music stems loaded successfully")
-else:
-    print("Warning: Audio stems not found in audio/ directory, music disabled")
-
-# --- Biometric state ---
-biometrics = {
-    "A": {"heart_rate": 0, "breathing_rate": 0, "timestamp": 0},
-    "B": {"heart_rate": 0, "breathing_rate": 0, "timestamp": 0},
-}
-
-session_active = False
-session_start_time = 0
-last_commentary_time = 0
-last_sync_score = 0
+# --- Components (built by init()) ---
+# Nothing is built at import: vision process workers are spawned, and a
+# spawned child re-imports this module as __mp_main__.
+scheduler = None
+registry = None
+gemini = None
+narrator = None
+mongo = None
+music = None
+led_feed = None
+ingest = None
+commentary = None
+
+# The host has one speaker, so music and narration follow a single booth
+AUDIO_SESSION_ID = os.environ.get("AUDIO_SESSION", DEFAULT_SESSION_ID)
+
+# Log a snapshot to MongoDB about every 5 seconds of ticks (set by init())
+LOG_EVERY_TICKS = 1
+
+# /api/history defaults: last 10 minutes, downsampled to 300 points per series
+HISTORY_DEFAULT_SECONDS = 600
+HISTORY_DEFAULT_POINTS = 300
+HISTORY_MAX_POINTS = 5000
+
+def _deliver_commentary(session_id, text, priority):
+    """Commentary worker: show a finished line on the booth's display (and speak it)."""
+    session = registry.get(session_id)
+    if session is None:
+        return
+    socketio.emit('commentary', {"text": text}, to=session.room)
+    if session_id == AUDIO_SESSION_ID:
+        narrator.speak(text, priority)
+
 
 # ============================================================
 #  API ENDPOINTS
 # ============================================================
 
+def _session_id_from_request(data=None):
+    """Booth/session id from the JSON body or ?session_id= (defaults to 'default')."""
+    session_id = (data if isinstance(data, dict) else {}).get('session_id') or request.args.get('session_id')
+    return str(session_id) if session_id else DEFAULT_SESSION_ID
+
 @app.route('/api/biometrics', methods=['POST'])
 def receive_biometrics():
-    """Receive heart rate data from Presage phone apps."""
-    data = request.json
-    person_id = data.get('person_id', 'A')
-
-    biometrics[person_id] = {
-        "heart_rate": data.get('heart_rate', 0),
-        "breathing_rate": data.get('breathing_rate', 0),
-        "timestamp": time.time()
-    }
-
-    return jsonify({"status": "ok"})
+    """Receive heart rate data from Presage phone apps (one reading or a batch)."""
+    data = request.get_json(silent=True)
+    result = ingest.handle(data, _session_id_from_request(data), "http")
+    return jsonify(result), (400 if result["status"] == "error" else 200)
 
 @app.route('/api/session/start', methods=['POST'])
 def start_session():
-    """Start a new HeartSync session."""
-    global session_active, session_start_time, last_commentary_time
-    session_active = True
-    session_start_time = time.time()
-    last_commentary_time = 0
-    mongo.start_session()
-    music.start()
-    return jsonify({"status": "started"})
+    """Start a new HeartSync session for a booth."""
+    data = request.get_json(silent=True) or {}
+    camera_index = None
+    if 'camera_index' in data:
+        try:
+            camera_index = int(data['camera_index'])
+        except (TypeError, ValueError):
+            camera_index = -1
+        if camera_index < 0:
+            return jsonify({"error": "camera_index must be a non-negative integer"}), 400
+    session = registry.get_or_create(_session_id_from_request(data))
+    if camera_index is not None:
+        session.start_tracker(camera_index)
+    # Restarting a running booth ends its current Mongo session first
+    mongo.end_session(session.mongo_session_id)
+    session.start()
+    session.mongo_session_id = mongo.start_session(booth_id=session.session_id)
+    if session.session_id == AUDIO_SESSION_ID:
+        music.start()
+    return jsonify({"status": "started", "session_id": session.session_id})
 
 @app.route('/api/session/stop', methods=['POST'])
 def stop_session():
-    """Stop the current session."""
-    global session_active
-    session_active = False
-    mongo.end_session()
-    music.stop()
-    return jsonify({"status": "stopped"})
+    """Stop the current session for a booth."""
+    data = request.get_json(silent=True) or {}
+    session = registry.get(_session_id_from_request(data))
+    if session is None:
+        return jsonify({"error": "unknown session"}), 404
+    if not session.active:
+        return jsonify({"status": "stopped", "session_id": session.session_id})
+    session.stop()
+    mongo.end_session(session.mongo_session_id)
+    session.mongo_session_id = None
+    if session.session_id == AUDIO_SESSION_ID:
+        music.stop()
+    return jsonify({"status": "stopped", "session_id": session.session_id})
 
 @app.route('/api/state', methods=['GET'])
 def get_state():
-    """Get current full state (for polling fallback)."""
-    return jsonify(_build_state())
+    """Get current full state for a booth (for polling fallback)."""
+    session = registry.get(_session_id_from_request())
+    if session is None:
+        return jsonify({"error": "unknown session"}), 404
+    return jsonify(_build_state(session))
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """
+    In-memory history for a booth, for charts:
+    ?series=hr_a,hr_b,score&start=<epoch s>&end=<epoch s>&points=300
+    Each series is downsampled (LTTB) to at most `points` points.
+    """
+    session = registry.get(_session_id_from_request())
+    if session is None:
+        return jsonify({"error": "unknown session"}), 404
+    series = [name for name in request.args.get('series', 'hr_a,hr_b,score').split(',') if name]
+    unknown = [name for name in series if name not in HISTORY_SERIES]
+    if unknown:
+        return jsonify({"error": f"unknown series: {', '.join(unknown)}",
+                        "series": sorted(HISTORY_SERIES)}), 400
+    try:
+        end = float(request.args.get('end', time.time()))
+        start = float(request.args.get('start', end - HISTORY_DEFAULT_SECONDS))
+        points = int(request.args.get('points', HISTORY_DEFAULT_POINTS))
+    except ValueError:
+        return jsonify({"error": "start, end and points must be numbers"}), 400
+    points = max(3, min(points, HISTORY_MAX_POINTS))
+    return jsonify({
+        "session_id": session.session_id,
+        "start": start,
+        "end": end,
+        "series": session.history.query(series, start, end, points),
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text format: update stage latency, vision, API calls, clients."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+def _collect_metrics():
+    """Scrape-time values that live in the components' own stats."""
+    loop = scheduler.get_stats()
+    vision = [(session.session_id, session.vision_tracker.get_stats())
+              for session in registry.all_sessions() if session.vision_tracker.running]
+    models = [(booth, model, stats[model]) for booth, stats in vision
+              for model in ("face", "hands") if model in stats]
+    return [
+        ("heartsync_update_ticks_total", "counter", "Update loop ticks",
+         [({}, loop["ticks"])]),
+        ("heartsync_update_refreshes_total", "counter", "Input-triggered refreshes between ticks",
+         [({}, loop["refreshes"])]),
+        ("heartsync_update_missed_deadlines_total", "counter", "Ticks skipped because the loop fell behind",
+         [({}, loop["missed_deadlines"])]),
+        ("heartsync_active_booths", "gauge", "Booths with a running session",
+         [({}, len(registry.active_sessions()))]),
+        ("heartsync_vision_fps", "gauge", "Effective MediaPipe inference rate per model",
+         [({"booth": booth, "model": model}, stats["fps"]) for booth, model, stats in models]),
+        ("heartsync_vision_target_fps", "gauge", "Scheduled MediaPipe inference rate per model",
+         [({"booth": booth, "model": model}, stats["target_fps"]) for booth, model, stats in models]),
+        ("heartsync_vision_cpu_utilisation", "gauge", "Inference time per second of wall time",
+         [({"booth": booth}, stats["cpu_utilisation"]) for booth, stats in vision]),
+    ]
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Update loop, commentary, MongoDB writer, per-booth vision and state stream stats."""
+    return jsonify({
+        "update_loop": scheduler.get_stats(),
+        "commentary": commentary.get_stats(),
+        "commentary_cache": gemini.cache.get_stats(),
+        "narration": narrator.get_stats(),
+        "music": music.get_stats(),
+        "led_feed": led_feed.get_stats(),
+        "ingest": ingest.get_stats(),
+        "vision": {
+            session.session_id: session.vision_tracker.get_stats()
+            for session in registry.all_sessions()
+        },
+        "state_stream": {
+            session.session_id: session.state_stream.get_stats()
+            for session in registry.all_sessions()
+        },
+        "history": {
+            session.session_id: session.history.get_stats()
+            for session in registry.all_sessions()
+        },
+        "mongo": mongo.get_stats(),
+    })
 
 @app.route('/')
 def serve_display():
     """Serve the main display page."""
     return send_from_directory('../display', 'index.html')
 
+@socketio.on('connect')
+def count_display_connect(auth=None):
+    SOCKET_CLIENTS.inc("/")
+
+@socketio.on('disconnect')
+def count_display_disconnect(*args):
+    SOCKET_CLIENTS.dec("/")
+
+@socketio.on('connect', namespace=INGEST_NAMESPACE)
+def count_ingest_connect(auth=None):
+    SOCKET_CLIENTS.inc(INGEST_NAMESPACE)
+
+@socketio.on('disconnect', namespace=INGEST_NAMESPACE)
+def count_ingest_disconnect(*args):
+    SOCKET_CLIENTS.dec(INGEST_NAMESPACE)
+
+@socketio.on('join')
+def join_session(data):
+    """Subscribe a display client to one booth's Socket.IO room."""
+    session_id = (data or {}).get('session_id') or DEFAULT_SESSION_ID
+    join_room(room_for(str(session_id)))  # Updates start once the booth is started
+    session = registry.get(str(session_id))
+    if session is not None:
+        _send_keyframe(session)
+
+@socketio.on('state_resync')
+def resync_session(data):
+    """A display client missed a state delta: send it a fresh keyframe."""
+    session_id = (data or {}).get('session_id') or DEFAULT_SESSION_ID
+    session = registry.get(str(session_id))
+    if session is not None:
+        _send_keyframe(session)
+
+@socketio.on('biometrics', namespace=INGEST_NAMESPACE)
+def ingest_biometrics(data):
+    """Persistent phone channel: one reading or a batch per message, counts in the ack."""
+    return ingest.handle(data, _session_id_from_request(data), "socket")
+
+def _send_keyframe(session):
+    """Full delta-protocol state to the requesting client only."""
+    message = session.state_stream.keyframe()
+    if message:
+        emit(*message)
+
 # ============================================================
 #  MAIN UPDATE LOOP
 # ============================================================
 
 def update_loop():
     """
-    Main loop that runs every 500ms:
-    1. Gets MediaPipe state
-    2. Computes sync score
-    3. Pushes state to display via WebSocket
-    4. Triggers commentary if appropriate
-    5. Updates music crossfade
-    6. Logs to MongoDB (throttled to every ~5 seconds)
+    Main loop. Every active booth session is ticked on the scheduler's
+    fixed grid (UPDATE_RATE, default 2/s; see _tick_session). Between
+    ticks, a booth with new biometrics or vision state is refreshed
+    right away (see _refresh_session). Sleeps while no booth is active.
     """
-    global last_commentary_time, last_sync_score
-
-    tick = 0
-
     while True:
-        if not session_active:
-            time.sleep(0.5)
-            continue
-
-        # 1. Gather all inputs
-        vision_state = vision_tracker.get_state()
-
-        # 2. Compute sync score
-        sync_result = sync_engine.compute(
-            hr_a=biometrics["A"]["heart_rate"],
-            hr_b=biometrics["B"]["heart_rate"],
-            br_a=biometrics["A"]["breathing_rate"],
-            br_b=biometrics["B"]["breathing_rate"],
-            eye_contact=vision_state["eye_contact"],
-            both_smiling=vision_state["both_smiling"],
-            hands_touching=vision_state["hands_touching"],
-            hand_distance=vision_state["hand_distance"],
-            face_distance=vision_state["face_distance"],
-        )
-
-        # 3. Build and push state
-        state = _build_state(sync_result, vision_state)
-        socketio.emit('state_update', state)
-
-        # 4. Update music crossfade
+        kind, session_ids = scheduler.wait(idle=not registry.active_sessions())
+        if kind == TickScheduler.TICK:
+            sessions = registry.active_sessions()
+        else:
+            sessions = [registry.get(session_id) for session_id in session_ids]
+
+        for session in sessions:
+            if session is None or not session.active:
+                continue
+            try:
+                if kind == TickScheduler.TICK:
+                    with UPDATE_PASS.time("tick"):
+                        _tick_session(session)
+                else:
+                    with UPDATE_PASS.time("refresh"):
+                        _refresh_session(session)
+            except Exception as e:
+                UPDATE_ERRORS.inc()
+                print(f"Update error ({session.session_id}): {e}")
+
+
+def _compute_sync(session, vision_state, advance=True):
+    """Run the booth's sync engine on its latest inputs."""
+    biometrics = session.biometrics
+    return session.sync_engine.compute(
+        hr_a=biometrics["A"]["heart_rate"],
+        hr_b=biometrics["B"]["heart_rate"],
+        br_a=biometrics["A"]["breathing_rate"],
+        br_b=biometrics["B"]["breathing_rate"],
+        eye_contact=vision_state["eye_contact"],
+        both_smiling=vision_state["both_smiling"],
+        hands_touching=vision_state["hands_touching"],
+        hand_distance=vision_state["hand_distance"],
+        face_distance=vision_state["face_distance"],
+        advance=advance,
+    )
+
+
+def _refresh_session(session):
+    """
+    Push fresh state for one booth between ticks. The score is computed
+    without advancing the engine's smoothing/physio history, so it stays
+    one sample per tick; commentary and logging also wait for ticks.
+    """
+    vision_state = session.vision_tracker.get_state()
+    sync_result = _compute_sync(session, vision_state, advance=False)
+    state = _build_state(session, sync_result, vision_state)
+    _emit_state(session, state)
+    if session.session_id == AUDIO_SESSION_ID:
         music.update_sync(sync_result["score"])
 
-        # 5. Commentary trigger (every 30s or on big sync change)
-        now = time.time()
-        sync_changed_a_lot = abs(sync_result["score"] - last_sync_score) > 0.2
-        time_for_new = (now - last_commentary_time) > 30
-
-        if (sync_changed_a_lot or time_for_new) and last_commentary_time > 0:
-            _trigger_commentary(sync_result, vision_state)
-            last_commentary_time = now
-        elif last_commentary_time == 0:
-            last_commentary_time = now  # First tick
 
-        last_sync_score = sync_result["score"]
-
-        # 6. Log to MongoDB (every ~5 seconds = every 10th tick at 500ms)
-        tick += 1
-        if tick % 10 == 0:
-            mongo.log_snapshot(dict(state))
-
-        time.sleep(0.5)
+def _tick_session(session):
+    """
+    One update for one booth:
+    1. Gets MediaPipe state
+    2. Computes sync score
+    3. Pushes state to the booth's display room via WebSocket
+    4. Triggers commentary if appropriate
+    5. Updates music crossfade and tempo (audio booth only)
+    6. Logs to MongoDB (every ~5 seconds; every tick with bucket storage)
+    Each stage is timed into heartsync_update_stage_seconds (/metrics).
+    """
+    # 1. Gather all inputs
+    with UPDATE_STAGE.time("vision"):
+        vision_state = session.vision_tracker.get_state()
+
+    # 2. Compute sync score (and keep it in the booth's history)
+    with UPDATE_STAGE.time("sync"):
+        sync_result = _compute_sync(session, vision_state)
+    with UPDATE_STAGE.time("history"):
+        session.history.add_sync(time.time(), sync_result)
+
+    # 3. Build and push state
+    with UPDATE_STAGE.time("build_state"):
+        state = _build_state(session, sync_result, vision_state)
+    with UPDATE_STAGE.time("emit"):
+        _emit_state(session, state)
+
+    # 4. Update music crossfade and tempo (follows the mean of fresh heart rates)
+    if session.session_id == AUDIO_SESSION_ID:
+        with UPDATE_STAGE.time("music"):
+            music.update_sync(sync_result["score"])
+            rates = [person["heart_rate"] for person in (state["person_a"], state["person_b"])
+                     if person["data_fresh"] and person["heart_rate"]]
+            if rates:
+                music.update_heart_rate(sum(rates) / len(rates))
+
+    # 5. Commentary trigger (every 30s or on big sync change)
+    with UPDATE_STAGE.time("commentary"):
+        now = time.time()
+        sync_changed_a_lot = abs(sync_result["score"] - session.last_sync_score) > 0.2
+        time_for_new = (now - session.last_commentary_time) > 30
+        # Set before queueing, so the line's freshness check sees this level
+        session.last_sync_score = sync_result["score"]
+        session.last_sync_level = sync_result["level"]
+
+        if (sync_changed_a_lot or time_for_new) and session.last_commentary_time > 0:
+            _trigger_commentary(session, sync_result, vision_state,
+                                urgent=sync_changed_a_lot)
+            session.last_commentary_time = now
+        elif session.last_commentary_time == 0:
+            session.last_commentary_time = now  # First tick
+
+    # 6. Log to MongoDB (every ~5 seconds of ticks; every tick into buckets)
+    session.tick += 1
+    if mongo.storage == "buckets" or session.tick % LOG_EVERY_TICKS == 0:
+        with UPDATE_STAGE.time("mongo"):
+            mongo.log_snapshot(dict(state), session.mongo_session_id)
+
+
+def _emit_state(session, state):
+    """
+    Push state to the booth's display room (see StateStream for the
+    protocol) and to its LED controllers (see LedFeed).
+    """
+    message = session.state_stream.encode(state)
+    if message:
+        socketio.emit(*message, to=session.room)
+    led_feed.publish(session.session_id, state)
 
 
-def _build_state(sync_result=None, vision_state=None):
-    """Build the full state object for the display."""
+def _build_state(session, sync_result=None, vision_state=None):
+    """Build the full state object for a booth's display."""
+    biometrics = session.biometrics
     return {
+        "session_id": session.session_id,
         "person_a": {
             "heart_rate": biometrics["A"]["heart_rate"],
             "breathing_rate": biometrics["A"]["breathing_rate"],
@@ -187,41 +413,83 @@ def _build_state(sync_result=None, vision_state=None):
         },
         "sync": sync_result or {"score": 0, "level": "disconnected", "hr_sync": 0},
         "vision": vision_state or {},
-        "session_duration": time.time() - session_start_time if session_active else 0,
-        "session_active": session_active,
+        "session_duration": time.time() - session.start_time if session.active else 0,
+        "session_active": session.active,
         "timestamp": time.time(),
     }
 
 
-def _trigger_commentary(sync_result, vision_state):
-    """Generate and speak AI commentary."""
-    try:
-        text = gemini.generate_commentary(
-            sync_score=sync_result["score"],
-            sync_level=sync_result["level"],
-            hr_a=biometrics["A"]["heart_rate"],
-            hr_b=biometrics["B"]["heart_rate"],
-            eye_contact=vision_state["eye_contact"],
-            both_smiling=vision_state["both_smiling"],
-            hands_touching=vision_state["hands_touching"],
-        )
-        if text:
-            # Emit the text to display
-            socketio.emit('commentary', {"text": text})
-            # Speak it
-            narrator.speak(text)
-    except Exception as e:
-        print(f"Commentary error: {e}")
+def _trigger_commentary(session, sync_result, vision_state, urgent=False):
+    """
+    Queue AI commentary for a booth (generated and delivered by the
+    commentary worker). The line is dropped if the booth's sync level
+    changes or its session restarts before it is ready. Urgent lines (a
+    big sync change) are narrated ahead of periodic filler.
+    """
+    biometrics = session.biometrics
+    level = sync_result["level"]
+    started = session.start_time
+
+    def is_fresh():
+        return (session.active and session.start_time == started
+                and session.last_sync_level in (None, level))
+
+    commentary.submit(session.session_id, {
+        "sync_score": sync_result["score"],
+        "sync_level": level,
+        "hr_a": biometrics["A"]["heart_rate"],
+        "hr_b": biometrics["B"]["heart_rate"],
+        "eye_contact": vision_state["eye_contact"],
+        "both_smiling": vision_state["both_smiling"],
+        "hands_touching": vision_state["hands_touching"],
+    }, is_fresh, VoiceNarrator.LEVEL_CHANGE if urgent else VoiceNarrator.FILLER)
 
 
 # ============================================================
 #  STARTUP
 # ============================================================
 
+def init():
+    """Build the server's components (threads, database, audio device)."""
+    global scheduler, registry, gemini, narrator, mongo, music, led_feed, ingest
+    global commentary, LOG_EVERY_TICKS
+    scheduler = TickScheduler()
+    registry = SessionRegistry(sample_rate=scheduler.rate, on_input=scheduler.trigger)
+    gemini = GeminiCommentary()
+    narrator = VoiceNarrator()
+    mongo = SessionLogger()
+    music = MusicController()
+    led_feed = LedFeed(registry)
+    ingest = BiometricIngest(registry)
+    commentary = CommentaryWorker(gemini.generate_commentary, _deliver_commentary)
+    LOG_EVERY_TICKS = max(1, round(5 * scheduler.rate))
+    REGISTRY.add_collector(_collect_metrics)
+
+    # Try to load music stems
+    audio_dir = os.path.join(project_root, "audio")
+    harmony_path = os.path.join(audio_dir, "harmony.wav")
+    neutral_path = os.path.join(audio_dir, "neutral.wav")
+    tension_path = os.path.join(audio_dir, "tension.wav")
+    if os.path.exists(harmony_path) and os.path.exists(neutral_path) and os.path.exists(tension_path):
+        music.load_stems(harmony_path, neutral_path, tension_path)
+        print("Music stems loaded successfully")
+    else:
+        print("Warning: Audio stems not found in audio/ directory, music disabled")
+
+
 if __name__ == '__main__':
-    # Start MediaPipe tracker
+    init()
+
+    # Start MediaPipe tracker for the default booth; other booths pass
+    # camera_index to /api/session/start
     camera_index = int(os.environ.get("CAMERA_INDEX", "0"))
-    vision_tracker.start(camera_index=camera_index)
+    registry.get_or_create(DEFAULT_SESSION_ID).start_tracker(camera_index)
+
+    # Push state to LED controllers over UDP
+    led_feed.start()
+
+    # Synthesize the fixed fallback lines ahead of time so they play from disk
+    narrator.presynthesize(line for lines in gemini.fallbacks.values() for line in lines)
 
     # Start update loop in background thread
     update_thread = threading.Thread(target=update_loop, daemon=True)
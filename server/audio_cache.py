@@ -0,0 +1,141 @@
+"""
+Content-addressed disk cache for synthesized speech.
+
+Audio is stored as TTS_CACHE_DIR/<sha256 of voice, model and text>.mp3,
+so the same line in the same voice is only ever synthesized once. Hits
+refresh the file's mtime, and once the directory grows past
+TTS_CACHE_MAX_MB the least recently used files are deleted.
+
+Files are written through tee(), which passes streamed API chunks on to
+the player while saving them, and only appear under their key once the
+stream completed, so a cut-off stream never becomes a cache entry.
+"""
+
+import hashlib
+import os
+import threading
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+CHUNK_SIZE = 16 * 1024
+
+
+class AudioCache:
+    """Size-bounded, LRU-evicted directory of audio files keyed by content hash."""
+
+    def __init__(self, cache_dir=None, max_mb=None):
+        env = os.environ.get
+        self.cache_dir = cache_dir or env("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = float(max_mb or env("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.sizes = {}  # key -> bytes on disk
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".mp3"):
+                self.sizes[name[:-4]] = os.path.getsize(os.path.join(self.cache_dir, name))
+        self.total_bytes = sum(self.sizes.values())
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(text, voice_id, model_id):
+        """Content hash identifying one line in one voice and model."""
+        return hashlib.sha256(f"{voice_id}\0{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ".mp3")
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.sizes
+
+    def get(self, key):
+        """Path of the cached audio for `key` (marked recently used), or None."""
+        with self.lock:
+            if key not in self.sizes:
+                self.misses += 1
+                return None
+            self.hits += 1
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.sizes.pop(key, 0)
+            return None
+        return path
+
+    def read(self, path):
+        """Yield a cached file in chunks (the same shape as an API stream)."""
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def tee(self, key, chunks):
+        """
+        Pass `chunks` (bytes) through unchanged while writing them to the
+        cache; the entry is committed only when the iterator is exhausted.
+        """
+        tmp_path = f"{self.path(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    if isinstance(chunk, bytes):
+                        f.write(chunk)
+                    yield chunk
+            self._commit(key, tmp_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put(self, key, chunks):
+        """Write a whole audio stream to the cache."""
+        for _ in self.tee(key, chunks):
+            pass
+
+    def _commit(self, key, tmp_path):
+        size = os.path.getsize(tmp_path)
+        if size == 0:
+            return
+        os.replace(tmp_path, self.path(key))
+        with self.lock:
+            self.total_bytes += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used files until under the size limit (lock held)."""
+        def last_used(key):
+            try:
+                return os.path.getmtime(self.path(key))
+            except OSError:
+                return 0.0
+
+        for key in sorted(self.sizes, key=last_used):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+            self.total_bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def get_stats(self):
+        """Hit/miss counts, size on disk and evictions."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "files": len(self.sizes),
+                "mb": round(self.total_bytes / (1024 * 1024), 2),
+                "evictions": self.evictions,
+            }
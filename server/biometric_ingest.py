@@ -0,0 +1,194 @@
+"""
+Biometrics ingestion for HeartSync phones.
+
+Phones can send one reading per POST (the original form), a batch of
+timestamped samples per POST, or the same batch messages over a
+persistent Socket.IO connection (namespace INGEST_NAMESPACE), which saves
+the per-request HTTP overhead at high sample rates.
+
+Batch message:
+    {"session_id": "default", "person_id": "A",
+     "samples": [[t, heart_rate, breathing_rate], ...]}
+
+t is the phone's epoch time in seconds (null = time of arrival) and a
+null breathing rate counts as 0 (no reading). A batch is validated as
+one NumPy array: samples with out-of-range values, times too far in the
+future or older than BIOMETRIC_MAX_AGE, or not newer than what the
+person's buffer already holds (a retried batch) are dropped and counted.
+Accepted samples go into the person's raw history buffer (history_store.py)
+and the newest one becomes the current reading. Messages for a booth that
+has not been started (/api/session/start) are rejected whole.
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+INGEST_NAMESPACE = "/ingest"
+PERSON_IDS = ("A", "B")
+HR_RANGE = (0.0, 250.0)  # 0 = no reading, as before
+BR_RANGE = (0.0, 80.0)
+MAX_BATCH = 1000
+FUTURE_SKEW = 5.0  # Seconds a phone clock may run ahead of ours
+
+
+def parse_batch(data, now):
+    """
+    Request body -> (person_id, (n, 3) float array of [t, hr, br]).
+    Raises ValueError for a malformed request (not for bad samples).
+    """
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    person_id = data.get("person_id", "A")
+    if person_id not in PERSON_IDS:
+        raise ValueError(f"person_id must be one of {', '.join(PERSON_IDS)}")
+
+    if "samples" in data:
+        samples = data["samples"]
+        if not isinstance(samples, list) or len(samples) > MAX_BATCH:
+            raise ValueError(f"samples must be a list of at most {MAX_BATCH} [t, hr, br] rows")
+    else:
+        samples = [[data.get("timestamp"), data.get("heart_rate", 0), data.get("breathing_rate", 0)]]
+    if not samples:
+        return person_id, np.empty((0, 3))
+
+    try:
+        rows = np.array(samples, dtype=np.float64)  # None -> nan
+    except (TypeError, ValueError):
+        raise ValueError("samples must be numeric [t, hr, br] rows")
+    if rows.ndim != 2 or rows.shape[1] != 3:
+        raise ValueError("samples must be numeric [t, hr, br] rows")
+    rows[np.isnan(rows[:, 0]), 0] = now
+    rows[np.isnan(rows[:, 2]), 2] = 0.0
+    return person_id, rows
+
+
+class SampleBuffer:
+    """Ring buffer of time-ordered rows, [t, values...] (a person's [t, hr, br] by default)."""
+
+    def __init__(self, capacity, columns=3):
+        self.lock = threading.Lock()
+        self.data = np.zeros((capacity, columns))
+        self.capacity = capacity
+        self.count = 0   # Samples held (<= capacity)
+        self.head = 0    # Next write position
+        self.last_t = -np.inf
+
+    def extend(self, rows):
+        """Append time-ordered rows, skipping any not newer than the last sample; returns how many."""
+        with self.lock:
+            rows = rows[rows[:, 0] > self.last_t]
+            n = len(rows)
+            if n == 0:
+                return 0
+            if n >= self.capacity:
+                self.data[:] = rows[-self.capacity:]
+                self.head, self.count = 0, self.capacity
+            else:
+                end = self.head + n
+                if end <= self.capacity:
+                    self.data[self.head:end] = rows
+                else:
+                    split = self.capacity - self.head
+                    self.data[self.head:] = rows[:split]
+                    self.data[:n - split] = rows[split:]
+                self.head = end % self.capacity
+                self.count = min(self.capacity, self.count + n)
+            self.last_t = rows[-1, 0]
+            return n
+
+    def window(self, since=None):
+        """Samples (oldest first) with t >= since, as an (n, 3) array copy."""
+        with self.lock:
+            if self.count < self.capacity:
+                rows = self.data[:self.count].copy()
+            else:
+                rows = np.roll(self.data, -self.head, axis=0)
+        if since is not None:
+            rows = rows[rows[:, 0] >= since]
+        return rows
+
+    def covers(self, start):
+        """True if no sample at or after `start` has been overwritten."""
+        with self.lock:
+            if self.count < self.capacity:
+                return True
+            return self.data[self.head, 0] <= start
+
+    def __len__(self):
+        return self.count
+
+
+class BiometricIngest:
+    """Validates reading batches and stores them in a booth's sample buffers."""
+
+    def __init__(self, registry, max_age=None):
+        env = os.environ.get
+        self.registry = registry
+        self.max_age = float(max_age or env("BIOMETRIC_MAX_AGE", "60"))
+
+        self.lock = threading.Lock()
+        self.messages = {"http": 0, "socket": 0}
+        self.accepted = 0
+        self.rejected = {"out_of_range": 0, "stale": 0, "duplicate": 0, "malformed": 0,
+                         "unknown_session": 0}
+
+    def handle(self, data, session_id, transport):
+        """
+        Ingest one message for `session_id`; returns a result dict
+        ({"status": "ok", "accepted": n, "rejected": m} or an error).
+        """
+        now = time.time()
+        try:
+            person_id, rows = parse_batch(data, now)
+        except ValueError as e:
+            with self.lock:
+                self.messages[transport] += 1
+                self.rejected["malformed"] += 1
+            return {"status": "error", "error": str(e)}
+
+        # Booths are created by /api/session/start, never by phone data
+        session = self.registry.get(session_id)
+        if session is None:
+            with self.lock:
+                self.messages[transport] += 1
+                self.rejected["unknown_session"] += 1
+            return {"status": "error", "error": f"unknown session: {session_id}"}
+
+        t, hr, br = rows[:, 0], rows[:, 1], rows[:, 2]
+        in_range = (np.isfinite(hr) & (hr >= HR_RANGE[0]) & (hr <= HR_RANGE[1])
+                    & np.isfinite(br) & (br >= BR_RANGE[0]) & (br <= BR_RANGE[1]))
+        in_time = np.isfinite(t) & (t <= now + FUTURE_SKEW) & (t >= now - self.max_age)
+        valid = rows[in_range & in_time]
+        if len(valid) > 1:
+            valid = valid[np.argsort(valid[:, 0], kind="stable")]
+            # One sample per timestamp (the last one sent)
+            valid = valid[np.append(valid[1:, 0] != valid[:-1, 0], True)]
+
+        accepted = 0
+        if len(valid):
+            accepted = session.ingest_samples(person_id, valid)
+
+        out_of_range = int(np.count_nonzero(~in_range))
+        stale = int(np.count_nonzero(in_range & ~in_time))
+        duplicate = len(rows) - out_of_range - stale - accepted
+        with self.lock:
+            self.messages[transport] += 1
+            self.accepted += accepted
+            self.rejected["out_of_range"] += out_of_range
+            self.rejected["stale"] += stale
+            self.rejected["duplicate"] += duplicate
+        return {"status": "ok", "accepted": accepted, "rejected": len(rows) - accepted}
+
+    def get_stats(self):
+        """Messages per transport and samples accepted/rejected."""
+        with self.lock:
+            messages = sum(self.messages.values())
+            return {
+                "messages": dict(self.messages),
+                "samples_accepted": self.accepted,
+                "samples_rejected": dict(self.rejected),
+                "samples_per_message": round(self.accepted / messages, 2) if messages else 0.0,
+            }
@@ -0,0 +1,136 @@
+"""
+Cache of generated commentary lines keyed on a quantized state.
+
+Most commentary requests describe nearly the same moment (same level,
+heart rates a few BPM apart, same eye-contact/smile/hands flags), so
+lines are cached under a signature of those fields with heart rates
+bucketed to COMMENTARY_HR_BUCKET BPM. Each signature keeps up to
+COMMENTARY_VARIANTS lines and only serves from the cache once it has
+that many, rotating through them so booths still hear variety.
+
+Lines expire after COMMENTARY_CACHE_TTL seconds; past
+COMMENTARY_CACHE_SIZE signatures the least recently used one is
+evicted. With COMMENTARY_CACHE_PATH set, the cache is loaded from and
+saved to that JSON file so it survives restarts.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CommentaryCache:
+    """TTL + LRU cache of commentary lines per quantized state signature."""
+
+    def __init__(self, max_keys=None, variants=None, ttl=None, hr_bucket=None, path=None):
+        env = os.environ.get
+        self.max_keys = int(max_keys or env("COMMENTARY_CACHE_SIZE", "256"))
+        self.variants = int(variants or env("COMMENTARY_VARIANTS", "3"))
+        self.ttl = float(ttl or env("COMMENTARY_CACHE_TTL", "3600"))
+        self.hr_bucket = float(hr_bucket or env("COMMENTARY_HR_BUCKET", "5"))
+        self.path = path if path is not None else env("COMMENTARY_CACHE_PATH", "")
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # signature -> {"lines": [[text, added_at]], "next": i}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if self.path:
+            self._load()
+
+    def signature(self, sync_level, hr_a, hr_b, eye_contact, both_smiling, hands_touching):
+        """Quantized key for one commentary request."""
+        return "|".join([
+            str(sync_level),
+            str(int(float(hr_a or 0) // self.hr_bucket)),
+            str(int(float(hr_b or 0) // self.hr_bucket)),
+            str(int(bool(eye_contact))),
+            str(int(bool(both_smiling))),
+            str(int(bool(hands_touching))),
+        ])
+
+    def get(self, key):
+        """Next cached line for `key`, or None (a miss) until it has enough variants."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self._expire(key, entry, now)
+            if entry is None or len(entry["lines"]) < self.variants:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            index = entry["next"] % len(entry["lines"])
+            entry["next"] = index + 1
+            self.hits += 1
+            return entry["lines"][index][0]
+
+    def add(self, key, text):
+        """Store a freshly generated line for `key`."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"lines": [], "next": 0}
+            self.entries.move_to_end(key)
+            if text not in (line for line, _ in entry["lines"]):
+                entry["lines"].append([text, now])
+                del entry["lines"][:-self.variants]  # Keep the newest variants
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            if self.path:
+                self._save()
+
+    def _expire(self, key, entry, now):
+        """Drop lines older than the TTL (and the entry once it is empty)."""
+        fresh = [line for line in entry["lines"] if now - line[1] < self.ttl]
+        if len(fresh) != len(entry["lines"]):
+            self.expirations += len(entry["lines"]) - len(fresh)
+            entry["lines"] = fresh
+            if not fresh:
+                del self.entries[key]
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Commentary cache load error: {e}")
+            return
+        now = time.time()
+        for key, lines in items[-self.max_keys:]:
+            lines = [line for line in lines if now - line[1] < self.ttl]
+            if lines:
+                self.entries[key] = {"lines": lines[-self.variants:], "next": 0}
+
+    def _save(self):
+        """Write all entries (LRU order) to the cache file; called with the lock held."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump([[key, entry["lines"]] for key, entry in self.entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Commentary cache save error: {e}")
+
+    def get_stats(self):
+        """Hit/miss counts and rate, size and evictions."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "keys": len(self.entries),
+                "lines": sum(len(entry["lines"]) for entry in self.entries.values()),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
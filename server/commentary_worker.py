@@ -0,0 +1,143 @@
+"""
+Background commentary generation, off the update loop.
+
+The update loop only calls submit(); a single worker thread runs the
+(slow, network-bound) generate call and hands the line to deliver:
+
+- One pending request per booth: a newer request replaces a queued one
+  that has not started yet (counted as superseded).
+- Each generate call gets a hard latency budget (COMMENTARY_BUDGET
+  seconds), passed down as the request timeout; the generator falls back
+  to a canned line when it runs out.
+- Requests are checked for staleness before and after generating: a
+  request that waited longer than COMMENTARY_MAX_AGE seconds, or whose
+  is_fresh() says the booth has moved on (sync level changed, session
+  restarted or stopped), is discarded instead of delivered.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CommentaryWorker:
+    """Per-booth coalescing request queue in front of a commentary generator."""
+
+    def __init__(self, generate, deliver, budget=None, max_age=None):
+        env = os.environ.get
+        self.generate = generate  # fn(timeout=..., **request) -> text
+        self.deliver = deliver    # fn(key, text, context)
+        self.budget = float(budget or env("COMMENTARY_BUDGET", "4.0"))
+        self.max_age = float(max_age or env("COMMENTARY_MAX_AGE", "10.0"))
+
+        self.cond = threading.Condition()
+        self.pending = OrderedDict()  # key -> (request, is_fresh, context, submitted_at)
+
+        self.submitted = 0
+        self.superseded = 0
+        self.generated = 0
+        self.delivered = 0
+        self.discarded = 0
+        self.over_budget = 0
+        self.errors = 0
+        self.latency_ms = {"last": 0.0, "avg": 0.0, "max": 0.0}
+        self.wait_ms = {"last": 0.0, "avg": 0.0, "max": 0.0}
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, key, request, is_fresh=None, context=None):
+        """
+        Queue a commentary request for `key` (never blocks). `request` is
+        passed to generate as keyword arguments and `context` to deliver;
+        is_fresh() is checked before generating and again before delivering.
+        """
+        with self.cond:
+            self.submitted += 1
+            if self.pending.pop(key, None) is not None:
+                self.superseded += 1
+            self.pending[key] = (request, is_fresh, context, time.monotonic())
+            self.cond.notify()
+
+    def close(self, timeout=1.0):
+        """Stop the worker; queued requests are dropped."""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                key, (request, is_fresh, context, submitted_at) = self.pending.popitem(last=False)
+
+            started = time.monotonic()
+            self._record(self.wait_ms, (started - submitted_at) * 1000)
+            if started - submitted_at > self.max_age or not self._fresh(is_fresh):
+                self._discard()
+                continue
+
+            try:
+                text = self.generate(timeout=self.budget, **request)
+            except Exception as e:
+                print(f"Commentary error: {e}")
+                with self.cond:
+                    self.errors += 1
+                continue
+            elapsed = time.monotonic() - started
+            with self.cond:
+                self.generated += 1
+                if elapsed > self.budget:
+                    self.over_budget += 1
+            self._record(self.latency_ms, elapsed * 1000)
+
+            if not text or not self._fresh(is_fresh):
+                self._discard()
+                continue
+            try:
+                self.deliver(key, text, context)
+            except Exception as e:
+                print(f"Commentary delivery error: {e}")
+                continue
+            with self.cond:
+                self.delivered += 1
+
+    def _fresh(self, is_fresh):
+        try:
+            return is_fresh is None or is_fresh()
+        except Exception:
+            return False
+
+    def _discard(self):
+        with self.cond:
+            self.discarded += 1
+
+    def _record(self, stat, ms):
+        with self.cond:
+            first = stat["max"] == 0.0
+            stat["last"] = ms
+            stat["avg"] = ms if first else 0.9 * stat["avg"] + 0.1 * ms
+            stat["max"] = max(stat["max"], ms)
+
+    def get_stats(self):
+        """Queue depth, generation latency and delivered/discarded counters."""
+        with self.cond:
+            return {
+                "queue_depth": len(self.pending),
+                "budget_s": self.budget,
+                "submitted": self.submitted,
+                "superseded": self.superseded,
+                "generated": self.generated,
+                "delivered": self.delivered,
+                "discarded": self.discarded,
+                "over_budget": self.over_budget,
+                "errors": self.errors,
+                "latency_ms": {k: round(v, 1) for k, v in self.latency_ms.items()},
+                "queue_wait_ms": {k: round(v, 1) for k, v in self.wait_ms.items()},
+            }
@@ -1,10 +1,29 @@
+import heapq
+import itertools
 import os
 import threading
+import time
 from elevenlabs import stream
 from elevenlabs.client import ElevenLabs
 
+from audio_cache import AudioCache
+from metrics import EXTERNAL_ERRORS, EXTERNAL_LATENCY
+
 class VoiceNarrator:
-    """Speaks commentary aloud using ElevenLabs TTS."""
+    """
+    Speaks commentary aloud using ElevenLabs TTS.
+
+    Lines go through a small priority queue drained by one worker thread,
+    so only one line plays at a time. A new line supersedes waiting lines
+    of the same or lower priority (they describe a moment that has
+    passed), so they are never played after it. At most
+    NARRATION_QUEUE_SIZE lines wait; a line is dropped if that many more
+    important lines are waiting. Lines older than NARRATION_MAX_AGE
+    seconds are skipped.
+    """
+
+    LEVEL_CHANGE = 0  # Lower value plays first
+    FILLER = 1
 
     def __init__(self):
         self.client = ElevenLabs(
@@ -12,31 +31,151 @@ class VoiceNarrator:
         )
         # "Rachel" - warm female voice
         self.voice_id = "21m00Tcm4TlvDq8ikWAM"
+        self.model_id = "eleven_multilingual_v2"
         self.speaking = False
-        self.lock = threading.Lock()
 
-    def speak(self, text):
-        """Speak text aloud (non-blocking)."""
-        if self.speaking:
-            return  # Don't overlap
+        self.max_queue = int(os.environ.get("NARRATION_QUEUE_SIZE", "4"))
+        self.max_age = float(os.environ.get("NARRATION_MAX_AGE", "15"))
+        self.cond = threading.Condition()
+        self.queue = []  # Heap of (priority, seq, text, queued_at)
+        self.seq = itertools.count()
+
+        # Synthesized lines are cached on disk by content hash
+        self.cache = AudioCache()
+        self.api_calls = 0
+        self.presynthesized = 0
+        self.spoken = 0
+        self.superseded = 0
+        self.expired = 0
+        self.dropped = 0
+        self.first_audio_ms = {"cached": 0.0, "api": 0.0}
+        self.wait_ms = {"last": 0.0, "avg": 0.0, "max": 0.0}
+        self.ttfa_ms = {"last": 0.0, "avg": 0.0, "max": 0.0}
+
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def speak(self, text, priority=FILLER):
+        """Queue text to be spoken (non-blocking)."""
+        with self.cond:
+            kept = [item for item in self.queue if item[0] < priority]
+            if len(kept) < len(self.queue):
+                self.superseded += len(self.queue) - len(kept)
+                heapq.heapify(kept)
+                self.queue = kept
+            if len(self.queue) >= self.max_queue:
+                self.dropped += 1  # Everything queued outranks this line
+                return
+            heapq.heappush(self.queue, (priority, next(self.seq), text, time.monotonic()))
+            self.cond.notify()
+
+    def _run(self):
+        """Narration worker: speak queued lines one at a time."""
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                _, _, text, queued_at = heapq.heappop(self.queue)
+                waited = time.monotonic() - queued_at
+                if waited > self.max_age:
+                    self.expired += 1
+                    continue
+                self._record(self.wait_ms, waited * 1000)
+                self.speaking = True
+            try:
+                self._speak_sync(text)
+            finally:
+                with self.cond:
+                    self.speaking = False
+                    self.spoken += 1
 
+    def presynthesize(self, lines):
+        """Synthesize uncached lines into the audio cache on a background thread."""
+        if not os.environ.get("ELEVENLABS_API_KEY"):
+            return
         thread = threading.Thread(
-            target=self._speak_sync, args=(text,), daemon=True
+            target=self._presynthesize_sync, args=(list(lines),), daemon=True
         )
         thread.start()
 
-    def _speak_sync(self, text):
-        """Synchronous speak (runs in thread)."""
-        with self.lock:
-            self.speaking = True
+    def _presynthesize_sync(self, lines):
+        for text in lines:
+            key = self.cache.key(text, self.voice_id, self.model_id)
+            if self.cache.contains(key):
+                continue
             try:
-                audio_stream = self.client.text_to_speech.stream(
-                    text=text,
-                    voice_id=self.voice_id,
-                    model_id="eleven_multilingual_v2",
-                )
-                stream(audio_stream)
+                self.cache.put(key, self._synthesize(text))
+                with self.cond:
+                    self.presynthesized += 1
             except Exception as e:
-                print(f"ElevenLabs error: {e}")
-            finally:
-                self.speaking = False
+                EXTERNAL_ERRORS.inc("elevenlabs")
+                print(f"ElevenLabs pre-synthesis error: {e}")
+                return
+
+    def _synthesize(self, text):
+        """Stream audio chunks for text from the API."""
+        with self.cond:
+            self.api_calls += 1
+        return self.client.text_to_speech.stream(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model_id,
+        )
+
+    def _speak_sync(self, text):
+        """Synchronous speak (runs on the narration worker)."""
+        source = None
+        try:
+            started = time.perf_counter()
+            key = self.cache.key(text, self.voice_id, self.model_id)
+            path = self.cache.get(key)
+            if path:
+                source, chunks = "cached", self.cache.read(path)
+            else:
+                source, chunks = "api", self.cache.tee(key, self._synthesize(text))
+            stream(self._timed(chunks, source, started))
+        except Exception as e:
+            if source == "api":
+                EXTERNAL_ERRORS.inc("elevenlabs")
+            print(f"ElevenLabs error: {e}")
+
+    def _timed(self, chunks, source, started):
+        """Pass chunks through, recording the delay to the first one."""
+        first = True
+        for chunk in chunks:
+            if first:
+                seconds = time.perf_counter() - started
+                ms = seconds * 1000
+                if source == "api":
+                    EXTERNAL_LATENCY.observe(seconds, "elevenlabs", "ok")
+                with self.cond:
+                    self.first_audio_ms[source] = ms
+                    self._record(self.ttfa_ms, ms)
+                first = False
+            yield chunk
+
+    def _record(self, stat, ms):
+        """Fold one measurement into a last/avg/max stat (lock held)."""
+        first = stat["max"] == 0.0
+        stat["last"] = ms
+        stat["avg"] = ms if first else 0.9 * stat["avg"] + 0.1 * ms
+        stat["max"] = max(stat["max"], ms)
+
+    def get_stats(self):
+        """Queue, audio cache and API stats, queue wait and time-to-first-audio."""
+        with self.cond:
+            return {
+                "speaking": self.speaking,
+                "queue_depth": len(self.queue),
+                "spoken": self.spoken,
+                "superseded": self.superseded,
+                "expired": self.expired,
+                "dropped": self.dropped,
+                "api_calls": self.api_calls,
+                "presynthesized": self.presynthesized,
+                "queue_wait_ms": {k: round(v, 1) for k, v in self.wait_ms.items()},
+                "first_audio_ms": {k: round(v, 1) for k, v in self.ttfa_ms.items()},
+                "first_audio_ms_by_source": {k: round(v, 1)
+                                             for k, v in self.first_audio_ms.items()},
+                "cache": self.cache.get_stats(),
+            }
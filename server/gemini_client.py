@@ -1,5 +1,9 @@
 import google.generativeai as genai
 import os
+import time
+
+from commentary_cache import CommentaryCache
+from metrics import EXTERNAL_ERRORS, EXTERNAL_LATENCY
 
 class GeminiCommentary:
     """Generates romantic/playful commentary based on biometric data."""
@@ -32,11 +36,21 @@ class GeminiCommentary:
             ],
         }
         self.fallback_index = 0
+        self.cache = CommentaryCache()
 
     def generate_commentary(self, sync_score, sync_level,
                             hr_a, hr_b, eye_contact,
-                            both_smiling, hands_touching):
-        """Generate a short romantic line based on current state."""
+                            both_smiling, hands_touching, timeout=None):
+        """
+        Generate a short romantic line based on current state. A fallback
+        line is returned if the API fails or takes longer than `timeout`
+        seconds. Lines for a recently seen state come from the cache.
+        """
+        key = self.cache.signature(sync_level, hr_a, hr_b, eye_contact,
+                                   both_smiling, hands_touching)
+        cached = self.cache.get(key)
+        if cached:
+            return cached
 
         prompt = f"""You are the voice of HeartSync, a Valentine's Day device that
 measures the connection between two people through their heartbeats and body language.
@@ -54,12 +68,18 @@ Generate ONE short, romantic, poetic line (max 20 words) that reflects this mome
 Be warm, specific to the data, and Valentine's Day themed.
 Do NOT use hashtags, emojis, or quotation marks. Just the line itself."""
 
+        started = time.perf_counter()
         try:
-            response = self.model.generate_content(prompt)
+            request_options = {"timeout": timeout} if timeout else None
+            response = self.model.generate_content(prompt, request_options=request_options)
             text = response.text.strip().strip('"').strip("'")
+            EXTERNAL_LATENCY.observe(time.perf_counter() - started, "gemini", "ok")
             if len(text) > 0 and len(text) < 200:
+                self.cache.add(key, text)
                 return text
         except Exception as e:
+            EXTERNAL_LATENCY.observe(time.perf_counter() - started, "gemini", "error")
+            EXTERNAL_ERRORS.inc("gemini")
             print(f"Gemini API error: {e}")
 
         # Fallback
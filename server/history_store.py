@@ -0,0 +1,191 @@
+"""
+In-memory multi-resolution history for one booth.
+
+Every series group keeps a raw ring buffer plus cascading averaged tiers:
+raw samples roll up into 1 s means, and closed 1 s points roll up into
+10 s means. All tiers are fixed-size SampleBuffers, so memory per booth is
+bounded no matter how long the server runs (see get_stats()).
+
+Groups:
+    person A / B  [t, hr, br]  raw = the phone samples from biometric_ingest
+    sync          [t, SYNC_CHANNELS...], one raw row per update loop tick
+
+A heart or breathing rate of 0 means "no reading" and is left out of the
+averages. query() answers a time range from the finest tier that still
+covers it and downsamples each series with LTTB (largest triangle three
+buckets) to the requested number of points.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from biometric_ingest import PERSON_IDS, SampleBuffer
+
+SYNC_CHANNELS = ("score", "raw_score", "hr_sync", "br_sync", "hand_score",
+                 "hr_xcorr", "br_xcorr", "hr_plv", "trend_sync")
+# Series name -> (group, column index after t)
+SERIES = {
+    "hr_a": ("A", 0), "br_a": ("A", 1),
+    "hr_b": ("B", 0), "br_b": ("B", 1),
+}
+SERIES.update({name: ("sync", i) for i, name in enumerate(SYNC_CHANNELS)})
+RESOLUTIONS = (1.0, 10.0)
+
+
+def lttb(t, y, points):
+    """Largest-triangle-three-buckets downsampling of (t, y) to `points` points."""
+    n = len(t)
+    if points >= n:
+        return t, y
+    points = max(points, 3)
+    keep = np.empty(points, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    # points - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = t[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = t[-1], y[-1]
+        area = np.abs((t[a] - cx) * (y[lo:hi] - y[a]) - (t[a] - t[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return t[keep], y[keep]
+
+
+class TieredSeries:
+    """Raw ring buffer plus averaged 1 s and 10 s tiers for one group of columns."""
+
+    def __init__(self, columns, raw_capacity, tier_capacities, zero_is_missing=False):
+        self.columns = columns
+        self.lock = threading.Lock()  # Serializes appends (the open buckets)
+        self.raw = SampleBuffer(raw_capacity, columns + 1)
+        self.tiers = [SampleBuffer(capacity, columns + 1) for capacity in tier_capacities]
+        self.open = [None] * len(self.tiers)  # Per tier: [bucket id, sums, counts]
+        self.zero_is_missing = zero_is_missing
+
+    def append(self, rows):
+        """Add time-ordered [t, values...] rows; returns how many were new."""
+        with self.lock:
+            before = self.raw.last_t
+            added = self.raw.extend(rows)
+            if added:
+                rows = rows[rows[:, 0] > before]
+                values = rows[:, 1:]
+                if self.zero_is_missing:
+                    values = np.where(values == 0, np.nan, values)
+                self._roll(0, rows[:, 0], values)
+            return added
+
+    def _roll(self, level, t, values):
+        """Accumulate rows into tier `level`'s buckets; closed buckets cascade up."""
+        resolution = RESOLUTIONS[level]
+        ids = np.floor(t / resolution)
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+        counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+
+        closed = []
+        current = self.open[level]
+        for bucket, s, c in zip(ids[starts], sums, counts):
+            if current is not None and current[0] == bucket:
+                current[1] += s
+                current[2] += c
+                continue
+            if current is not None:
+                closed.append(self._close(current, resolution))
+            current = [bucket, s.copy(), c.copy()]
+        self.open[level] = current
+
+        if closed:
+            closed = np.array(closed)
+            self.tiers[level].extend(closed)
+            if level + 1 < len(self.tiers):
+                self._roll(level + 1, closed[:, 0], closed[:, 1:])
+
+    @staticmethod
+    def _close(bucket, resolution):
+        bucket_id, sums, counts = bucket
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(counts > 0, sums / counts, np.nan)
+        return np.r_[bucket_id * resolution, means]
+
+    def select(self, start, end):
+        """(rows in [start, end], resolution) from the finest tier covering `start`."""
+        buffers = [(self.raw, 0.0)] + list(zip(self.tiers, RESOLUTIONS))
+        buffer, resolution = buffers[-1]
+        for candidate, candidate_resolution in buffers:
+            if candidate.covers(start):
+                buffer, resolution = candidate, candidate_resolution
+                break
+        rows = buffer.window(start)
+        return rows[rows[:, 0] <= end], resolution
+
+    def nbytes(self):
+        return self.raw.data.nbytes + sum(tier.data.nbytes for tier in self.tiers)
+
+
+class BoothHistory:
+    """Person A/B biometrics and sync channels for one booth, at three resolutions."""
+
+    def __init__(self, raw_capacity=None, sync_capacity=None, tier_capacities=None):
+        env = os.environ.get
+        raw_capacity = int(raw_capacity or env("BIOMETRIC_BUFFER_SIZE", "600"))
+        sync_capacity = int(sync_capacity or env("HISTORY_RAW_POINTS", "1200"))
+        tier_capacities = tier_capacities or (
+            int(env("HISTORY_1S_POINTS", "3600")),    # 1 hour
+            int(env("HISTORY_10S_POINTS", "4320")),   # 12 hours
+        )
+        self.groups = {
+            person_id: TieredSeries(2, raw_capacity, tier_capacities, zero_is_missing=True)
+            for person_id in PERSON_IDS
+        }
+        self.groups["sync"] = TieredSeries(len(SYNC_CHANNELS), sync_capacity, tier_capacities)
+
+    def add_samples(self, person_id, rows):
+        """Time-ordered [t, hr, br] phone samples for one person; returns how many were new."""
+        return self.groups[person_id].append(rows)
+
+    def add_sync(self, t, sync_result):
+        """One tick's sync channels."""
+        row = [t] + [float(sync_result.get(name) or 0.0) for name in SYNC_CHANNELS]
+        self.groups["sync"].append(np.array([row]))
+
+    def query(self, series, start, end, points):
+        """
+        {name: {"t": [...], "v": [...], "resolution": seconds (0 = raw)}}
+        for each series over [start, end], at most `points` points each.
+        """
+        result, selected = {}, {}
+        for name in series:
+            group, column = SERIES[name]
+            if group not in selected:
+                selected[group] = self.groups[group].select(start, end)
+            rows, resolution = selected[group]
+            t, y = rows[:, 0], rows[:, column + 1]
+            present = ~np.isnan(y)
+            if self.groups[group].zero_is_missing:
+                present &= y != 0
+            t, y = lttb(t[present], y[present], points)
+            result[name] = {
+                "t": np.round(t, 3).tolist(),
+                "v": np.round(y, 3).tolist(),
+                "resolution": resolution,
+            }
+        return result
+
+    def get_stats(self):
+        """Points held per group and tier, and the fixed memory footprint."""
+        return {
+            "points": {
+                group: [len(tiers.raw)] + [len(tier) for tier in tiers.tiers]
+                for group, tiers in self.groups.items()
+            },
+            "bytes": sum(tiers.nbytes() for tiers in self.groups.values()),
+        }
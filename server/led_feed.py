@@ -0,0 +1,163 @@
+"""
+UDP push feed of booth state for LED controllers.
+
+LED clients no longer poll /api/state. A client sends a subscribe
+datagram to LED_FEED_PORT and repeats it every few seconds as a
+keepalive:
+
+    b"HSUB" + booth id (utf-8)
+
+The server sends each live subscriber one small datagram per state
+change, plus a repeat every LED_FEED_KEEPALIVE seconds so the client
+knows the server is alive. The LED client renders at its own frame rate
+from the last datagram, so server load does not depend on how fast LEDs
+are refreshed. Subscribers that stop renewing are dropped after
+LED_FEED_TTL seconds. Subscriptions are accepted only for booths in the
+session registry, and at most LED_FEED_MAX_SUBSCRIBERS addresses per
+booth; until a booth is created its clients' keepalives are ignored.
+
+Datagram (little-endian, 18 bytes), see PACKET:
+    magic b"HS", version, seq (uint16), score (float32),
+    level (uint8, index into SyncEngine.LEVELS), hr_a, hr_b (float32)
+"""
+
+import os
+import socket
+import struct
+import threading
+import time
+
+from sync_engine import SyncEngine
+
+PACKET = struct.Struct("<2sBHfBff")
+MAGIC = b"HS"
+VERSION = 1
+SUBSCRIBE = b"HSUB"
+LEVEL_CODES = {level: code for code, level in enumerate(SyncEngine.LEVELS)}
+
+
+def pack_state(seq, state):
+    """One _build_state dict -> LED datagram."""
+    sync = state.get("sync") or {}
+    return PACKET.pack(
+        MAGIC, VERSION, seq & 0xFFFF,
+        round(float(sync.get("score", 0)), 3),
+        LEVEL_CODES.get(sync.get("level"), 0),
+        round(float(state["person_a"]["heart_rate"] or 0), 1),
+        round(float(state["person_b"]["heart_rate"] or 0), 1),
+    )
+
+
+class LedFeed:
+    """Subscriber registry and sender for the LED datagram feed."""
+
+    def __init__(self, registry, port=None, host=None, ttl=None, keepalive=None,
+                 max_subscribers=None):
+        env = os.environ.get
+        self.registry = registry
+        self.port = int(port or env("LED_FEED_PORT", "5005"))
+        self.host = host or env("LED_FEED_HOST", "0.0.0.0")
+        self.ttl = float(ttl or env("LED_FEED_TTL", "15"))
+        self.keepalive = float(keepalive or env("LED_FEED_KEEPALIVE", "1.0"))
+        self.max_subscribers = int(max_subscribers or env("LED_FEED_MAX_SUBSCRIBERS", "16"))
+
+        self.lock = threading.Lock()
+        self.subscribers = {}  # Booth id -> {address: expires_at}
+        self.last = {}         # Booth id -> (payload without seq, sent_at)
+        self.seq = 0
+        self.sock = None
+        self.next_prune = 0.0
+
+        self.sent = 0
+        self.bytes_sent = 0
+        self.skipped = 0
+        self.errors = 0
+        self.rejected = {"unknown_session": 0, "full": 0}
+
+    def start(self):
+        """Bind the UDP socket and start listening for subscriptions."""
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+        except OSError as e:
+            print(f"Warning: LED feed disabled, cannot bind UDP {self.host}:{self.port}: {e}")
+            self.sock = None
+            return
+        threading.Thread(target=self._listen, daemon=True).start()
+        print(f"LED feed listening on UDP {self.host}:{self.port}")
+
+    def _listen(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(256)
+            except OSError:
+                return
+            if not data.startswith(SUBSCRIBE):
+                continue
+            session_id = data[len(SUBSCRIBE):].decode("utf-8", "replace") or "default"
+            now = time.monotonic()
+            with self.lock:
+                if now >= self.next_prune:
+                    self._prune(now)
+                if self.registry.get(session_id) is None:
+                    self.rejected["unknown_session"] += 1
+                    continue
+                booth = self.subscribers.setdefault(session_id, {})
+                if address not in booth and len(booth) >= self.max_subscribers:
+                    self.rejected["full"] += 1
+                    continue
+                booth[address] = now + self.ttl
+                self.last.pop(session_id, None)  # Send the new client state right away
+
+    def _prune(self, now):
+        """Forget expired subscribers and empty booths (lock held)."""
+        for session_id, booth in list(self.subscribers.items()):
+            for address in [a for a, expires in booth.items() if expires < now]:
+                del booth[address]
+            if not booth:
+                del self.subscribers[session_id]
+                self.last.pop(session_id, None)
+        self.next_prune = now + self.ttl
+
+    def publish(self, session_id, state):
+        """Send a booth's state to its LED subscribers (if it changed or is due)."""
+        if self.sock is None:
+            return
+        now = time.monotonic()
+        with self.lock:
+            booth = self.subscribers.get(session_id)
+            if not booth:
+                return
+            for address in [a for a, expires in booth.items() if expires < now]:
+                del booth[address]
+            addresses = list(booth)
+            self.seq += 1
+            payload = pack_state(self.seq, state)
+            body = payload[:3] + payload[5:]  # Without seq
+            last = self.last.get(session_id)
+            if last and last[0] == body and now - last[1] < self.keepalive:
+                self.seq -= 1
+                self.skipped += 1
+                return
+            self.last[session_id] = (body, now)
+        for address in addresses:
+            try:
+                self.sock.sendto(payload, address)
+                self.sent += 1
+                self.bytes_sent += len(payload)
+            except OSError:
+                self.errors += 1
+
+    def get_stats(self):
+        """Subscribers per booth and datagrams sent/skipped."""
+        with self.lock:
+            return {
+                "port": self.port if self.sock else None,
+                "subscribers": {booth: len(addresses)
+                                for booth, addresses in self.subscribers.items() if addresses},
+                "sent": self.sent,
+                "bytes_sent": self.bytes_sent,
+                "skipped_unchanged": self.skipped,
+                "errors": self.errors,
+                "rejected_subscriptions": dict(self.rejected),
+            }
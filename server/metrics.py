@@ -0,0 +1,229 @@
+"""
+Process metrics in the Prometheus text exposition format (GET /metrics).
+
+A small in-process registry, no client library: counters, gauges and
+fixed-bucket histograms, each with optional labels. Recording is a dict
+lookup, a bisect and a few additions under a per-metric lock (about a
+microsecond), so the instrumentation stays on at any tick rate; all
+formatting happens at scrape time. Values that already live elsewhere
+(vision fps, connected clients) are read by collector callbacks when
+/metrics is scraped instead of being pushed.
+
+Metric objects are module-level, like the rest of the server's shared
+components:
+
+    with UPDATE_STAGE.time("sync"):
+        ...
+    EXTERNAL_ERRORS.inc("gemini")
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds: 50 us .. 10 s, enough for both update stages and API calls
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Metrics and collectors rendered together by /metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+        self.collectors = []  # Callables -> [(name, type, help, [(labels dict, value)])]
+        self.render_seconds = 0.0
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        with self.lock:
+            self.collectors.append(collect)
+
+    def render(self):
+        """All metrics as Prometheus text (version 0.0.4)."""
+        started = time.perf_counter()
+        with self.lock:
+            metrics, collectors = list(self.metrics), list(self.collectors)
+        lines = []
+        for metric in metrics:
+            metric.render(lines)
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        lines.append("# HELP heartsync_metrics_render_seconds Time spent rendering the previous scrape")
+        lines.append("# TYPE heartsync_metrics_render_seconds gauge")
+        lines.append(f"heartsync_metrics_render_seconds {_number(self.render_seconds)}")
+        self.render_seconds = time.perf_counter() - started
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}  # Label values tuple -> value (or histogram state)
+        registry.register(self)
+
+    def _header(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. errors."""
+
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name}_total {self.help}")
+        lines.append(f"# TYPE {self.name}_total counter")
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}_total{_labels(self.labelnames, labels)} {_number(value)}")
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. connected clients."""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def render(self, lines):
+        self._header(lines)
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Histogram(_Metric):
+    """Distribution of durations in seconds over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help_text, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *labels):
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labels)
+
+    def render(self, lines):
+        self._header(lines)
+        with self.lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self.values.items()]
+        bounds = self.buckets + (float("inf"),)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+
+
+# --- HeartSync metrics ---
+
+UPDATE_STAGE = Histogram(
+    "heartsync_update_stage_seconds",
+    "Time per update loop stage for one booth",
+    ("stage",),
+)
+UPDATE_PASS = Histogram(
+    "heartsync_update_seconds",
+    "Time for one booth's whole update (tick or between-tick refresh)",
+    ("kind",),
+)
+UPDATE_ERRORS = Counter("heartsync_update_errors", "Exceptions in the update loop")
+VISION_INFERENCE = Histogram(
+    "heartsync_vision_inference_seconds",
+    "MediaPipe inference time per model run",
+    ("booth", "model"),
+)
+EXTERNAL_LATENCY = Histogram(
+    "heartsync_external_call_seconds",
+    "Latency of Gemini calls and ElevenLabs time to first audio",
+    ("service", "outcome"),
+)
+EXTERNAL_ERRORS = Counter("heartsync_external_errors", "Failed Gemini/ElevenLabs calls", ("service",))
+SOCKET_CLIENTS = Gauge("heartsync_socketio_clients", "Connected Socket.IO clients", ("namespace",))
@@ -1,72 +1,199 @@
+import atexit
 import os
+import threading
 import time
-from pymongo import MongoClient
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient
 from datetime import datetime
 
+import snapshot_buckets
+from mongo_writer import MongoWriter
+
+# Indexes for the queries that remain (per-session snapshot history,
+# recent sessions per booth, one bucket per session and minute); created
+# once at startup on the writer thread
+INDEXES = [
+    ("snapshots", [("session_id", ASCENDING), ("logged_at", ASCENDING)], {}),
+    ("sessions", [("booth_id", ASCENDING), ("started_at", DESCENDING)], {}),
+    (snapshot_buckets.COLLECTION, [("session_id", ASCENDING), ("start", ASCENDING)],
+     {"unique": True}),
+]
+
+
+class SessionStats:
+    """
+    Running aggregates of one session's logged snapshots: count, sum and
+    max of the sync score, seconds spent at each sync level, and mean/max
+    of each sync channel (booleans count as 0/1).
+    """
+
+    CHANNELS = ("hr_sync", "br_sync", "eye_contact", "both_smiling", "hand_score",
+                "hr_xcorr", "br_xcorr", "hr_plv", "trend_sync")
+
+    def __init__(self):
+        self.count = 0
+        self.score_sum = 0.0
+        self.score_max = 0.0
+        self.level_seconds = {}
+        self.channel_sum = {name: 0.0 for name in self.CHANNELS}
+        self.channel_max = {name: 0.0 for name in self.CHANNELS}
+        self.last_level = None
+        self.last_time = None
+
+    def add(self, sync, now):
+        """Fold in one snapshot's sync block, logged at `now` (monotonic)."""
+        score = float(sync.get("score", 0))
+        self.count += 1
+        self.score_sum += score
+        self.score_max = max(self.score_max, score)
+
+        # Time since the previous snapshot is credited to the level it showed
+        if self.last_level is not None:
+            seconds = self.level_seconds.get(self.last_level, 0.0)
+            self.level_seconds[self.last_level] = seconds + now - self.last_time
+        self.last_level = sync.get("level")
+        self.last_time = now
+
+        for name in self.CHANNELS:
+            value = float(sync.get(name, 0))
+            self.channel_sum[name] += value
+            if value > self.channel_max[name]:
+                self.channel_max[name] = value
+
+    def summary(self, now):
+        """Summary fields for the session document."""
+        level_seconds = dict(self.level_seconds)
+        if self.last_level is not None:
+            level_seconds[self.last_level] = (level_seconds.get(self.last_level, 0.0)
+                                              + now - self.last_time)
+        count = self.count or 1
+        return {
+            "snapshot_count": self.count,
+            "avg_sync": self.score_sum / count,
+            "peak_sync": self.score_max,
+            "level_seconds": {level: round(s, 1) for level, s in level_seconds.items()},
+            "channels": {
+                name: {"mean": self.channel_sum[name] / count, "max": self.channel_max[name]}
+                for name in self.CHANNELS
+            },
+        }
+
+
 class SessionLogger:
-    """Logs session data to MongoDB Atlas for history and analytics."""
+    """
+    Logs session data to MongoDB Atlas for history and analytics.
+
+    Writes are queued on a MongoWriter (batched, spooled to disk while the
+    database is unreachable), so none of these methods wait on MongoDB.
+    Session summaries are kept up to date in memory as snapshots are
+    logged and written with one update when the session ends.
+
+    SNAPSHOT_STORAGE picks how snapshots are stored: "documents" (one
+    document per snapshot, default) or "buckets" (per-minute columnar
+    buckets, see snapshot_buckets; cheap enough to log every tick).
+    """
 
     def __init__(self):
         uri = os.environ.get("MONGODB_URI", "")
         if uri:
-            self.client = MongoClient(uri)
+            self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
             self.db = self.client["heartsync"]
             self.sessions = self.db["sessions"]
             self.snapshots = self.db["snapshots"]
+            self.writer = MongoWriter(self.db, handlers={"ensure_indexes": self._ensure_indexes})
+            self.writer.submit({"op": "ensure_indexes"}, critical=True)
+            atexit.register(self.writer.close)  # Flush (or spool) queued writes on exit
             self.connected = True
         else:
+            self.writer = None
             self.connected = False
             print("Warning: MONGODB_URI not set, logging disabled")
 
-        self.current_session_id = None
+        self.storage = os.environ.get("SNAPSHOT_STORAGE", "documents")
+        self.bucket_flush_seconds = float(os.environ.get("BUCKET_FLUSH_SECONDS", "5"))
 
-    def start_session(self):
-        """Create a new session document."""
+        self.lock = threading.Lock()
+        self.stats = {}    # Session id -> SessionStats
+        self.buckets = {}  # Session id -> BucketBuffer (bucket storage)
+
+    def _ensure_indexes(self, db, op):
+        """Writer thread: create the indexes in INDEXES (no-op if present)."""
+        for collection, keys, options in INDEXES:
+            db[collection].create_index(keys, **options)
+
+    def start_session(self, booth_id=None):
+        """Queue a new session document and return its (client-generated) id."""
         if not self.connected:
-            return
-        result = self.sessions.insert_one({
+            return None
+        session_id = ObjectId()
+        self.writer.insert("sessions", {
+            "_id": session_id,
+            "booth_id": booth_id,
             "started_at": datetime.utcnow(),
             "ended_at": None,
             "peak_sync": 0,
             "avg_sync": 0,
-        })
-        self.current_session_id = result.inserted_id
+        }, critical=True)
+        with self.lock:
+            self.stats[session_id] = SessionStats()
+            if self.storage == "buckets":
+                self.buckets[session_id] = snapshot_buckets.BucketBuffer(
+                    session_id, self.bucket_flush_seconds)
+        return session_id
 
-    def end_session(self):
-        """Mark session as ended and compute summary stats."""
-        if not self.connected or not self.current_session_id:
+    def end_session(self, session_id):
+        """Queue marking the session as ended with its summary stats (O(1))."""
+        if not self.connected or session_id is None:
             return
 
-        # Compute averages from snapshots
-        pipeline = [
-            {"$match": {"session_id": self.current_session_id}},
-            {"$group": {
-                "_id": None,
-                "avg_sync": {"$avg": "$sync.score"},
-                "peak_sync": {"$max": "$sync.score"},
-            }}
-        ]
-        stats = list(self.snapshots.aggregate(pipeline))
-
+        with self.lock:
+            stats = self.stats.pop(session_id, None)
+            bucket = self.buckets.pop(session_id, None)
+        if bucket:
+            op = bucket.flush()
+            if op:
+                self.writer.submit(op, critical=True)
         update = {"ended_at": datetime.utcnow()}
         if stats:
-            update["avg_sync"] = stats[0].get("avg_sync", 0)
-            update["peak_sync"] = stats[0].get("peak_sync", 0)
+            update.update(stats.summary(time.monotonic()))
+
+        self.writer.update("sessions", {"_id": session_id}, {"$set": update}, critical=True)
 
-        self.sessions.update_one(
-            {"_id": self.current_session_id},
-            {"$set": update}
-        )
+    def log_snapshot(self, state, session_id):
+        """
+        Queue a state snapshot (every ~5 seconds, or every tick with bucket
+        storage); dropped under backpressure.
+        """
+        if not self.connected or session_id is None:
+            return
 
-    def log_snapshot(self, state):
-        """Log a state snapshot (called every ~5 seconds)."""
-        if not self.connected or not self.current_session_id:
+        with self.lock:
+            stats = self.stats.get(session_id)
+            if stats:
+                stats.add(state.get("sync") or {}, time.monotonic())
+            bucket = self.buckets.get(session_id)
+            op = bucket.add(state) if bucket else None
+        if bucket:
+            if op:
+                self.writer.submit(op)
             return
 
-        state["session_id"] = self.current_session_id
+        state["_id"] = ObjectId()
+        state["session_id"] = session_id
         state["logged_at"] = datetime.utcnow()
+        self.writer.insert("snapshots", state)
+
+    def read_series(self, session_id, start=None, end=None, fields=None):
+        """
+        One session's logged samples as numpy arrays ({"t": epoch seconds,
+        "score": ..., ...}) between start and end; see
+        snapshot_buckets.read_series. Runs the query on the calling thread.
+        """
+        if not self.connected:
+            return None
+        return snapshot_buckets.read_series(self.db, session_id, start, end, fields,
+                                            buckets=self.storage == "buckets")
 
-        try:
-            self.snapshots.insert_one(state)
-        except Exception as e:
-            print(f"MongoDB log error: {e}")
+    def get_stats(self):
+        """Writer queue/flush/spool stats (None when logging is disabled)."""
+        return self.writer.get_stats() if self.writer else None
@@ -0,0 +1,320 @@
+"""
+Background MongoDB writer for SessionLogger.
+
+All database writes go through one worker thread, so no MongoDB round
+trip ever runs on the update loop (or a request) thread:
+
+- Ops are queued in a bounded in-memory queue and flushed in order;
+  runs of inserts into the same collection become one insert_many,
+  flushed when MONGO_BATCH_SIZE ops are waiting or MONGO_FLUSH_INTERVAL
+  seconds have passed.
+- Backpressure: when the queue is full, droppable ops (snapshots) are
+  dropped and counted; critical ops (session start/end) are held in an
+  overflow list instead, so they are never lost. Until the worker has
+  drained the queue and taken that list, later critical ops join it and
+  droppable ones are dropped, so writes stay in submission order.
+- While the database is unreachable, ops are appended to an append-only
+  spool file (MONGO_SPOOL_PATH, one extended-JSON op per line). The
+  worker pings every MONGO_RETRY_INTERVAL seconds and, once it answers,
+  replays the spool in order before resuming normal writes. Past
+  MONGO_SPOOL_MAX_MB only critical ops are spooled; the rest are dropped.
+
+Documents carry client-generated _ids, so replaying a batch that was
+partly written before a failure only hits duplicate-key errors, which
+are ignored.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from bson import json_util
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError
+
+DEFAULT_SPOOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mongo_spool.jsonl")
+
+
+class MongoWriter:
+    """Bounded, batching, spooling write queue in front of a database."""
+
+    def __init__(self, db, handlers=None, max_queue=None, batch_size=None,
+                 flush_interval=None, retry_interval=None, spool_path=None):
+        env = os.environ.get
+        self.db = db
+        self.handlers = handlers or {}  # op name -> fn(db, op) for other ops
+        self.max_queue = int(max_queue or env("MONGO_QUEUE_SIZE", "1000"))
+        self.batch_size = int(batch_size or env("MONGO_BATCH_SIZE", "50"))
+        self.flush_interval = float(flush_interval or env("MONGO_FLUSH_INTERVAL", "2.0"))
+        self.retry_interval = float(retry_interval or env("MONGO_RETRY_INTERVAL", "10.0"))
+        self.spool_path = spool_path or env("MONGO_SPOOL_PATH") or DEFAULT_SPOOL_PATH
+        self.spool_max_bytes = float(env("MONGO_SPOOL_MAX_MB", "100")) * 1024 * 1024
+
+        self.queue = queue.Queue(maxsize=self.max_queue)
+        self.overflow = []  # Critical ops that found the queue full, in order
+        self.overflow_lock = threading.Lock()
+        self.spool_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        # A spool left over from a previous run is replayed on the first ping
+        self.online = not self._spool_size()
+        self.next_retry = 0.0
+
+        self.written = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.flush_ms = {"last": 0.0, "avg": 0.0, "max": 0.0}
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # ---------- Producer side (any thread, never blocks on the network) ----------
+
+    def insert(self, collection, doc, critical=False):
+        """Queue one document insert. Returns False if it was dropped."""
+        return self.submit({"op": "insert", "collection": collection, "doc": doc}, critical)
+
+    def update(self, collection, filter, update, upsert=False, critical=False):
+        """Queue one update_one."""
+        return self.submit({"op": "update", "collection": collection, "filter": filter,
+                            "update": update, "upsert": upsert}, critical)
+
+    def submit(self, op, critical=False):
+        """
+        Queue an op dict ({"op": name, ...}). When the queue is full, or
+        earlier ops are already waiting in the overflow list, a critical
+        op joins the overflow list and anything else is dropped.
+        """
+        if critical:
+            op["critical"] = True
+        with self.overflow_lock:
+            if not self.overflow:
+                try:
+                    self.queue.put_nowait(op)
+                except queue.Full:
+                    pass
+                else:
+                    depth = self.queue.qsize()
+                    if depth > self.max_depth:
+                        self.max_depth = depth
+                    return True
+            if critical:
+                self.overflow.append(op)
+                return True
+        with self.stats_lock:
+            self.dropped += 1
+        return False
+
+    def close(self, timeout=5.0):
+        """Flush what is queued (to the database or the spool) and stop."""
+        self.running = False
+        self.thread.join(timeout)
+
+    # ---------- Worker ----------
+
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while self.running or not self.queue.empty() or self.overflow:
+            try:
+                pending.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if len(pending) >= self.batch_size or now >= deadline or not self.running:
+                if not self.online and now >= self.next_retry:
+                    self._try_reconnect()
+                if pending:
+                    self._flush(pending)
+                    pending = []
+                if self.overflow and self.queue.empty():
+                    # Everything queued before the overflow has been flushed
+                    with self.overflow_lock:
+                        overflow, self.overflow = self.overflow, []
+                    self._flush(overflow)
+                deadline = time.monotonic() + self.flush_interval
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, ops):
+        """Write ops in order, or spool them if the database is offline."""
+        if not self.online:
+            self._spool(ops)
+            return
+        started = time.perf_counter()
+        try:
+            self._apply(ops)
+        except ConnectionFailure as e:
+            print(f"MongoDB unreachable, spooling writes: {e}")
+            self.online = False
+            self.next_retry = time.monotonic() + self.retry_interval
+            self._spool(ops)
+            return
+        self._record_flush(len(ops), time.perf_counter() - started)
+
+    def _apply(self, ops):
+        """
+        Apply ops in order: consecutive inserts into one collection go out
+        as a single insert_many. Raises ConnectionFailure (after the ops
+        before the failing group have been written) if the database is
+        unreachable; other errors are logged and their group skipped.
+        """
+        i = 0
+        while i < len(ops):
+            op = ops[i]
+            j = i + 1
+            if op["op"] == "insert":
+                while (j < len(ops) and ops[j]["op"] == "insert"
+                       and ops[j]["collection"] == op["collection"]):
+                    j += 1
+            try:
+                if op["op"] == "insert":
+                    self._insert_many(op["collection"], [o["doc"] for o in ops[i:j]])
+                elif op["op"] == "update":
+                    self._update_one(op)
+                else:
+                    self.handlers[op["op"]](self.db, op)
+            except ConnectionFailure:
+                del ops[:i]  # Caller spools only what was not written
+                raise
+            except Exception as e:
+                print(f"MongoDB write error ({op['op']}): {e}")
+                with self.stats_lock:
+                    self.failed += j - i
+            i = j
+
+    def _insert_many(self, collection, docs):
+        try:
+            self.db[collection].insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Already written by an earlier, interrupted attempt
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+        except DuplicateKeyError:
+            pass
+
+    def _update_one(self, op):
+        try:
+            self.db[op["collection"]].update_one(op["filter"], op["update"],
+                                                 upsert=op.get("upsert", False))
+        except DuplicateKeyError:
+            # An upsert whose filter excludes already-applied updates (e.g. a
+            # bucket append tagged with its batch id) was applied before
+            if not op.get("upsert"):
+                raise
+
+    def _record_flush(self, count, elapsed):
+        ms = elapsed * 1000
+        with self.stats_lock:
+            self.written += count
+            self.batches += 1
+            avg = self.flush_ms["avg"]
+            self.flush_ms["last"] = ms
+            self.flush_ms["avg"] = ms if self.batches == 1 else 0.9 * avg + 0.1 * ms
+            self.flush_ms["max"] = max(self.flush_ms["max"], ms)
+
+    # ---------- Spool ----------
+
+    def _spool(self, ops):
+        """Append ops to the spool file (critical ops only once it is full)."""
+        if self._spool_size() >= self.spool_max_bytes:
+            kept = [op for op in ops if op.get("critical")]
+            with self.stats_lock:
+                self.dropped += len(ops) - len(kept)
+            ops = kept
+            if not ops:
+                return
+        lines = "".join(json_util.dumps(op) + "\n" for op in ops)
+        with self.spool_lock:
+            try:
+                with open(self.spool_path, "a") as f:
+                    f.write(lines)
+            except OSError as e:
+                print(f"MongoDB spool error, dropping {len(ops)} writes: {e}")
+                with self.stats_lock:
+                    self.dropped += len(ops)
+                return
+        with self.stats_lock:
+            self.spooled += len(ops)
+
+    def _spool_size(self):
+        try:
+            return os.path.getsize(self.spool_path)
+        except OSError:
+            return 0
+
+    def _try_reconnect(self):
+        """Ping the database; if it answers, replay the spool and go online."""
+        self.next_retry = time.monotonic() + self.retry_interval
+        try:
+            self.db.command("ping")
+            self._replay()
+        except ConnectionFailure:
+            self.online = False
+            return
+        if not self.online:
+            print("MongoDB reachable again, spool replayed")
+        self.online = True
+
+    def _replay(self):
+        """
+        Re-apply spooled ops in order, batch by batch. On failure, the ops
+        not yet written are left in the spool and ConnectionFailure raised.
+        """
+        with self.spool_lock:
+            try:
+                with open(self.spool_path) as f:
+                    ops = [json_util.loads(line) for line in f if line.strip()]
+            except FileNotFoundError:
+                return
+            os.remove(self.spool_path)
+
+        for start in range(0, len(ops), self.batch_size):
+            batch = ops[start:start + self.batch_size]
+            try:
+                self._apply(batch)
+            except ConnectionFailure:
+                self._restore(batch + ops[start + self.batch_size:])
+                raise
+            with self.stats_lock:
+                self.replayed += len(batch)
+
+    def _restore(self, ops):
+        """Put unwritten ops back at the front of the spool."""
+        lines = "".join(json_util.dumps(op) + "\n" for op in ops)
+        with self.spool_lock:
+            try:
+                with open(self.spool_path) as f:
+                    lines += f.read()
+            except FileNotFoundError:
+                pass
+            tmp_path = self.spool_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(lines)
+            os.replace(tmp_path, self.spool_path)
+
+    # ---------- Stats ----------
+
+    def get_stats(self):
+        """Queue depth, flush latency and written/dropped/spooled counters."""
+        with self.stats_lock:
+            return {
+                "online": self.online,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_depth,
+                "queue_capacity": self.max_queue,
+                "overflow_depth": len(self.overflow),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "spooled": self.spooled,
+                "replayed": self.replayed,
+                "spool_bytes": self._spool_size(),
+                "flush_ms": {k: round(v, 2) for k, v in self.flush_ms.items()},
+            }
@@ -7,62 +7,95 @@ Uses 3 pre-prepared audio stems that crossfade based on sync score:
 - Layer C: Dissonant/tense texture (plays at low sync)
 
 Audio files should be:
-- WAV or OGG format
+- 16-bit PCM WAV, 44.1 kHz (streamed from disk by StemMixer)
 - Same length and BPM (loop seamlessly)
 - Placed in audio/ directory
+
+The tempo follows the couple's mean heart rate: stems rendered at a
+ladder of tempos by tempo_variants.py (offline) are crossfaded on a
+beat boundary whenever the heart rate settles nearer another tempo.
 """
 
-import pygame
-import threading
-import time
+import os
+
+import tempo_variants
+from stem_mixer import StemMixer
 
 class MusicController:
     """Crossfades music layers based on sync score."""
 
-    def __init__(self):
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-        pygame.mixer.set_num_channels(4)
-
-        self.channels = {
-            "harmony": pygame.mixer.Channel(0),
-            "neutral": pygame.mixer.Channel(1),
-            "tension": pygame.mixer.Channel(2),
-            "narration": pygame.mixer.Channel(3),  # Reserved for ElevenLabs
-        }
+    STEMS = ("harmony", "neutral", "tension")
 
-        self.sounds = {}
+    def __init__(self):
+        self.mixer = StemMixer(sample_rate=44100)
         self.loaded = False
+        self.playing = False
         self.current_sync = 0.0
+        self.volumes = {name: 0.0 for name in self.STEMS}
+
+        self.native_bpm, ladder, self.tempo_cache = tempo_variants.tempo_settings()
+        self.tempos = [self.native_bpm]  # Tempos with all stems available
+        self.tempo = self.native_bpm
+        self.ladder = ladder
+        # BPM past the midpoint between two tempos before switching
+        self.tempo_hysteresis = float(os.environ.get("MUSIC_TEMPO_HYSTERESIS", "2"))
+        self.tempo_switches = 0
 
     def load_stems(self, harmony_path, neutral_path, tension_path):
-        """Load the three music stems."""
+        """
+        Map the three music stems (streamed, not decoded into memory) and
+        any cached tempo variants of them.
+        """
         try:
-            self.sounds["harmony"] = pygame.mixer.Sound(harmony_path)
-            self.sounds["neutral"] = pygame.mixer.Sound(neutral_path)
-            self.sounds["tension"] = pygame.mixer.Sound(tension_path)
+            for name, path in zip(self.STEMS, (harmony_path, neutral_path, tension_path)):
+                self.mixer.add_stem(self._stem_name(name, self.native_bpm), path,
+                                    bpm=self.native_bpm)
             self.loaded = True
         except Exception as e:
             print(f"Music load error: {e}")
             self.loaded = False
+            return
+
+        for bpm in self.ladder:
+            paths = [tempo_variants.variant_path(self.tempo_cache, name, bpm) for name in self.STEMS]
+            if bpm == self.native_bpm or not all(os.path.exists(p) for p in paths):
+                continue
+            try:
+                for name, path in zip(self.STEMS, paths):
+                    self.mixer.add_stem(self._stem_name(name, bpm), path, bpm=bpm)
+                self.tempos.append(bpm)
+            except Exception as e:
+                print(f"Music tempo variant error ({bpm} BPM): {e}")
+        self.tempos.sort()
+        if len(self.tempos) == 1:
+            print("No tempo variants cached (python server/tempo_variants.py), tempo fixed")
+
+    def _stem_name(self, name, bpm):
+        return f"{name}@{bpm:g}"
 
     def start(self):
         """Start playing all layers (volumes will be controlled by update)."""
         if not self.loaded:
             return
-        for name, channel in self.channels.items():
-            if name in self.sounds:
-                channel.play(self.sounds[name], loops=-1)  # Loop forever
         # Start with neutral mix
         self.update_sync(0.5)
+        if not self.playing:
+            try:
+                self.mixer.start()
+                self.playing = True
+            except Exception as e:
+                print(f"Music playback error: {e}")
 
     def stop(self):
         """Stop all music."""
-        for channel in self.channels.values():
-            channel.stop()
+        if self.playing:
+            self.mixer.stop()
+            self.playing = False
 
     def update_sync(self, sync_score):
         """
-        Adjust layer volumes based on sync score.
+        Adjust layer volumes based on sync score. The mixer ramps each
+        layer to its new volume sample by sample.
 
         sync = 0.0 (disconnected):
             harmony=0.0, neutral=0.3, tension=0.7
@@ -81,6 +114,39 @@ class MusicController:
         neutral_vol = 0.3 + 0.2 * (1 - abs(s - 0.5) * 2)  # Peak at 0.5
         tension_vol = max(0.0, 0.7 - s * 1.0)     # 0.7->0, tapers off
 
-        self.channels["harmony"].set_volume(harmony_vol)
-        self.channels["neutral"].set_volume(neutral_vol)
-        self.channels["tension"].set_volume(tension_vol)
+        self.volumes = {
+            "harmony": harmony_vol,
+            "neutral": neutral_vol,
+            "tension": tension_vol,
+        }
+        self.mixer.set_gains({self._stem_name(name, self.tempo): volume
+                              for name, volume in self.volumes.items()})
+
+    def update_heart_rate(self, bpm):
+        """
+        Follow the couple's mean heart rate: switch to the nearest cached
+        tempo (with hysteresis), crossfading on the next beat.
+        """
+        if not self.loaded or len(self.tempos) < 2 or not bpm:
+            return
+        nearest = min(self.tempos, key=lambda tempo: abs(tempo - bpm))
+        if nearest == self.tempo:
+            return
+        if abs(bpm - self.tempo) - abs(bpm - nearest) < 2 * self.tempo_hysteresis:
+            return
+
+        changes = {self._stem_name(name, self.tempo): 0.0 for name in self.STEMS}
+        changes.update({self._stem_name(name, nearest): volume
+                        for name, volume in self.volumes.items()})
+        self.mixer.set_gains(changes, on_beat=True)
+        self.tempo = nearest
+        self.tempo_switches += 1
+
+    def get_stats(self):
+        """Tempo and mixer block/underrun stats (None when no stems are loaded)."""
+        if not self.loaded:
+            return None
+        stats = self.mixer.get_stats()
+        stats.update({"tempo": self.tempo, "tempos": self.tempos,
+                      "tempo_switches": self.tempo_switches})
+        return stats
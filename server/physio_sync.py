@@ -0,0 +1,238 @@
+"""
+Streaming physiological synchrony for HeartSync.
+
+Tracks how two people's heart rate (and breathing rate) series move
+together over a sliding window, updated one aligned sample at a time:
+
+- Lagged cross-correlation: running sums of a[t] * b[t - k] for every
+  lag k in [-max_lag, max_lag], plus running window sums for the means
+  and variances of each lag's shifted windows. Peak Pearson correlation
+  and the lag it occurs at.
+- Trend slope: least-squares slope of each series over the window,
+  kept as running sums of y and x * y.
+- Phase-locking value: a sliding DFT of a few low-frequency bins gives
+  each series' instantaneous phase; the PLV is the length of the mean
+  phase-difference phasor over the window at the dominant shared bin.
+
+Every update is O(max_lag + n_bins), independent of the window length.
+Running sums are recomputed exactly from the ring buffers once per
+window to stop floating-point drift (amortized O(max_lag + n_bins)).
+"""
+
+import numpy as np
+
+
+class PairSynchrony:
+    """Incremental synchrony statistics for one pair of aligned series."""
+
+    def __init__(self, window=30, max_lag=6, n_bins=4, sample_rate=2.0):
+        self.window = window
+        self.max_lag = max_lag
+        self.sample_rate = sample_rate
+        self.count = 0
+
+        # Ring buffers, zero-filled so warm-up needs no special cases:
+        # samples that were never written contribute nothing when the
+        # window later "removes" them
+        self.size = window + max_lag + 1
+        self.pos = -1
+        self.a = np.zeros(self.size)
+        self.b = np.zeros(self.size)
+
+        # --- Lagged cross-correlation ---
+        # Lag k >= 0 pairs a[n] with b[n - k]; k < 0 pairs a[n + k] with b[n]
+        lags = np.arange(-max_lag, max_lag + 1)
+        self.lags = lags
+        self.new_a_back = np.where(lags >= 0, 0, -lags)
+        self.new_b_back = np.where(lags >= 0, lags, 0)
+        self.old_a_back = self.new_a_back + window
+        self.old_b_back = self.new_b_back + window
+        self.cross_sums = np.zeros(len(lags))
+        self.sum_a = 0.0
+        self.sum_b = 0.0
+        self.sum_a2 = 0.0
+        self.sum_b2 = 0.0
+        # Window sums (a, a^2, b, b^2) from the last max_lag + 1 updates,
+        # so each lag can use the means of its own shifted windows
+        self.sum_history = np.zeros((4, max_lag + 1))
+
+        # --- Trend slope (x = 0 for the oldest sample in the window) ---
+        self.sum_xa = 0.0
+        self.sum_xb = 0.0
+        self.sum_x = window * (window - 1) / 2.0
+        self.slope_denom = window * (window - 1) * (2 * window - 1) / 6.0 * window - self.sum_x ** 2
+
+        # --- Sliding DFT bins 1..n_bins and phase-difference phasors ---
+        bins = np.arange(1, n_bins + 1)
+        self.bin_freqs = bins * sample_rate / window
+        self.twiddle = np.exp(2j * np.pi * bins / window)
+        self.dft_basis = np.exp(-2j * np.pi * np.outer(np.arange(window), bins) / window)
+        self.dft_a = np.zeros(n_bins, dtype=complex)
+        self.dft_b = np.zeros(n_bins, dtype=complex)
+        self.phasors = np.zeros((window, n_bins), dtype=complex)
+        self.phasor_sum = np.zeros(n_bins, dtype=complex)
+
+    @property
+    def ready(self):
+        """True once the window and every lag are filled with real samples."""
+        return self.count >= self.window + self.max_lag
+
+    def _back(self, buf, back):
+        """Sample(s) `back` steps before the newest one."""
+        return buf[(self.pos - back) % self.size]
+
+    def update(self, a, b):
+        """Add one aligned sample pair."""
+        a_old = self._back(self.a, self.window - 1)
+        b_old = self._back(self.b, self.window - 1)
+        old_terms = (self._back(self.a, self.old_a_back - 1) *
+                     self._back(self.b, self.old_b_back - 1))
+
+        self.pos = (self.pos + 1) % self.size
+        self.a[self.pos] = a
+        self.b[self.pos] = b
+        self.count += 1
+
+        new_terms = (self._back(self.a, self.new_a_back) *
+                     self._back(self.b, self.new_b_back))
+        self.cross_sums += new_terms - old_terms
+
+        # Slope sums shift every x down by one before adding the new sample
+        self.sum_xa += (self.window - 1) * a - (self.sum_a - a_old)
+        self.sum_xb += (self.window - 1) * b - (self.sum_b - b_old)
+
+        self.sum_a += a - a_old
+        self.sum_b += b - b_old
+        self.sum_a2 += a * a - a_old * a_old
+        self.sum_b2 += b * b - b_old * b_old
+        self._record_sums()
+
+        self.dft_a = (self.dft_a - a_old + a) * self.twiddle
+        self.dft_b = (self.dft_b - b_old + b) * self.twiddle
+
+        cross = self.dft_a * np.conj(self.dft_b)
+        magnitude = np.abs(cross)
+        phasor = np.divide(cross, magnitude, out=np.zeros_like(cross), where=magnitude > 0)
+        slot = self.count % self.window
+        self.phasor_sum += phasor - self.phasors[slot]
+        self.phasors[slot] = phasor
+
+        if self.count % self.window == 0:
+            self._resync()
+
+    def _record_sums(self):
+        slot = self.count % (self.max_lag + 1)
+        self.sum_history[:, slot] = (self.sum_a, self.sum_a2, self.sum_b, self.sum_b2)
+
+    def _resync(self):
+        """Recompute every running sum exactly from the ring buffers."""
+        back = np.arange(self.window - 1, -1, -1)  # oldest .. newest
+        a_win = self._back(self.a, back)
+        b_win = self._back(self.b, back)
+
+        self.sum_a = float(a_win.sum())
+        self.sum_b = float(b_win.sum())
+        self.sum_a2 = float(a_win @ a_win)
+        self.sum_b2 = float(b_win @ b_win)
+        self._record_sums()
+
+        x = np.arange(self.window)
+        self.sum_xa = float(x @ a_win)
+        self.sum_xb = float(x @ b_win)
+
+        steps = np.arange(self.window)[:, None]
+        self.cross_sums = (self._back(self.a, self.new_a_back + steps) *
+                           self._back(self.b, self.new_b_back + steps)).sum(axis=0)
+
+        self.dft_a = a_win @ self.dft_basis
+        self.dft_b = b_win @ self.dft_basis
+        self.phasor_sum = self.phasors.sum(axis=0)
+
+    def stats(self):
+        """
+        Current synchrony statistics. Returns zeros until ready.
+
+        xcorr:   peak Pearson correlation over all lags (-1 to 1)
+        lag:     lag of the peak in seconds (positive = a follows b)
+        slope_a, slope_b: trend of each series in units per second
+        plv:     phase-locking value at the dominant shared bin (0 to 1)
+        freq:    frequency of that bin in Hz
+        """
+        if not self.ready:
+            return {"xcorr": 0.0, "lag": 0.0, "slope_a": 0.0, "slope_b": 0.0,
+                    "plv": 0.0, "freq": 0.0}
+
+        n = self.window
+        slots = self.max_lag + 1
+        mean_a, mean_a2 = self.sum_history[:2, (self.count - self.new_a_back) % slots] / n
+        mean_b, mean_b2 = self.sum_history[2:, (self.count - self.new_b_back) % slots] / n
+        var = np.maximum(mean_a2 - mean_a * mean_a, 0.0) * np.maximum(mean_b2 - mean_b * mean_b, 0.0)
+        valid = var > 1e-12
+        if valid.any():
+            cov = self.cross_sums / n - mean_a * mean_b
+            corr = np.where(valid, cov / np.sqrt(np.where(valid, var, 1.0)), -1.0)
+            peak = int(np.argmax(corr))
+            xcorr = float(np.clip(corr[peak], -1.0, 1.0))
+            lag = float(self.lags[peak] / self.sample_rate)
+        else:
+            xcorr, lag = 0.0, 0.0
+
+        slope_a = (n * self.sum_xa - self.sum_x * self.sum_a) / self.slope_denom
+        slope_b = (n * self.sum_xb - self.sum_x * self.sum_b) / self.slope_denom
+
+        dominant = int(np.argmax(np.abs(self.dft_a) * np.abs(self.dft_b)))
+        plv = float(min(1.0, abs(self.phasor_sum[dominant]) / n))
+
+        return {
+            "xcorr": xcorr,
+            "lag": lag,
+            "slope_a": float(slope_a * self.sample_rate),
+            "slope_b": float(slope_b * self.sample_rate),
+            "plv": plv,
+            "freq": float(self.bin_freqs[dominant]),
+        }
+
+
+class PhysioSync:
+    """
+    Heart rate and breathing synchrony channels for one couple.
+
+    Feed one aligned sample per sample period with update() and read the
+    channels with channels(); pairs where either reading is missing
+    (<= 0) are skipped for that series.
+    """
+
+    # HR trends further apart than this (BPM per second) score 0
+    TREND_SCALE = 0.2
+
+    def __init__(self, sample_rate=2.0, window_seconds=15.0,
+                 max_lag_seconds=3.0, n_bins=4):
+        window = max(4, int(round(window_seconds * sample_rate)))
+        max_lag = max(1, int(round(max_lag_seconds * sample_rate)))
+        self.hr = PairSynchrony(window, max_lag, n_bins, sample_rate)
+        self.br = PairSynchrony(window, max_lag, n_bins, sample_rate)
+
+    def update(self, hr_a, hr_b, br_a, br_b):
+        """Add one aligned sample (call at the sample rate)."""
+        if hr_a > 0 and hr_b > 0:
+            self.hr.update(hr_a, hr_b)
+        if br_a > 0 and br_b > 0:
+            self.br.update(br_a, br_b)
+
+    def channels(self):
+        """Current synchrony channels (0.0 to 1.0, plus the HR lag in seconds)."""
+        hr = self.hr.stats()
+        br = self.br.stats()
+        if self.hr.ready:
+            trend_diff = abs(hr["slope_a"] - hr["slope_b"])
+            trend_sync = max(0.0, 1.0 - trend_diff / self.TREND_SCALE)
+        else:
+            trend_sync = 0.0
+
+        return {
+            "hr_xcorr": max(0.0, hr["xcorr"]),
+            "hr_lag": hr["lag"],
+            "br_xcorr": max(0.0, br["xcorr"]),
+            "hr_plv": hr["plv"],
+            "trend_sync": trend_sync,
+        }
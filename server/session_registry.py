@@ -0,0 +1,141 @@
+"""
+Booth session registry for HeartSync.
+
+Each booth (one couple in front of one camera) gets its own BoothSession
+that owns the booth's biometrics, SyncEngine, ConnectionTracker and
+Socket.IO room. The registry lets a single server process run many booths
+side by side; the update loop ticks every active session in turn, and
+on_input(session_id) tells it when a booth has new biometrics or vision
+state.
+"""
+
+import threading
+import time
+
+from history_store import BoothHistory
+from metrics import VISION_INFERENCE
+from state_stream import StateStream
+from sync_engine import SyncEngine
+from vision.mediapipe_tracker import ConnectionTracker
+
+DEFAULT_SESSION_ID = "default"
+
+
+def room_for(session_id):
+    """Socket.IO room of a booth's displays (joinable before the booth exists)."""
+    return f"booth:{session_id}"
+
+
+class BoothSession:
+    """All per-booth state for one couple."""
+
+    def __init__(self, session_id, sample_rate=2.0, on_input=None):
+        self.session_id = session_id
+        self.room = room_for(session_id)
+        self.sample_rate = sample_rate  # Update loop ticks per second
+        self.on_input = on_input
+
+        self.biometrics = {
+            "A": {"heart_rate": 0, "breathing_rate": 0, "timestamp": 0},
+            "B": {"heart_rate": 0, "breathing_rate": 0, "timestamp": 0},
+        }
+        # Phone samples and sync channels at raw/1 s/10 s resolution
+        self.history = BoothHistory()
+        self.sync_engine = SyncEngine(sample_rate=sample_rate)
+        self.vision_tracker = ConnectionTracker(on_update=self._input_changed,
+                                                on_inference=self._inference_timed)
+        self.state_stream = StateStream()  # Encodes state_update for the room
+        self.camera_index = None
+
+        self.active = False
+        self.start_time = 0
+        self.last_commentary_time = 0
+        self.last_sync_score = 0
+        self.last_sync_level = None
+        self.tick = 0
+        self.mongo_session_id = None
+
+    def start_tracker(self, camera_index):
+        """Start this booth's camera tracker (no-op if already running)."""
+        if self.vision_tracker.running:
+            return
+        self.camera_index = camera_index
+        self.vision_tracker.start(camera_index=camera_index)
+
+    def start(self):
+        """Mark the session active and reset per-session counters."""
+        self.sync_engine = SyncEngine(sample_rate=self.sample_rate)
+        self.active = True
+        self.start_time = time.time()
+        self.last_commentary_time = 0
+        self.last_sync_score = 0
+        self.last_sync_level = None
+        self.tick = 0
+        self._input_changed()
+
+    def stop(self):
+        """Mark the session inactive."""
+        self.active = False
+
+    def update_biometrics(self, person_id, heart_rate, breathing_rate):
+        """Store the latest Presage reading for one person."""
+        self.biometrics[person_id] = {
+            "heart_rate": heart_rate,
+            "breathing_rate": breathing_rate,
+            "timestamp": time.time(),
+        }
+        self._input_changed()
+
+    def ingest_samples(self, person_id, rows):
+        """
+        Buffer time-ordered [t, hr, br] samples for one person; the newest
+        becomes the current reading. Returns how many were new.
+        """
+        added = self.history.add_samples(person_id, rows)
+        if added:
+            _, heart_rate, breathing_rate = rows[-1]
+            self.update_biometrics(person_id, float(heart_rate), float(breathing_rate))
+        return added
+
+    def _inference_timed(self, model, seconds):
+        """One MediaPipe model run, for /metrics."""
+        VISION_INFERENCE.observe(seconds, self.session_id, model)
+
+    def _input_changed(self):
+        """Tell the update loop this active booth has new input."""
+        if self.on_input and self.active:
+            self.on_input(self.session_id)
+
+
+class SessionRegistry:
+    """Thread-safe map of booth/session id -> BoothSession."""
+
+    def __init__(self, sample_rate=2.0, on_input=None):
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.sample_rate = sample_rate
+        self.on_input = on_input
+
+    def get(self, session_id):
+        """Return the session for an id, or None if unknown."""
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def get_or_create(self, session_id):
+        """Return the session for an id, creating it on first use."""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = BoothSession(session_id, self.sample_rate, self.on_input)
+                self.sessions[session_id] = session
+            return session
+
+    def all_sessions(self):
+        """Snapshot of every known session."""
+        with self.lock:
+            return list(self.sessions.values())
+
+    def active_sessions(self):
+        """Snapshot of the sessions that are currently running."""
+        with self.lock:
+            return [s for s in self.sessions.values() if s.active]
@@ -0,0 +1,164 @@
+"""
+Delta-encoded state stream for display clients.
+
+Instead of sending the full nested state from _build_state on every tick,
+each booth's StateStream diffs it against the previous state and sends
+only the leaves that changed, keyed by dotted path ("sync.score"), with
+floats rounded. A full keyframe goes out every KEYFRAME_EVERY messages and to
+any client that joins or asks to resync, so a client never needs more
+than one keyframe plus the deltas after it.
+
+Messages go out on the 'state_delta' event:
+    keyframe: {"k": 1, "s": seq, "d": {path: value, ...}}
+    delta:    {"s": seq, "d": {changed path: value, ...}, "r": [removed paths]}
+
+seq increases by one per message, so a client that sees a gap emits
+'state_resync' and gets a fresh keyframe.
+
+STATE_PROTOCOL picks the wire format:
+- "json":    legacy full state on 'state_update' every tick
+- "delta":   JSON keyframes + deltas (default)
+- "msgpack": the same messages as MessagePack binary frames (needs msgpack)
+"""
+
+import os
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Digits kept per float field (others use FLOAT_DIGITS)
+FLOAT_DIGITS = 3
+FIELD_DIGITS = {
+    "timestamp": 2,
+    "session_duration": 1,
+}
+
+_MISSING = object()
+
+
+def quantize(path, value):
+    """Round a float leaf (or the floats in a list leaf) for the wire."""
+    kind = type(value)
+    if kind is float:
+        return round(value, FIELD_DIGITS.get(path, FLOAT_DIGITS))
+    if kind is list:
+        return [round(v, FLOAT_DIGITS) if type(v) is float else v for v in value]
+    return value
+
+
+def diff_into(state, previous, prefix, flat, changed, removed):
+    """
+    Walk `state` against the raw `previous` state, updating `flat` (dotted
+    path -> quantized leaf) in place and recording changed and removed
+    paths. Sub-dicts equal to their previous value are skipped whole.
+    """
+    for key, value in state.items():
+        old = previous.get(key, _MISSING)
+        if value == old:
+            continue
+        path = prefix + key
+        if type(value) is dict:
+            diff_into(value, old if type(old) is dict else {}, path + ".",
+                      flat, changed, removed)
+        else:
+            if type(value) is float:
+                leaf = round(value, FIELD_DIGITS.get(path, FLOAT_DIGITS))
+            else:
+                leaf = quantize(path, value)
+            if flat.get(path, _MISSING) != leaf:
+                flat[path] = leaf
+                changed[path] = leaf
+
+    if not previous.keys() <= state.keys():
+        for key in previous:
+            if key not in state:
+                path = prefix + key
+                nested = path + "."
+                for gone in [p for p in flat if p == path or p.startswith(nested)]:
+                    del flat[gone]
+                    removed.append(gone)
+
+
+class StateStream:
+    """Per-booth encoder: full state dicts in, wire messages out."""
+
+    EVENT = "state_delta"
+    LEGACY_EVENT = "state_update"
+
+    def __init__(self, protocol=None, keyframe_every=None):
+        env = os.environ.get
+        self.protocol = protocol or env("STATE_PROTOCOL", "delta")
+        if self.protocol == "msgpack" and msgpack is None:
+            print("Warning: msgpack not installed, using JSON state deltas")
+            self.protocol = "delta"
+        self.keyframe_every = int(keyframe_every or env("STATE_KEYFRAME_EVERY", "20"))
+
+        self.lock = threading.Lock()
+        self.previous = {}  # Raw state behind the last message
+        self.flat = {}      # Same state as the client sees it (flat, quantized)
+        self.seq = 0
+        self.since_keyframe = 0
+
+        self.messages = 0
+        self.keyframes = 0
+        self.fields_sent = 0
+
+    def encode(self, state):
+        """
+        Encode one full state for broadcast. Returns (event, payload), or
+        None when nothing changed.
+        """
+        if self.protocol == "json":
+            return self.LEGACY_EVENT, state
+
+        with self.lock:
+            changed = {}
+            removed = []
+            diff_into(state, self.previous, "", self.flat, changed, removed)
+            self.previous = state
+
+            self.seq += 1
+            if self.seq == 1 or self.since_keyframe + 1 >= self.keyframe_every:
+                self.since_keyframe = 0
+                self.keyframes += 1
+                message = {"k": 1, "s": self.seq, "d": dict(self.flat)}
+                self.fields_sent += len(self.flat)
+            elif changed or removed:
+                self.since_keyframe += 1
+                message = {"s": self.seq, "d": changed}
+                if removed:
+                    message["r"] = removed
+                self.fields_sent += len(changed)
+            else:
+                self.seq -= 1
+                return None
+            self.messages += 1
+        return self.EVENT, self._pack(message)
+
+    def keyframe(self):
+        """Current full state as a keyframe for one client (join/resync)."""
+        if self.protocol == "json":
+            return None
+        with self.lock:
+            message = {"k": 1, "s": self.seq, "d": dict(self.flat)}
+        return self.EVENT, self._pack(message)
+
+    def _pack(self, message):
+        if self.protocol == "msgpack":
+            return msgpack.packb(message, use_bin_type=True)
+        return message
+
+    def get_stats(self):
+        """Messages, keyframes and average fields per message."""
+        with self.lock:
+            return {
+                "protocol": self.protocol,
+                "messages": self.messages,
+                "keyframes": self.keyframes,
+                "fields_per_message": round(self.fields_sent / self.messages, 2)
+                if self.messages else 0.0,
+            }
+
@@ -0,0 +1,358 @@
+"""
+Streaming stem mixer for the reactive music system.
+
+Stems are never decoded into RAM. Each 16-bit PCM WAV is memory-mapped
+and read block by block (MIXER_BLOCK frames), looping at the end. Pages
+the play position has passed are released with madvise, so resident
+memory stays a few blocks per stem however long the stems are.
+
+Each block is mixed in NumPy. Every stem's gain moves toward its target
+with a per-sample linear ramp (MIXER_RAMP_MS for a full 0 -> 1 swing), so
+volume changes are smooth instead of stepping on every update. Silent
+stems are parked (not read); one that fades in joins at the same point
+of the loop as the loudest playing stem, and gain changes can be held
+for the next beat boundary (set_gains(on_beat=True)).
+
+A producer thread keeps MIXER_BUFFER_BLOCKS mixed blocks queued. The
+sink pulls one block per audio callback. If the queue is empty the sink
+plays silence and counts an underrun.
+
+Sinks:
+- "sdl":  pygame's SDL2 audio device callback (default)
+- "null": no audio output; blocks are consumed on a real-time clock (or
+          as fast as possible with realtime=False), for headless runs
+"""
+
+import collections
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+PAGE = mmap.PAGESIZE
+
+
+class WavStem:
+    """A 16-bit PCM WAV file, memory-mapped and read as looping stereo blocks."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, size, self.channels, self.sample_rate = self._parse_header()
+        self.frames = size // (2 * self.channels)
+        self.samples = np.frombuffer(self.mm, dtype="<i2", count=self.frames * self.channels,
+                                     offset=offset).reshape(self.frames, self.channels)
+        self.data_offset = offset
+        self.position = 0
+        self.released = offset - offset % PAGE  # File offset below which pages were dropped
+
+    def _parse_header(self):
+        """Offset and size of the data chunk, channel count and sample rate."""
+        mm = self.mm
+        if mm[0:4] != b"RIFF" or mm[8:12] != b"WAVE":
+            raise ValueError(f"{self.path}: not a WAV file")
+        pos = 12
+        fmt = None
+        while pos + 8 <= len(mm):
+            chunk_id, chunk_size = struct.unpack_from("<4sI", mm, pos)
+            body = pos + 8
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate = struct.unpack_from("<HHI", mm, body)
+                bits = struct.unpack_from("<H", mm, body + 14)[0]
+                if audio_format not in (1, 0xFFFE) or bits != 16:
+                    raise ValueError(f"{self.path}: only 16-bit PCM WAV stems can be streamed")
+                fmt = (channels, sample_rate)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{self.path}: data chunk before fmt chunk")
+                return body, min(chunk_size, len(mm) - body), fmt[0], fmt[1]
+            pos = body + chunk_size + (chunk_size & 1)
+        raise ValueError(f"{self.path}: no data chunk")
+
+    def read(self, frames, out):
+        """Fill out[:frames] (float32, stereo) with the next frames, looping."""
+        filled = 0
+        while filled < frames:
+            take = min(frames - filled, self.frames - self.position)
+            block = self.samples[self.position:self.position + take]
+            if self.channels == 1:
+                out[filled:filled + take] = block  # Broadcast mono to both channels
+            else:
+                out[filled:filled + take] = block[:, :2]
+            filled += take
+            self.position += take
+            if self.position >= self.frames:
+                self.position = 0
+                self.released = self.data_offset - self.data_offset % PAGE
+        self._release()
+
+    def _release(self):
+        """Drop mapped pages behind the play position from resident memory."""
+        if not hasattr(self.mm, "madvise"):
+            return
+        current = self.data_offset + self.position * 2 * self.channels
+        end = current - current % PAGE
+        if end - self.released >= 64 * PAGE:
+            self.mm.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+            self.released = end
+
+    def close(self):
+        self.samples = None
+        self.mm.close()
+        self.file.close()
+
+
+class StemMixer:
+    """Mixes looping stems with per-sample gain ramps into int16 stereo blocks."""
+
+    def __init__(self, sample_rate=44100, block=None, ramp_ms=None, buffer_blocks=None,
+                 sink=None, realtime=True):
+        env = os.environ.get
+        self.sample_rate = sample_rate
+        self.block = int(block or env("MIXER_BLOCK", "512"))
+        ramp_ms = float(ramp_ms or env("MIXER_RAMP_MS", "200"))
+        self.step = 1000.0 / (ramp_ms * sample_rate)  # Max gain change per sample
+        self.buffer_blocks = int(buffer_blocks or env("MIXER_BUFFER_BLOCKS", "4"))
+        self.sink_name = sink or env("MUSIC_SINK", "sdl")
+        self.realtime = realtime
+
+        self.stems = {}
+        self.gains = {}    # Current per-stem gain (end of the last mixed block)
+        self.targets = {}
+        self.on_beat = {}  # Target changes waiting for the next beat boundary
+        self.lock = threading.Lock()
+        self.ready = collections.deque()
+        self.space = threading.Condition()
+
+        self.ramp = np.arange(1, self.block + 1, dtype=np.float32) * self.step
+        self.stem_buf = np.zeros((self.block, 2), dtype=np.float32)
+        self.mix_buf = np.zeros((self.block, 2), dtype=np.float32)
+        self.gain_buf = np.zeros(self.block, dtype=np.float32)
+        self.silence = bytes(self.block * 4)
+
+        self.running = False
+        self.producer = None
+        self.sink_thread = None  # Null sink
+        self.device = None       # SDL audio device
+        self.blocks_mixed = 0
+        self.blocks_played = 0
+        self.underruns = 0
+        self.beat_changes = 0
+        self.mix_us = 0.0
+
+    def add_stem(self, name, path, gain=0.0, bpm=None):
+        """
+        Map a WAV stem; it plays from the start, looping, at `gain`. `bpm`
+        (the stem's tempo) enables beat-aligned changes, see set_gains.
+        """
+        stem = WavStem(path)
+        if stem.sample_rate != self.sample_rate:
+            print(f"Warning: {path} is {stem.sample_rate} Hz, mixer runs at {self.sample_rate} Hz")
+        stem.beat_frames = self.sample_rate * 60.0 / bpm if bpm else None
+        with self.lock:
+            self.stems[name] = stem
+            self.gains[name] = gain
+            self.targets[name] = gain
+
+    def set_gains(self, targets, on_beat=False):
+        """
+        Set target gains by stem name; gains ramp there sample by sample.
+        With on_beat=True the change waits for the next beat boundary of
+        the loudest playing stem (used to switch between tempo variants);
+        later plain set_gains calls for those stems update the pending
+        change instead of jumping ahead of it.
+        """
+        with self.lock:
+            if on_beat:
+                self.on_beat.update(targets)
+                return
+            for name, target in targets.items():
+                if name in self.on_beat:
+                    self.on_beat[name] = target
+                else:
+                    self.targets[name] = target
+
+    def mix_block(self):
+        """Mix the next block of all stems. Returns int16 stereo bytes."""
+        started = time.perf_counter()
+        mix = self.mix_buf
+        mix.fill(0.0)
+        with self.lock:
+            split = self._frames_to_beat() if self.on_beat else self.block
+        if split < self.block:
+            # Split the block at the beat so the change lands on it exactly
+            self._mix_segment(mix, 0, split)
+            with self.lock:
+                self.targets.update(self.on_beat)
+                self.on_beat.clear()
+                self.beat_changes += 1
+            self._mix_segment(mix, split, self.block)
+        else:
+            self._mix_segment(mix, 0, self.block)
+        np.clip(mix, -32768, 32767, out=mix)
+        data = mix.astype("<i2").tobytes()
+        elapsed = (time.perf_counter() - started) * 1e6
+        self.mix_us = elapsed if self.blocks_mixed == 0 else 0.95 * self.mix_us + 0.05 * elapsed
+        self.blocks_mixed += 1
+        return data
+
+    def _leader(self):
+        """The loudest playing stem, or None (lock held)."""
+        playing = [(gain, name) for name, gain in self.gains.items() if gain > 0.0]
+        return self.stems[max(playing)[1]] if playing else None
+
+    def _frames_to_beat(self):
+        """Frames until the leader's next beat boundary (0 without a beat grid; lock held)."""
+        leader = self._leader()
+        if leader is None or not leader.beat_frames:
+            return 0
+        beats = leader.position / leader.beat_frames
+        return int(round((np.ceil(beats) - beats) * leader.beat_frames))
+
+    def _mix_segment(self, mix, start, end):
+        """Add frames [start, end) of every audible stem into mix."""
+        n = end - start
+        if n <= 0:
+            return
+        with self.lock:
+            items = [(name, stem, self.gains[name], self.targets[name])
+                     for name, stem in self.stems.items()]
+            leader = self._leader()
+            # Loop position shared by the playing stems, before any is read
+            loop_fraction = leader.position / leader.frames if leader else None
+        for name, stem, gain, target in items:
+            if gain == 0.0:
+                if target == 0.0:
+                    continue  # Parked: silent stems are not read at all
+                if loop_fraction is not None:
+                    # Waking up: join at the same point of the loop as the
+                    # leader (the same beat, for a tempo variant of it)
+                    stem.position = int(loop_fraction * stem.frames) % stem.frames
+            buf = self.stem_buf[:n]
+            stem.read(n, buf)
+            delta = target - gain
+            if delta == 0.0:
+                mix[start:end] += buf * gain
+            else:
+                # Linear ramp toward the target, holding once it is reached
+                ramp = self.gain_buf[:n]
+                np.minimum(self.ramp[:n], abs(delta), out=ramp)
+                if delta < 0:
+                    np.negative(ramp, out=ramp)
+                ramp += gain
+                mix[start:end] += buf * ramp[:, None]
+                gain = target if self.ramp[n - 1] >= abs(delta) else float(ramp[-1])
+            with self.lock:
+                self.gains[name] = gain
+
+    def next_block(self):
+        """Sink side: the next mixed block, or silence (an underrun) if none is ready."""
+        try:
+            data = self.ready.popleft()
+        except IndexError:
+            self.underruns += 1
+            return self.silence
+        with self.space:
+            self.space.notify()
+        self.blocks_played += 1
+        return data
+
+    def start(self):
+        """Start the producer thread and the sink."""
+        if self.running:
+            return
+        self.running = True
+        for _ in range(self.buffer_blocks):
+            self.ready.append(self.mix_block())
+        self.producer = threading.Thread(target=self._produce, daemon=True)
+        self.producer.start()
+        if self.sink_name == "null":
+            self.sink_thread = threading.Thread(target=self._null_sink, daemon=True)
+            self.sink_thread.start()
+        else:
+            self._open_sdl()
+
+    def stop(self):
+        """Stop the sink and the producer."""
+        self.running = False
+        with self.space:
+            self.space.notify()
+        if self.device is not None:
+            self.device.pause(1)
+            self.device.close()
+            self.device = None
+        for thread in (self.producer, self.sink_thread):
+            if thread is not None:
+                thread.join(1.0)
+        self.producer = self.sink_thread = None
+        self.ready.clear()
+
+    def _produce(self):
+        while self.running:
+            with self.space:
+                while self.running and len(self.ready) >= self.buffer_blocks:
+                    self.space.wait(0.1)
+            if self.running:
+                self.ready.append(self.mix_block())
+
+    def _null_sink(self):
+        """Consume blocks like an audio device would, without output."""
+        period = self.block / self.sample_rate
+        deadline = time.monotonic()
+        while self.running:
+            self.next_block()
+            if self.realtime:
+                deadline += period
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _open_sdl(self):
+        from pygame._sdl2 import audio as sdl_audio
+        from pygame._sdl2 import sdl2
+
+        # Only the audio subsystem: pygame.mixer.init() would open a second device
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+        names = sdl_audio.get_audio_device_names(False)
+
+        def callback(device, stream):
+            stream[:] = self.next_block()
+
+        self.device = sdl_audio.AudioDevice(
+            devicename=names[0] if names else None,
+            iscapture=False,
+            frequency=self.sample_rate,
+            audioformat=sdl_audio.AUDIO_S16SYS,
+            numchannels=2,
+            chunksize=self.block,
+            allowed_changes=0,
+            callback=callback,
+        )
+        self.device.pause(0)
+
+    def close(self):
+        self.stop()
+        for stem in self.stems.values():
+            stem.close()
+        self.stems.clear()
+
+    def get_stats(self):
+        """Blocks mixed/played, underruns, mix time per block and current gains."""
+        with self.lock:
+            gains = {name: round(gain, 3) for name, gain in self.gains.items()}
+        return {
+            "sink": self.sink_name,
+            "blocks_mixed": self.blocks_mixed,
+            "blocks_played": self.blocks_played,
+            "underruns": self.underruns,
+            "buffered_blocks": len(self.ready),
+            "mix_us_per_block": round(self.mix_us, 1),
+            "beat_changes": self.beat_changes,
+            "pending_on_beat": len(self.on_beat),
+            "block_ms": round(1000 * self.block / self.sample_rate, 2),
+            "gains": gains,
+        }
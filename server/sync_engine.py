@@ -1,6 +1,8 @@
 import numpy as np
 from collections import deque
 
+from physio_sync import PhysioSync
+
 class SyncEngine:
     """
     Fuses multiple sensing channels into a single sync score (0.0 to 1.0).
@@ -12,28 +14,58 @@ class SyncEngine:
     - Mutual smiling:         0.15  (emotional expression)
     - Hand proximity:         0.15  (physical touch/closeness)
 
+    Physiological synchrony channels from PhysioSync (windowed lagged
+    cross-correlation of HR and breathing, HR phase locking and HR trend
+    agreement) are computed every tick; their weights default to 0.0
+    until retuned.
+
     The score is smoothed over time to avoid jumpy changes.
     """
 
-    def __init__(self):
-        self.score_history = deque(maxlen=10)  # For smoothing
-        self.hr_history_a = deque(maxlen=30)
-        self.hr_history_b = deque(maxlen=30)
+    # Channel weights, summed in this order by both compute() and
+    # compute_batch() so the two paths stay bit-for-bit identical
+    WEIGHTS = {
+        "hr": 0.35,
+        "eye": 0.20,
+        "br": 0.15,
+        "smile": 0.15,
+        "hand": 0.15,
+        "hr_xcorr": 0.0,
+        "br_xcorr": 0.0,
+        "hr_plv": 0.0,
+        "trend_sync": 0.0,
+    }
+    PHYSIO_CHANNELS = ("hr_xcorr", "br_xcorr", "hr_plv", "trend_sync")
+    SMOOTHING_WINDOW = 10
+
+    # Level codes used by compute_batch(): LEVELS[code] is the level name
+    LEVELS = ("disconnected", "warming_up", "connecting", "deeply_connected")
+    LEVEL_THRESHOLDS = (0.25, 0.50, 0.75)
+
+    def __init__(self, sample_rate=2.0):
+        self.sample_rate = sample_rate  # compute() calls per second
+        self.score_history = deque(maxlen=self.SMOOTHING_WINDOW)  # For smoothing
+        self.score_sum = 0.0
+        self.physio = PhysioSync(sample_rate=sample_rate)
 
     def compute(self, hr_a, hr_b, br_a, br_b,
                 eye_contact, both_smiling,
-                hands_touching, hand_distance, face_distance):
+                hands_touching, hand_distance, face_distance,
+                advance=True):
         """
         Compute the sync score from all inputs.
         Returns dict with score, level, and component breakdowns.
+
+        Each call with advance=True is one sample (1 / sample_rate seconds)
+        of smoothing and physiological history. advance=False scores the
+        inputs as if they were the next sample without recording them, for
+        refreshes between samples.
         """
 
         # --- Heart Rate Sync (0.0 to 1.0) ---
         if hr_a > 0 and hr_b > 0:
             hr_diff = abs(hr_a - hr_b)
             hr_sync = max(0.0, 1.0 - (hr_diff / 20.0))
-            self.hr_history_a.append(hr_a)
-            self.hr_history_b.append(hr_b)
         else:
             hr_sync = 0.0
 
@@ -56,18 +88,37 @@ class SyncEngine:
         else:
             hand_score = max(0.0, 1.0 - (hand_distance / 0.3))
 
+        # --- Physiological synchrony (windowed, incremental) ---
+        if advance:
+            self.physio.update(hr_a, hr_b, br_a, br_b)
+        physio = self.physio.channels()
+
         # --- Weighted combination ---
+        w = self.WEIGHTS
         raw_score = (
-            0.35 * hr_sync +
-            0.20 * eye_score +
-            0.15 * br_sync +
-            0.15 * smile_score +
-            0.15 * hand_score
+            w["hr"] * hr_sync +
+            w["eye"] * eye_score +
+            w["br"] * br_sync +
+            w["smile"] * smile_score +
+            w["hand"] * hand_score +
+            w["hr_xcorr"] * physio["hr_xcorr"] +
+            w["br_xcorr"] * physio["br_xcorr"] +
+            w["hr_plv"] * physio["hr_plv"] +
+            w["trend_sync"] * physio["trend_sync"]
         )
 
-        # --- Smoothing (exponential moving average with history) ---
-        self.score_history.append(raw_score)
-        smoothed = np.mean(self.score_history)
+        # --- Smoothing (running mean over the last few ticks) ---
+        if len(self.score_history) == self.score_history.maxlen:
+            oldest = self.score_history[0]
+        else:
+            oldest = 0.0
+        if advance:
+            self.score_history.append(raw_score)
+            self.score_sum += raw_score - oldest
+            smoothed = max(0.0, self.score_sum / len(self.score_history))
+        else:
+            count = min(len(self.score_history) + 1, self.SMOOTHING_WINDOW)
+            smoothed = max(0.0, (self.score_sum + raw_score - oldest) / count)
 
         # --- Determine level ---
         if smoothed >= 0.75:
@@ -88,4 +139,141 @@ class SyncEngine:
             "both_smiling": both_smiling,
             "hand_score": round(float(hand_score), 3),
             "raw_score": round(float(raw_score), 3),
+            "hr_xcorr": round(float(physio["hr_xcorr"]), 3),
+            "br_xcorr": round(float(physio["br_xcorr"]), 3),
+            "hr_plv": round(float(physio["hr_plv"]), 3),
+            "trend_sync": round(float(physio["trend_sync"]), 3),
+            "hr_lag": round(float(physio["hr_lag"]), 3),
         }
+
+    def compute_batch(self, hr_a, hr_b, br_a, br_b,
+                      eye_contact, both_smiling,
+                      hands_touching, hand_distance,
+                      include_physio=False):
+        """
+        Score many ticks at once (for offline re-scoring of logged sessions).
+
+        Inputs are aligned arrays with time on the last axis: shape (T,)
+        for one session or (S, T) for S sessions of equal length. Each
+        session is scored as if its ticks were fed in order to a fresh
+        SyncEngine, and the streaming state of this engine is not touched.
+
+        Returns a dict of arrays with the same keys as compute(); values
+        match compute() bit for bit, except "level", which holds int8
+        codes indexing SyncEngine.LEVELS.
+
+        The physiological channels are inherently sequential, so they are
+        only computed (by stepping a PhysioSync per session, much slower
+        than the rest) when include_physio is set or one of their weights
+        is non-zero; otherwise they are left out of the result.
+        """
+        hr_a = np.asarray(hr_a, dtype=np.float64)
+        hr_b = np.asarray(hr_b, dtype=np.float64)
+        br_a = np.asarray(br_a, dtype=np.float64)
+        br_b = np.asarray(br_b, dtype=np.float64)
+        eye_contact = np.asarray(eye_contact, dtype=bool)
+        both_smiling = np.asarray(both_smiling, dtype=bool)
+        hands_touching = np.asarray(hands_touching, dtype=bool)
+        hand_distance = np.asarray(hand_distance, dtype=np.float64)
+
+        # --- Per-channel scores (same formulas as compute) ---
+        hr_sync = np.where(
+            (hr_a > 0) & (hr_b > 0),
+            np.maximum(0.0, 1.0 - (np.abs(hr_a - hr_b) / 20.0)),
+            0.0,
+        )
+        br_sync = np.where(
+            (br_a > 0) & (br_b > 0),
+            np.maximum(0.0, 1.0 - (np.abs(br_a - br_b) / 10.0)),
+            0.0,
+        )
+        eye_score = np.where(eye_contact, 1.0, 0.0)
+        smile_score = np.where(both_smiling, 1.0, 0.0)
+        hand_score = np.where(
+            hands_touching, 1.0,
+            np.maximum(0.0, 1.0 - (hand_distance / 0.3)),
+        )
+
+        w = self.WEIGHTS
+        if include_physio or any(w[name] for name in self.PHYSIO_CHANNELS):
+            physio = self._physio_batch(hr_a, hr_b, br_a, br_b)
+        else:
+            physio = None
+        zeros = np.zeros(hr_sync.shape)
+        channels = physio or {name: zeros for name in self.PHYSIO_CHANNELS}
+
+        raw_score = (
+            w["hr"] * hr_sync +
+            w["eye"] * eye_score +
+            w["br"] * br_sync +
+            w["smile"] * smile_score +
+            w["hand"] * hand_score +
+            w["hr_xcorr"] * channels["hr_xcorr"] +
+            w["br_xcorr"] * channels["br_xcorr"] +
+            w["hr_plv"] * channels["hr_plv"] +
+            w["trend_sync"] * channels["trend_sync"]
+        )
+
+        smoothed = _rolling_mean(raw_score, self.SMOOTHING_WINDOW)
+
+        level = np.zeros(smoothed.shape, dtype=np.int8)
+        for threshold in self.LEVEL_THRESHOLDS:
+            level += smoothed >= threshold
+
+        result = {
+            "score": _round_like_python(smoothed, 3),
+            "level": level,
+            "hr_sync": _round_like_python(hr_sync, 3),
+            "br_sync": _round_like_python(br_sync, 3),
+            "eye_contact": eye_contact,
+            "both_smiling": both_smiling,
+            "hand_score": _round_like_python(hand_score, 3),
+            "raw_score": _round_like_python(raw_score, 3),
+        }
+        if physio:
+            for name, values in physio.items():
+                result[name] = _round_like_python(values, 3)
+        return result
+
+    def _physio_batch(self, hr_a, hr_b, br_a, br_b):
+        """Step a fresh PhysioSync through each session's ticks."""
+        shape = np.broadcast(hr_a, hr_b, br_a, br_b).shape
+        rows = [np.broadcast_to(x, shape).reshape(-1, shape[-1])
+                for x in (hr_a, hr_b, br_a, br_b)]
+        names = self.PHYSIO_CHANNELS + ("hr_lag",)
+        out = {name: np.zeros(rows[0].shape) for name in names}
+
+        for row in range(rows[0].shape[0]):
+            physio = PhysioSync(sample_rate=self.sample_rate)
+            for t in range(rows[0].shape[1]):
+                physio.update(*(float(x[row, t]) for x in rows))
+                channels = physio.channels()
+                for name in names:
+                    out[name][row, t] = channels[name]
+
+        return {name: values.reshape(shape) for name, values in out.items()}
+
+
+def _rolling_mean(values, window):
+    """
+    Trailing mean over the last `window` samples along the last axis,
+    matching compute()'s running-sum smoothing bit for bit (np.cumsum
+    adds strictly in order, like the streaming sum).
+    """
+    deltas = values.copy()
+    deltas[..., window:] = values[..., window:] - values[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return np.maximum(0.0, np.cumsum(deltas, axis=-1) / counts)
+
+
+def _round_like_python(values, ndigits):
+    """Vectorized equivalent of round(float(x), ndigits) for each element."""
+    rounded = np.round(values, ndigits)
+    # np.round scales by 10**ndigits before rounding, so it can only
+    # disagree with Python's correctly rounded round() when the scaled
+    # value sits within float error of a .5 tie; redo those few exactly
+    scaled = values * 10.0 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(v), ndigits) for v in values[near_tie]]
+    return rounded
@@ -0,0 +1,164 @@
+"""
+Offline tempo-variant cache for the music stems.
+
+Time-stretching in real time is too expensive on the booth hardware, so
+each stem is rendered ahead of time at a ladder of tempos (a phase
+vocoder: same pitch, different speed) into
+MUSIC_TEMPO_CACHE/<stem>_<bpm>bpm.wav. At runtime MusicController only
+crossfades between these files (see StemMixer.set_gains(on_beat=True)).
+
+Stems are treated as loops: the signal is wrapped around before
+stretching so each variant still loops without a click.
+
+Build the cache (prints build time per variant):
+    python server/tempo_variants.py [audio_dir]
+
+MUSIC_BPM is the stems' recorded tempo, MUSIC_TEMPO_LADDER the tempos to
+render (comma-separated BPM).
+"""
+
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+DEFAULT_AUDIO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "audio")
+DEFAULT_LADDER = "60,66,72,80,88,96,108,120"
+
+N_FFT = 2048
+HOP = 512
+CHUNK_STEPS = 1024  # Output frames synthesized per chunk (bounds memory)
+
+
+def tempo_settings():
+    """(recorded bpm, ladder of bpms, cache dir) from the environment."""
+    env = os.environ.get
+    native = float(env("MUSIC_BPM", "72"))
+    ladder = sorted({int(b) for b in env("MUSIC_TEMPO_LADDER", DEFAULT_LADDER).split(",") if b.strip()})
+    cache_dir = env("MUSIC_TEMPO_CACHE") or os.path.join(DEFAULT_AUDIO_DIR, "tempo_cache")
+    return native, ladder, cache_dir
+
+
+def variant_path(cache_dir, stem, bpm):
+    return os.path.join(cache_dir, f"{stem}_{int(bpm)}bpm.wav")
+
+
+def read_wav(path):
+    """16-bit PCM WAV -> (float32 samples (frames, channels), sample rate)."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV stems are supported")
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        return data.reshape(-1, w.getnchannels()).astype(np.float32), w.getframerate()
+
+
+def write_wav(path, samples, sample_rate):
+    data = np.clip(np.rint(samples), -32768, 32767).astype("<i2")
+    tmp_path = path + ".tmp"
+    with wave.open(tmp_path, "wb") as w:
+        w.setnchannels(samples.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data.tobytes())
+    os.replace(tmp_path, path)
+
+
+def time_stretch(x, rate):
+    """
+    Phase-vocoder time stretch of one looping channel: returns
+    round(len(x) / rate) samples at the same pitch (rate > 1 is faster).
+    """
+    if rate == 1.0:
+        return x.copy()
+    window = np.hanning(N_FFT).astype(np.float32)
+    # Wrap the loop around on both sides so the edges stretch like the middle
+    padded = np.concatenate([x[-N_FFT:], x, x[:N_FFT]])
+    frames = np.lib.stride_tricks.sliding_window_view(padded, N_FFT)[::HOP]
+    count = len(frames)
+    bins = N_FFT // 2 + 1
+    omega = 2 * np.pi * HOP * np.arange(bins) / N_FFT
+
+    steps = np.arange(0, count - 1, rate)
+    out = np.zeros(len(steps) * HOP + N_FFT, dtype=np.float32)
+    norm = np.zeros_like(out)
+    phase = None
+    win_sq = window ** 2
+
+    for start in range(0, len(steps), CHUNK_STEPS):
+        t = steps[start:start + CHUNK_STEPS]
+        first, last = int(t[0]), min(int(t[-1]) + 2, count)
+        spectrum = np.fft.rfft(frames[first:last] * window, axis=1)
+        index = t.astype(int) - first
+        frac = (t - np.floor(t))[:, None]
+        nxt = np.minimum(index + 1, last - first - 1)
+
+        mag = (1 - frac) * np.abs(spectrum[index]) + frac * np.abs(spectrum[nxt])
+        dphi = np.angle(spectrum[nxt]) - np.angle(spectrum[index]) - omega
+        dphi -= 2 * np.pi * np.round(dphi / (2 * np.pi))
+        # Each output frame takes the phase accumulated over the steps before it
+        if phase is None:
+            phase = np.angle(spectrum[index[0]])
+        advance = np.cumsum(omega + dphi, axis=0)
+        phases = np.empty_like(advance)
+        phases[0] = phase
+        phases[1:] = phase + advance[:-1]
+        phase = phase + advance[-1]
+
+        chunk = np.fft.irfft(mag * np.exp(1j * phases), n=N_FFT, axis=1).astype(np.float32)
+        for k, frame in enumerate(chunk * window):
+            offset = (start + k) * HOP
+            out[offset:offset + N_FFT] += frame
+            norm[offset:offset + N_FFT] += win_sq
+
+    out /= np.maximum(norm, 1e-3)
+    head = int(round(N_FFT / rate))
+    length = int(round(len(x) / rate))
+    return out[head:head + length]
+
+
+def build_cache(audio_dir=None, stems=("harmony", "neutral", "tension")):
+    """
+    Render every stem at every ladder tempo that is not cached yet.
+    Returns a report: seconds per variant and totals.
+    """
+    audio_dir = audio_dir or DEFAULT_AUDIO_DIR
+    native, ladder, cache_dir = tempo_settings()
+    os.makedirs(cache_dir, exist_ok=True)
+    report = {"native_bpm": native, "variants": {}, "built": 0, "skipped": 0, "seconds": 0.0}
+
+    for stem in stems:
+        source = os.path.join(audio_dir, f"{stem}.wav")
+        if not os.path.exists(source):
+            print(f"Warning: {source} not found, skipping")
+            continue
+        samples, sample_rate = None, None
+        for bpm in ladder:
+            if bpm == native:
+                continue  # The stem itself
+            path = variant_path(cache_dir, stem, bpm)
+            if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+                report["skipped"] += 1
+                continue
+            if samples is None:
+                samples, sample_rate = read_wav(source)
+            started = time.perf_counter()
+            rate = bpm / native
+            stretched = np.stack([time_stretch(samples[:, c], rate)
+                                  for c in range(samples.shape[1])], axis=1)
+            write_wav(path, stretched, sample_rate)
+            elapsed = time.perf_counter() - started
+            report["variants"][f"{stem}@{bpm}"] = round(elapsed, 2)
+            report["built"] += 1
+            report["seconds"] += elapsed
+            print(f"  {stem} @ {bpm} BPM: {elapsed:.2f} s "
+                  f"({len(samples) / sample_rate / max(elapsed, 1e-9):.0f}x real time)")
+    report["seconds"] = round(report["seconds"], 2)
+    return report
+
+
+if __name__ == "__main__":
+    report = build_cache(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"Built {report['built']} variants in {report['seconds']} s "
+          f"({report['skipped']} already cached)")
@@ -0,0 +1,127 @@
+"""
+Drift-free, event-driven scheduling for the server update loop.
+
+Scheduled ticks fall on a fixed grid (start + k * period), so time spent
+in a tick never pushes later ticks back. A tick that wakes late but
+within one period catches up on the grid; when whole periods are missed
+they are counted and skipped rather than run back to back.
+
+Between ticks, trigger(key) asks for an immediate refresh of one booth
+(new biometrics, new vision state). Triggers are coalesced: any number
+arriving before the loop wakes give one refresh per key, refreshes are
+at least min_interval apart, and a scheduled tick absorbs any pending
+triggers. With nothing to update the loop sleeps until a trigger arrives.
+
+Defaults come from UPDATE_RATE (ticks per second) and
+UPDATE_MIN_INTERVAL (seconds between triggered refreshes).
+"""
+
+import os
+import threading
+import time
+
+
+class TickScheduler:
+    """Fixed-rate tick grid plus coalesced, rate-limited input triggers."""
+
+    TICK = "tick"
+    REFRESH = "refresh"
+
+    def __init__(self, rate=None, min_interval=None):
+        env = os.environ.get
+        self.rate = float(rate or env("UPDATE_RATE", "2"))
+        self.period = 1.0 / self.rate
+        if min_interval is None:
+            min_interval = env("UPDATE_MIN_INTERVAL", "0.05")
+        self.min_interval = float(min_interval)
+
+        self.cond = threading.Condition()
+        self.pending = set()       # Keys triggered since the last wake-up
+        self.next_deadline = None  # None until the grid (re)starts
+        self.last_refresh = 0.0
+
+        self.ticks = 0
+        self.refreshes = 0
+        self.triggers = 0
+        self.delivered = 0  # Keys handed out by refreshes
+        self.missed = 0
+        self.jitter = {"last_ms": 0.0, "avg_ms": 0.0, "max_ms": 0.0}
+
+    def trigger(self, key):
+        """Request a refresh for `key` as soon as the rate limit allows."""
+        with self.cond:
+            self.triggers += 1
+            self.pending.add(key)
+            self.cond.notify()
+
+    def wait(self, idle=False):
+        """
+        Block until the next tick or triggered refresh is due. Returns
+        (TICK, None) or (REFRESH, keys). With idle=True there is nothing
+        to tick: only wait for a trigger, and restart the grid afterwards.
+        """
+        with self.cond:
+            if idle:
+                self.next_deadline = None
+                self.cond.wait_for(lambda: self.pending)
+                return self._refresh(time.monotonic())
+
+            if self.next_deadline is None:
+                self.next_deadline = time.monotonic()
+
+            while True:
+                now = time.monotonic()
+                if now >= self.next_deadline:
+                    return self._tick(now)
+
+                timeout = self.next_deadline - now
+                if self.pending:
+                    refresh_at = self.last_refresh + self.min_interval
+                    if now >= refresh_at:
+                        return self._refresh(now)
+                    timeout = min(timeout, refresh_at - now)
+                self.cond.wait(timeout)
+
+    def _tick(self, now):
+        """Account for a due tick and advance the grid (lock held)."""
+        late = now - self.next_deadline
+        missed = int(late // self.period)
+        if missed:
+            # Skip whole missed periods instead of bursting to catch up
+            self.missed += missed
+            late -= missed * self.period
+        self.next_deadline += (missed + 1) * self.period
+
+        late_ms = late * 1000
+        avg = self.jitter["avg_ms"]
+        self.jitter["last_ms"] = late_ms
+        self.jitter["avg_ms"] = late_ms if self.ticks == 0 else 0.9 * avg + 0.1 * late_ms
+        self.jitter["max_ms"] = max(self.jitter["max_ms"], late_ms)
+        self.ticks += 1
+
+        self.pending.clear()  # A tick updates every booth anyway
+        return self.TICK, None
+
+    def _refresh(self, now):
+        """Hand out the pending keys (lock held)."""
+        keys = self.pending
+        self.pending = set()
+        self.last_refresh = now
+        self.refreshes += 1
+        self.delivered += len(keys)
+        return self.REFRESH, keys
+
+    def get_stats(self):
+        """Tick/refresh counts, tick jitter and missed deadlines."""
+        with self.cond:
+            scheduled = self.ticks + self.missed
+            return {
+                "rate": self.rate,
+                "ticks": self.ticks,
+                "refreshes": self.refreshes,
+                "triggers": self.triggers,
+                "coalesced": self.triggers - self.delivered,
+                "missed_deadlines": self.missed,
+                "miss_ratio": round(self.missed / scheduled, 4) if scheduled else 0.0,
+                "jitter": {k: round(v, 2) for k, v in self.jitter.items()},
+            }
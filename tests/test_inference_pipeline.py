@@ -0,0 +1,82 @@
+"""
+VISION_PIPELINE=process: workers are spawned, and a spawned child
+re-imports the parent's main module. Importing server/app.py (as the
+child does) must not build any server component: no MongoWriter on the
+shared spool, no audio device, no narration or commentary threads.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# server/app.py imports every component's client library
+for module in ("flask_socketio", "flask_cors", "dotenv", "pymongo", "mediapipe", "elevenlabs",
+               "google.generativeai", "pygame"):
+    pytest.importorskip(module)
+
+DRIVER = """
+import json
+import os
+import queue
+import sys
+
+sys.path[:0] = [{server!r}, {root!r}]
+import app  # The spawned child imports this file, and with it app.py, again
+
+from vision.inference_pipeline import InferencePipeline
+
+COMPONENTS = ("scheduler", "registry", "gemini", "narrator", "mongo", "music",
+              "led_feed", "ingest", "commentary")
+
+
+def built():
+    return [name for name in COMPONENTS if getattr(app, name) is not None]
+
+
+class Probe:
+    def process(self, frame):
+        return None
+
+
+def make_probe():
+    return Probe()
+
+
+def report(results, w, h):
+    return {{"pid": os.getpid(), "built": built()}}
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    results = queue.Queue()
+    pipeline = InferencePipeline(
+        {{"probe": (make_probe, report)}},
+        lambda seq, captured_at, fields, timings: results.put(fields["probe"]),
+        mode="process",
+    )
+    pipeline.submit(1, np.zeros((4, 4, 3), dtype=np.uint8), ["probe"], 0.0)
+    child = results.get(timeout=60)
+    pipeline.close()
+    print(json.dumps({{"pid": os.getpid(), "built": built(), "child": child}}))
+"""
+
+
+def test_process_workers_do_not_build_the_server(tmp_path):
+    driver = tmp_path / "driver.py"
+    driver.write_text(DRIVER.format(server=os.path.join(ROOT, "server"), root=ROOT))
+    env = dict(os.environ, MONGO_SPOOL_PATH=str(tmp_path / "spool.jsonl"))
+    done = subprocess.run([sys.executable, str(driver)], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert done.returncode == 0, done.stderr
+
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    assert result["child"]["pid"] != result["pid"]
+    assert result["built"] == []
+    assert result["child"]["built"] == []
+    assert not (tmp_path / "spool.jsonl").exists()
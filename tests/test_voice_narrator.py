@@ -0,0 +1,49 @@
+"""VoiceNarrator queue: superseding stale lines and the NARRATION_QUEUE_SIZE bound."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server"))
+pytest.importorskip("elevenlabs")
+
+from elevenlabs_client import VoiceNarrator  # noqa: E402
+
+LEVEL_CHANGE, FILLER = VoiceNarrator.LEVEL_CHANGE, VoiceNarrator.FILLER
+
+
+@pytest.fixture
+def narrator(tmp_path, monkeypatch):
+    """A narrator whose worker never drains the queue."""
+    monkeypatch.setenv("TTS_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("NARRATION_QUEUE_SIZE", "4")
+    monkeypatch.setattr(VoiceNarrator, "_run", lambda self: None)
+    return VoiceNarrator()
+
+
+def waiting(narrator):
+    return [text for _, _, text, _ in sorted(narrator.queue)]
+
+
+def test_new_line_supersedes_stale_lines_below_the_queue_bound(narrator):
+    narrator.speak("filler 1", FILLER)
+    narrator.speak("filler 2", FILLER)
+    assert waiting(narrator) == ["filler 2"]
+
+    narrator.speak("level 1", LEVEL_CHANGE)
+    narrator.speak("level 2", LEVEL_CHANGE)
+    assert waiting(narrator) == ["level 2"]
+    assert narrator.get_stats()["superseded"] == 3
+
+    # Less important lines wait behind a level change without replacing it
+    narrator.speak("filler 3", FILLER)
+    assert waiting(narrator) == ["level 2", "filler 3"]
+
+
+def test_line_is_dropped_when_more_important_lines_fill_the_queue(narrator):
+    narrator.max_queue = 1
+    narrator.speak("level", LEVEL_CHANGE)
+    narrator.speak("filler", FILLER)
+    assert waiting(narrator) == ["level"]
+    assert narrator.get_stats()["dropped"] == 1
@@ -0,0 +1,213 @@
+"""
+Pipelined face + hand inference for ConnectionTracker.
+
+Each model runs on its own worker (thread or process). The capture loop
+copies a frame once into a shared, read-only ring of frame slots and
+hands the slot to every due model that is idle; it then goes straight
+back to capturing, so capture of frame N+1 overlaps inference on frame N.
+Each model has at most one frame in flight, so a slow model skips frames
+instead of building a backlog of stale ones. A collector thread joins the
+per-model results by frame sequence number and hands the joined result to
+a callback.
+
+Workers are described by (make_model, analyze) pairs: make_model() builds
+the model inside the worker, analyze(results, w, h) turns its output into
+a small dict of state fields. Process workers need both to be picklable
+(module-level functions or plain objects such as the landmark analyzers).
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameBuffer:
+    """Fixed ring of frame slots in shared memory, usable across processes."""
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, slot, frame):
+        """Copy a frame into a slot (caller guarantees the slot is free)."""
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+        view[...] = frame
+
+    def view(self, slot, shape):
+        """Read-only view of the frame stored in a slot."""
+        frame = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf,
+                           offset=slot * self.slot_bytes)
+        frame.flags.writeable = False
+        return frame
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_loop(name, make_model, analyze, jobs, results, frames):
+    """Run one model over (seq, slot, shape) jobs until a None job arrives."""
+    model = make_model()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        seq, slot, shape = job
+        started = time.perf_counter()
+        try:
+            frame = frames.view(slot, shape)
+            fields = analyze(model.process(frame), shape[1], shape[0])
+        except Exception as e:
+            print(f"Vision worker error ({name}): {e}")
+            fields = None
+        results.put((seq, name, fields, time.perf_counter() - started))
+
+
+def _process_worker(name, make_model, analyze, jobs, results, shm_name, slots, slot_bytes):
+    """Process entry point: attach to the shared frame ring, then run the loop."""
+    frames = SharedFrameBuffer(slots, slot_bytes, name=shm_name)
+    try:
+        _worker_loop(name, make_model, analyze, jobs, results, frames)
+    finally:
+        frames.close()
+
+
+class InferencePipeline:
+    """
+    Runs each model on its own worker and joins results by frame sequence.
+
+    on_result(seq, captured_at, fields, timings) is called from the
+    collector thread once every model submitted for a frame has finished;
+    fields maps model name -> state fields (None if that model failed) and
+    timings maps model name -> inference seconds.
+    """
+
+    def __init__(self, workers, on_result, mode="thread", slots=3):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown pipeline mode: {mode}")
+        self.workers = workers
+        self.on_result = on_result
+        self.mode = mode
+        self.slots = slots
+
+        self.frames = None
+        self.jobs = {}
+        self.handles = []
+        self.collector = None
+
+        self.lock = threading.Lock()
+        self.free_slots = list(range(slots))
+        self.busy = set()  # Models with a frame in flight
+        self.pending = {}  # seq -> [slot, captured_at, expected, fields, timings]
+        self.dropped = 0
+
+    def _start(self, slot_bytes):
+        """Allocate the frame ring and start workers (on the first frame)."""
+        self.frames = SharedFrameBuffer(self.slots, slot_bytes)
+        if self.mode == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self.results = ctx.Queue()
+        else:
+            self.results = queue.Queue()
+
+        for name, (make_model, analyze) in self.workers.items():
+            if self.mode == "process":
+                jobs = ctx.Queue()
+                handle = ctx.Process(
+                    target=_process_worker,
+                    args=(name, make_model, analyze, jobs, self.results,
+                          self.frames.name, self.slots, slot_bytes),
+                    daemon=True,
+                )
+            else:
+                jobs = queue.Queue()
+                handle = threading.Thread(
+                    target=_worker_loop,
+                    args=(name, make_model, analyze, jobs, self.results, self.frames),
+                    daemon=True,
+                )
+            handle.start()
+            self.jobs[name] = jobs
+            self.handles.append(handle)
+
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+    def in_flight(self):
+        """Models with a frame in flight (the capture loop skips them)."""
+        with self.lock:
+            return set(self.busy)
+
+    def submit(self, seq, frame, models, captured_at):
+        """
+        Queue one frame for those of the given models that are idle. Never
+        blocks: returns False (and counts a drop) when none of them are.
+        """
+        if self.frames is None:
+            self._start(frame.nbytes)
+        if frame.nbytes > self.frames.slot_bytes:
+            self.dropped += 1
+            return False
+
+        with self.lock:
+            models = [name for name in models if name not in self.busy]
+            if not models or not self.free_slots:
+                self.dropped += 1
+                return False
+            slot = self.free_slots.pop()
+            self.busy.update(models)
+            self.pending[seq] = [slot, captured_at, set(models), {}, {}]
+
+        self.frames.write(slot, frame)
+        for name in models:
+            self.jobs[name].put((seq, slot, frame.shape))
+        return True
+
+    def _collect(self):
+        """Join per-model results by sequence number (collector thread)."""
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            seq, name, fields, elapsed = item
+            with self.lock:
+                self.busy.discard(name)
+                entry = self.pending.get(seq)
+                if entry is None:
+                    continue
+                slot, captured_at, expected, joined, timings = entry
+                joined[name] = fields
+                timings[name] = elapsed
+                if set(joined) != expected:
+                    continue
+                del self.pending[seq]
+                self.free_slots.append(slot)
+            self.on_result(seq, captured_at, joined, timings)
+
+    def close(self):
+        """Stop workers and the collector and release the frame ring."""
+        if self.frames is None:
+            return
+        for jobs in self.jobs.values():
+            jobs.put(None)
+        for handle in self.handles:
+            handle.join(timeout=2)
+        self.results.put(None)
+        self.collector.join(timeout=2)
+        self.frames.close()
+        self.frames = None
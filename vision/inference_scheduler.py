@@ -0,0 +1,130 @@
+"""
+Adaptive inference scheduling for ConnectionTracker.
+
+Decides, per captured frame, which MediaPipe models to run:
+- Each model (face mesh, hands) runs at its own target rate.
+- Hand inference is skipped while fewer than two faces are in view.
+- Frames are downsized when there is little motion between inferences.
+- Optional CPU budget mode scales both model rates (keeping their ratio)
+  so the measured inference time holds a chosen fraction of one core.
+
+Defaults come from VISION_FACE_FPS, VISION_HAND_FPS and VISION_CPU_BUDGET
+(e.g. 0.5 for half a core; unset disables budget mode).
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+class InferenceScheduler:
+    """Per-model rate control, motion-based downscaling and CPU budgeting."""
+
+    MODELS = ("face", "hands")
+    RATE_WINDOW = 2.0  # Seconds of history used for effective rates
+
+    def __init__(self, face_rate=None, hand_rate=None, cpu_budget=None,
+                 motion_threshold=2.0, low_motion_scale=0.5,
+                 min_rate=1.0, max_rate=30.0):
+        env = os.environ.get
+        self.target_rates = {
+            "face": float(face_rate or env("VISION_FACE_FPS", "15")),
+            "hands": float(hand_rate or env("VISION_HAND_FPS", "10")),
+        }
+        budget = cpu_budget if cpu_budget is not None else env("VISION_CPU_BUDGET")
+        self.cpu_budget = float(budget) if budget else None
+
+        self.motion_threshold = motion_threshold  # Mean abs pixel diff (0-255)
+        self.low_motion_scale = low_motion_scale
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+
+        self.lock = threading.Lock()
+        self.rates = dict(self.target_rates)
+        self.next_due = {m: 0.0 for m in self.MODELS}
+        self.runs = {m: deque(maxlen=int(max_rate * self.RATE_WINDOW) + 1) for m in self.MODELS}
+        self.avg_cost = {m: 0.0 for m in self.MODELS}
+        self.skipped = {m: 0 for m in self.MODELS}
+
+        self.prev_small = None
+        self.motion = None
+        self.scale = 1.0
+
+    def due(self, model, now):
+        """True if `model` should run on a frame captured at `now` (monotonic)."""
+        return now >= self.next_due[model]
+
+    def skip(self, model, now):
+        """Record that a due model was skipped (e.g. hands with < 2 faces)."""
+        with self.lock:
+            self.skipped[model] += 1
+            self.next_due[model] = now + 1.0 / self.rates[model]
+
+    def record(self, model, started, elapsed):
+        """Record one inference run: monotonic start time and duration in seconds."""
+        with self.lock:
+            period = 1.0 / self.rates[model]
+            # Stay on the rate grid when on time; don't burst to catch up
+            next_due = self.next_due[model] + period
+            self.next_due[model] = next_due if next_due > started else started + period
+
+            self.runs[model].append(started)
+            cost = self.avg_cost[model]
+            self.avg_cost[model] = elapsed if cost == 0.0 else 0.8 * cost + 0.2 * elapsed
+
+            if self.cpu_budget:
+                self._rebalance()
+
+    def _rebalance(self):
+        """Scale every model's rate so target demand matches the CPU budget."""
+        demand = sum(self.target_rates[m] * self.avg_cost[m] for m in self.MODELS)
+        if demand <= 0:
+            return
+        factor = self.cpu_budget / demand
+        for m in self.MODELS:
+            rate = self.target_rates[m] * factor
+            self.rates[m] = min(self.max_rate, max(self.min_rate, rate))
+
+    def frame_scale(self, frame):
+        """
+        Scale factor to apply to `frame` before inference: full size while
+        the scene is moving, low_motion_scale when it is nearly still.
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (80, 60), interpolation=cv2.INTER_AREA)
+        if self.prev_small is not None:
+            self.motion = float(cv2.absdiff(small, self.prev_small).mean())
+        self.prev_small = small
+
+        if self.motion is not None and self.motion < self.motion_threshold:
+            self.scale = self.low_motion_scale
+        else:
+            self.scale = 1.0
+        return self.scale
+
+    def get_stats(self):
+        """Effective per-model rates, average cost and CPU utilisation."""
+        now = time.monotonic()
+        with self.lock:
+            models = {}
+            utilisation = 0.0
+            for m in self.MODELS:
+                recent = sum(1 for t in self.runs[m] if t >= now - self.RATE_WINDOW)
+                fps = recent / self.RATE_WINDOW
+                utilisation += fps * self.avg_cost[m]
+                models[m] = {
+                    "fps": round(fps, 2),
+                    "target_fps": round(self.rates[m], 2),
+                    "avg_ms": round(self.avg_cost[m] * 1000, 2),
+                    "skipped": self.skipped[m],
+                }
+            return {
+                **models,
+                "cpu_utilisation": round(utilisation, 3),
+                "cpu_budget": self.cpu_budget,
+                "frame_scale": self.scale,
+                "motion": round(self.motion, 2) if self.motion is not None else None,
+            }
@@ -0,0 +1,180 @@
+"""
+Array-backed landmark analysis for ConnectionTracker.
+
+Each MediaPipe result is copied once per frame into a preallocated
+float32 array holding only the landmarks the geometric features read:
+(faces, len(FACE_LANDMARKS), 3) for face mesh and (hands, 3) palm
+centres for hand tracking. Smile ratio, facing direction, face distance
+and pairwise palm distances are then computed with vectorized NumPy on
+those arrays (and preallocated work buffers), with no per-landmark
+Python objects.
+
+Analyzers own their buffers, so each model worker (thread or process)
+gets its own instance.
+"""
+
+import numpy as np
+
+# Face mesh landmark ids used by the features, in array row order. The
+# right/left pairs are laid out so one slice subtraction gives both the
+# mouth and the face span.
+FACE_LANDMARKS = {
+    "mouth_right": 291,
+    "face_right": 454,   # Right face edge / ear
+    "mouth_left": 61,
+    "face_left": 234,    # Left face edge / ear
+    "nose": 1,           # Nose tip (face centre)
+}
+FACE_LANDMARK_IDS = tuple(FACE_LANDMARKS.values())
+MOUTH_RIGHT, FACE_RIGHT, MOUTH_LEFT, FACE_LEFT, NOSE = range(len(FACE_LANDMARKS))
+
+HAND_PALM = 9  # Middle of palm
+
+
+def empty_face_state():
+    return {
+        "eye_contact": False,
+        "both_smiling": False,
+        "smile_scores": [0.0, 0.0],
+        "face_count": 0,
+        "face_distance": 999.0,
+    }
+
+
+def empty_hand_state():
+    return {
+        "hand_distance": 999.0,  # Normalized 0-1 (0 = touching)
+        "hands_touching": False,
+    }
+
+
+def load_landmarks(buffer, landmark_lists, ids):
+    """
+    Copy the given landmark ids of each result into rows of `buffer`
+    (shape (N, len(ids), 3)); returns the filled view.
+    """
+    count = min(len(landmark_lists), len(buffer))
+    for i in range(count):
+        landmarks = landmark_lists[i].landmark
+        row = buffer[i]
+        for j, idx in enumerate(ids):
+            point = landmarks[idx]
+            row[j, 0] = point.x
+            row[j, 1] = point.y
+            row[j, 2] = point.z
+    return buffer[:count]
+
+
+def smile_scores(faces, pixel_scale, span, scores):
+    """
+    Smile score per face (0.0 = no smile, 1.0 = big smile) from the ratio
+    of mouth width to face width, measured in pixels. pixel_scale is
+    [w, h]; span (N, 2, 2) and scores (N,) are work buffers, and the
+    filled scores view is returned.
+    """
+    n = len(faces)
+    span = span[:n]
+    scores = scores[:n]
+    # Rows 0-1 minus rows 2-3: (mouth, face) right-to-left vectors
+    np.subtract(faces[:, MOUTH_RIGHT:FACE_RIGHT + 1, :2],
+                faces[:, MOUTH_LEFT:FACE_LEFT + 1, :2], out=span)
+    span *= pixel_scale
+    widths = np.hypot(span[..., 0], span[..., 1])
+    mouth_width, face_width = widths[:, 0], widths[:, 1]
+
+    # Typical range: 0.25 (neutral) to 0.45 (big smile); a zero-width
+    # face keeps ratio 0, which clips to a score of 0
+    scores.fill(0.0)
+    np.divide(mouth_width, face_width, out=scores, where=face_width > 0)
+    scores -= 0.28
+    scores /= 0.15
+    np.maximum(scores, 0.0, out=scores)
+    return np.minimum(scores, 1.0, out=scores)
+
+
+def eye_contact(faces):
+    """
+    True if the first two faces are turned toward each other (nose offset
+    from the ear midpoint points at the other face) and at eye level.
+    """
+    nose_x = faces[:2, NOSE, 0]
+    nose1_x, nose2_x = nose_x.tolist()
+    dir1, dir2 = (nose_x - (faces[:2, FACE_LEFT, 0] + faces[:2, FACE_RIGHT, 0]) / 2).tolist()
+
+    # The face on the left should look right (+x) and vice versa
+    if nose1_x < nose2_x:
+        facing_each_other = dir1 > -0.01 and dir2 < 0.01
+    else:
+        facing_each_other = dir1 < 0.01 and dir2 > -0.01
+
+    at_eye_level = abs(faces[0, NOSE, 1] - faces[1, NOSE, 1]) < 0.15
+    return bool(facing_each_other and at_eye_level)
+
+
+def face_distance(faces):
+    """Normalized distance between the first two face centres (0 = overlapping, 1 = far)."""
+    dx, dy = faces[1, NOSE, :2] - faces[0, NOSE, :2]
+    return min(1.0, float(np.hypot(dx, dy)))
+
+
+def closest_hand_distance(palms, pair_mask):
+    """
+    Minimum distance between any two palm centres, normalized (0 =
+    touching, 1 = far). pair_mask is 0 above the diagonal and inf
+    elsewhere, so each pair is counted once.
+    """
+    n = len(palms)
+    diff = palms[:, None, :2] - palms[None, :, :2]
+    dist_sq = np.einsum("ijk,ijk->ij", diff, diff)
+    dist_sq += pair_mask[:n, :n]
+    return min(1.0, float(np.sqrt(dist_sq.min())))
+
+
+class FaceAnalyzer:
+    """Face mesh result -> face state fields, via a preallocated landmark array."""
+
+    def __init__(self, max_faces=2):
+        self.faces = np.zeros((max_faces, len(FACE_LANDMARK_IDS), 3), dtype=np.float32)
+        self.span = np.zeros((max_faces, 2, 2), dtype=np.float32)
+        self.pixel_scale = np.zeros(2, dtype=np.float32)
+        self.scores = np.zeros(max_faces, dtype=np.float32)
+
+    def __call__(self, face_results, w, h):
+        face_state = empty_face_state()
+        if not face_results.multi_face_landmarks:
+            return face_state
+
+        face_state["face_count"] = len(face_results.multi_face_landmarks)
+        faces = load_landmarks(self.faces, face_results.multi_face_landmarks, FACE_LANDMARK_IDS)
+
+        self.pixel_scale[0] = w
+        self.pixel_scale[1] = h
+        scores = smile_scores(faces, self.pixel_scale, self.span, self.scores).tolist()
+        face_state["smile_scores"][:len(scores)] = scores
+
+        if len(faces) >= 2:
+            face_state["both_smiling"] = scores[0] > 0.5 and scores[1] > 0.5
+            face_state["eye_contact"] = eye_contact(faces)
+            face_state["face_distance"] = face_distance(faces)
+
+        return face_state
+
+
+class HandAnalyzer:
+    """Hands result -> hand state fields, via a preallocated palm-centre array."""
+
+    def __init__(self, max_hands=4):
+        self.palms = np.zeros((max_hands, 1, 3), dtype=np.float32)
+        self.pair_mask = np.where(
+            np.triu(np.ones((max_hands, max_hands), dtype=bool), k=1), 0.0, np.inf
+        ).astype(np.float32)
+
+    def __call__(self, hand_results, w, h):
+        hand_state = empty_hand_state()
+        hands_list = hand_results.multi_hand_landmarks
+        if hands_list and len(hands_list) >= 2:
+            palms = load_landmarks(self.palms, hands_list, (HAND_PALM,))[:, 0]
+            min_dist = closest_hand_distance(palms, self.pair_mask)
+            hand_state["hand_distance"] = min_dist
+            hand_state["hands_touching"] = min_dist < 0.05
+        return hand_state
@@ -1,239 +1,369 @@
 import cv2
 import mediapipe as mp
-import numpy as np
+import os
 import threading
 import time
 
+from vision.inference_pipeline import InferencePipeline
+from vision.inference_scheduler import InferenceScheduler
+from vision.landmarks import FaceAnalyzer, HandAnalyzer, empty_face_state, empty_hand_state
+
+
+def create_face_mesh():
+    """Face mesh for expression + gaze."""
+    return mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=2,
+        refine_landmarks=True,  # Enables iris landmarks for gaze
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+def create_hands():
+    """Hand tracking."""
+    return mp.solutions.hands.Hands(
+        max_num_hands=4,  # Up to 4 hands (2 people x 2 hands)
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+class LatestFrameCapture:
+    """
+    Capture stage: reads the camera on its own thread and keeps only the
+    newest frame in a single slot, stamped with its monotonic capture time.
+    Frames replaced before anyone read them are counted as dropped, so a
+    slow consumer always analyses what is happening now.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.cond = threading.Condition()
+        self.frame = None
+        self.captured_at = 0.0
+        self.seq = 0            # Sequence number of the frame in the slot
+        self.read_seq = 0       # Last sequence number handed out
+        self.dropped = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
+
+    def _capture_loop(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            captured_at = time.monotonic()
+            with self.cond:
+                if self.seq > self.read_seq:
+                    self.dropped += 1  # Previous frame was never read
+                self.frame = frame
+                self.captured_at = captured_at
+                self.seq += 1
+                self.cond.notify()
+
+    def read(self, timeout=0.5):
+        """
+        Wait for a frame newer than the last one read.
+        Returns (seq, frame, captured_at), or None on timeout/stop.
+        """
+        with self.cond:
+            if not self.cond.wait_for(
+                lambda: self.seq > self.read_seq or not self.running, timeout
+            ):
+                return None
+            if self.seq <= self.read_seq:
+                return None
+            self.read_seq = self.seq
+            return self.seq, self.frame, self.captured_at
+
+
 class ConnectionTracker:
     """
     Uses MediaPipe to track visual indicators of connection between two people.
     Outputs: eye_contact (bool), both_smiling (bool), hand_distance (float),
-             face_distance (float), individual smile scores.
+             face_distance (float), individual smile scores, and frame_age
+             (seconds since the newest frame behind the state was captured).
+
+    pipeline selects how the two models run (default from VISION_PIPELINE):
+    - "off":     face mesh then hands, one after the other on one thread
+    - "thread":  each model on its own worker thread, overlapping capture
+    - "process": each model in its own worker process
     """
 
-    def __init__(self):
-        # Face mesh for expression + gaze
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=2,
-            refine_landmarks=True,  # Enables iris landmarks for gaze
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, scheduler=None, pipeline=None, on_update=None, on_inference=None):
+        # Decides which models run on each frame, and at what size
+        self.scheduler = scheduler or InferenceScheduler()
+        self.pipeline_mode = pipeline or os.environ.get("VISION_PIPELINE", "off")
+        self.pipeline = None
+        self.on_update = on_update  # Called (no args) after each state update
+        self.on_inference = on_inference  # Called (model, seconds) after each model run
 
-        # Hand tracking
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=4,  # Up to 4 hands (2 people x 2 hands)
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        # Turn model output into state fields (each owns its landmark arrays)
+        self.face_analyzer = FaceAnalyzer()
+        self.hand_analyzer = HandAnalyzer()
+
+        # MediaPipe graphs, built on first start()/replay() (see _load_models)
+        self.face_mesh = None
+        self.hands = None
+        self.models = None
 
         # Shared state (thread-safe)
         self.lock = threading.Lock()
-        self.state = {
-            "eye_contact": False,
-            "both_smiling": False,
-            "smile_scores": [0.0, 0.0],
-            "hand_distance": 999.0,  # Normalized 0-1 (0 = touching)
-            "hands_touching": False,
-            "face_count": 0,
-            "face_distance": 999.0,
-        }
+        self.face_state = empty_face_state()
+        self.hand_state = empty_hand_state()
+        self.state = {**self.face_state, **self.hand_state}
+        self.model_seq = {"face": -1, "hands": -1}  # Last frame applied per model
+        self.latency = {"last_ms": 0.0, "avg_ms": 0.0, "frames": 0}
+        self.state_captured_at = None  # Capture time of the newest applied frame
 
         self.running = False
         self.cap = None
+        self.capture = None
         self.thread = None
 
+    def _load_models(self):
+        """Build the MediaPipe graphs (process workers build their own)."""
+        if self.models is not None or self.pipeline_mode == "process":
+            return
+        self.face_mesh = create_face_mesh()
+        self.hands = create_hands()
+        self.models = {
+            "face": (self.face_mesh, self.face_analyzer),
+            "hands": (self.hands, self.hand_analyzer),
+        }
+
     def start(self, camera_index=0):
         """Start the vision tracking in a background thread."""
+        self._load_models()
         self.running = True
         self.cap = cv2.VideoCapture(camera_index)
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Not every backend honours this
+        self.capture = LatestFrameCapture(self.cap)
+        self.capture.start()
+        if self.pipeline_mode in ("thread", "process"):
+            self.pipeline = self._create_pipeline()
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
         self.thread.start()
 
     def stop(self):
         """Stop tracking and release camera."""
         self.running = False
+        if self.capture:
+            self.capture.stop()
         if self.thread:
             self.thread.join(timeout=2)
+        if self.pipeline:
+            self.pipeline.close()
+            self.pipeline = None
         if self.cap:
             self.cap.release()
 
     def get_state(self):
         """Get current tracking state (thread-safe)."""
         with self.lock:
-            return dict(self.state)
-
-    def _run_loop(self):
-        """Main processing loop (runs in background thread)."""
-        while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                time.sleep(0.01)
-                continue
+            state = dict(self.state)
+            captured_at = self.state_captured_at
+        state["frame_age"] = (
+            round(time.monotonic() - captured_at, 3) if captured_at is not None else None
+        )
+        return state
 
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            h, w = frame.shape[:2]
-
-            # Process face mesh
-            face_results = self.face_mesh.process(frame_rgb)
-            # Process hands
-            hand_results = self.hands.process(frame_rgb)
-
-            new_state = {
-                "eye_contact": False,
-                "both_smiling": False,
-                "smile_scores": [0.0, 0.0],
-                "hand_distance": 999.0,
-                "hands_touching": False,
-                "face_count": 0,
-                "face_distance": 999.0,
+    def get_stats(self):
+        """
+        Effective per-model inference rates and CPU use (see
+        InferenceScheduler), plus frame-to-state latency, capture and
+        pipeline drops.
+        """
+        stats = self.scheduler.get_stats()
+        with self.lock:
+            stats["latency"] = {k: round(v, 2) for k, v in self.latency.items()}
+        if self.capture:
+            stats["capture"] = {"frames": self.capture.seq, "dropped": self.capture.dropped}
+        stats["pipeline"] = self.pipeline_mode
+        if self.pipeline:
+            stats["pipeline_dropped"] = self.pipeline.dropped
+        return stats
+
+    def _publish(self, seq, captured_at, fields, inferred=True):
+        """
+        Merge per-model fields from frame `seq` into the shared state, and
+        call on_update if it changed. A model's fields are ignored if a
+        newer frame's already landed.
+        inferred=False marks updates that don't count towards
+        frame-to-state latency: no model ran, or (in replay) captured_at
+        is video time rather than the monotonic clock.
+        """
+        with self.lock:
+            for model, model_fields in fields.items():
+                if model_fields is None or seq <= self.model_seq[model]:
+                    continue
+                self.model_seq[model] = seq
+                if model == "face":
+                    self.face_state = model_fields
+                else:
+                    self.hand_state = model_fields
+            state = {**self.face_state, **self.hand_state}
+            changed = state != self.state
+            self.state = state
+            if self.state_captured_at is None or captured_at > self.state_captured_at:
+                self.state_captured_at = captured_at
+
+            if inferred:
+                latency_ms = (time.monotonic() - captured_at) * 1000
+                avg = self.latency["avg_ms"]
+                self.latency["last_ms"] = latency_ms
+                self.latency["avg_ms"] = latency_ms if avg == 0.0 else 0.9 * avg + 0.1 * latency_ms
+                self.latency["frames"] += 1
+
+        if changed and self.on_update:
+            self.on_update()
+
+    def _create_pipeline(self):
+        """Workers for pipelined mode: one per model."""
+        if self.pipeline_mode == "process":
+            workers = {
+                "face": (create_face_mesh, FaceAnalyzer()),
+                "hands": (create_hands, HandAnalyzer()),
             }
-
-            # --- FACE ANALYSIS ---
-            if face_results.multi_face_landmarks:
-                faces = face_results.multi_face_landmarks
-                new_state["face_count"] = len(faces)
-
-                if len(faces) >= 2:
-                    # Smile detection for each face
-                    for i, face in enumerate(faces[:2]):
-                        smile_score = self._detect_smile(face, w, h)
-                        new_state["smile_scores"][i] = smile_score
-
-                    new_state["both_smiling"] = (
-                        new_state["smile_scores"][0] > 0.5 and
-                        new_state["smile_scores"][1] > 0.5
-                    )
-
-                    # Eye contact detection
-                    new_state["eye_contact"] = self._detect_eye_contact(
-                        faces[0], faces[1], w, h
-                    )
-
-                    # Face distance
-                    new_state["face_distance"] = self._face_distance(
-                        faces[0], faces[1], w, h
-                    )
-
-                elif len(faces) == 1:
-                    new_state["smile_scores"][0] = self._detect_smile(
-                        faces[0], w, h
-                    )
-
-            # --- HAND ANALYSIS ---
-            if hand_results.multi_hand_landmarks:
-                hands_list = hand_results.multi_hand_landmarks
-                if len(hands_list) >= 2:
-                    min_dist = self._closest_hand_distance(hands_list, w, h)
-                    new_state["hand_distance"] = min_dist
-                    new_state["hands_touching"] = min_dist < 0.05
-
-            with self.lock:
-                self.state = new_state
-
-    def _detect_smile(self, face_landmarks, w, h):
+        else:
+            workers = {
+                "face": (lambda: self.face_mesh, self.face_analyzer),
+                "hands": (lambda: self.hands, self.hand_analyzer),
+            }
+        return InferencePipeline(workers, self._on_pipeline_result,
+                                 mode=self.pipeline_mode)
+
+    def _on_pipeline_result(self, seq, captured_at, fields, timings):
+        """Collector-thread callback: one frame's models have all finished."""
+        for model, elapsed in timings.items():
+            self._record(model, captured_at, elapsed)
+        self._publish(seq, captured_at, fields)
+
+    def _record(self, model, captured_at, elapsed):
+        """Report one model run to the scheduler (and on_inference)."""
+        self.scheduler.record(model, captured_at, elapsed)
+        if self.on_inference:
+            self.on_inference(model, elapsed)
+
+    def _prepare(self, seq, frame, captured_at):
         """
-        Detect smile by measuring mouth width vs face width ratio.
-        Returns a score from 0.0 (no smile) to 1.0 (big smile).
-
-        Key landmarks:
-        - Mouth corners: 61 (left), 291 (right)
-        - Upper lip top: 13
-        - Lower lip bottom: 14
-        - Face edges: 234 (left), 454 (right)
+        Pick the models due on this frame and preprocess it for them.
+        Returns (models, frame_rgb); models is empty when none are due.
+
+        Hand inference is skipped (and hand fields reset) while fewer than
+        two faces are in view. In pipeline mode, models still busy with an
+        earlier frame are left out (the scheduler only moves their next due
+        time once that result is recorded), so the frame is not
+        preprocessed for them.
         """
-        landmarks = face_landmarks.landmark
-
-        # Mouth width
-        mouth_left = np.array([landmarks[61].x * w, landmarks[61].y * h])
-        mouth_right = np.array([landmarks[291].x * w, landmarks[291].y * h])
-        mouth_width = np.linalg.norm(mouth_right - mouth_left)
-
-        # Mouth height (openness)
-        upper_lip = np.array([landmarks[13].x * w, landmarks[13].y * h])
-        lower_lip = np.array([landmarks[14].x * w, landmarks[14].y * h])
-        mouth_height = np.linalg.norm(lower_lip - upper_lip)
-
-        # Face width for normalization
-        face_left = np.array([landmarks[234].x * w, landmarks[234].y * h])
-        face_right = np.array([landmarks[454].x * w, landmarks[454].y * h])
-        face_width = np.linalg.norm(face_right - face_left)
-
-        if face_width == 0:
-            return 0.0
-
-        # Smile ratio: wide mouth + slightly open = smiling
-        width_ratio = mouth_width / face_width
-        # Typical range: 0.25 (neutral) to 0.45 (big smile)
-        smile_score = np.clip((width_ratio - 0.28) / 0.15, 0.0, 1.0)
-
-        return float(smile_score)
-
-    def _detect_eye_contact(self, face1, face2, w, h):
+        scheduler = self.scheduler
+        busy = self.pipeline.in_flight() if self.pipeline else ()
+        models = []
+        if "face" not in busy and scheduler.due("face", captured_at):
+            models.append("face")
+        if "hands" not in busy and scheduler.due("hands", captured_at):
+            if self.face_state["face_count"] < 2:
+                scheduler.skip("hands", captured_at)
+                self._publish(seq, captured_at, {"hands": empty_hand_state()}, inferred=False)
+            else:
+                models.append("hands")
+        if not models:
+            return models, None
+
+        scale = scheduler.frame_scale(frame)
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale,
+                               interpolation=cv2.INTER_AREA)
+        return models, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def _infer(self, models, frame_rgb, captured_at, timings=None):
         """
-        Simplified eye contact detection.
-        Checks if both faces are oriented toward each other
-        by comparing nose tip positions and face orientations.
-
-        Key landmarks:
-        - Nose tip: 1
-        - Left eye inner: 133
-        - Right eye inner: 362
-        - Forehead: 10
-        - Chin: 152
+        Run models one after the other on this thread; returns their state
+        fields. Inference and feature seconds are added to `timings`.
         """
-        lm1 = face1.landmark
-        lm2 = face2.landmark
+        h, w = frame_rgb.shape[:2]
+        fields = {}
+        for model in models:
+            net, analyze = self.models[model]
+            started = time.perf_counter()
+            results = net.process(frame_rgb)
+            elapsed = time.perf_counter() - started
+            self._record(model, captured_at, elapsed)
+            fields[model] = analyze(results, w, h)
+            if timings is not None:
+                timings[model] = timings.get(model, 0.0) + elapsed
+                timings["features"] = (timings.get("features", 0.0)
+                                       + time.perf_counter() - started - elapsed)
+        return fields
 
-        # Get nose positions (center of face)
-        nose1_x = lm1[1].x
-        nose2_x = lm2[1].x
-
-        # Get face orientations using the nose-to-ear vector
-        # Left ear: 234, Right ear: 454, Nose: 1
-        face1_direction = lm1[1].x - (lm1[234].x + lm1[454].x) / 2
-        face2_direction = lm2[1].x - (lm2[234].x + lm2[454].x) / 2
+    def _run_loop(self):
+        """
+        Main processing loop (runs in background thread).
 
-        # If face1 is left of face2
-        if nose1_x < nose2_x:
-            facing_each_other = face1_direction > -0.01 and face2_direction < 0.01
-        else:
-            facing_each_other = face1_direction < 0.01 and face2_direction > -0.01
+        Each model runs only when the scheduler says it is due; fields from
+        a model that did not run on a frame keep their last values.
+        """
+        while self.running:
+            latest = self.capture.read()
+            if latest is None:
+                continue
+            seq, frame, captured_at = latest
 
-        # Also check vertical alignment (both at similar height = eye level)
-        vertical_diff = abs(lm1[1].y - lm2[1].y)
-        at_eye_level = vertical_diff < 0.15
+            models, frame_rgb = self._prepare(seq, frame, captured_at)
+            if not models:
+                continue
 
-        return facing_each_other and at_eye_level
+            if self.pipeline:
+                # Workers pick it up; go straight back to capturing
+                self.pipeline.submit(seq, frame_rgb, models, captured_at)
+                continue
 
-    def _face_distance(self, face1, face2, w, h):
-        """Normalized distance between two face centers (0 = overlapping, 1 = far)."""
-        lm1 = face1.landmark
-        lm2 = face2.landmark
-        center1 = np.array([lm1[1].x, lm1[1].y])
-        center2 = np.array([lm2[1].x, lm2[1].y])
-        dist = np.linalg.norm(center2 - center1)
-        return float(np.clip(dist, 0, 1))
+            self._publish(seq, captured_at, self._infer(models, frame_rgb, captured_at))
 
-    def _closest_hand_distance(self, hands_list, w, h):
+    def replay(self, frames, timings=None):
         """
-        Find minimum distance between any two hands.
-        Uses landmark 9 (middle of palm) as the reference point.
-        Returns normalized distance (0 = touching, 1 = far).
+        Analyse recorded frames as fast as they can be decoded: no camera,
+        capture thread, pipeline or sleeps (see vision/replay.py).
+
+        frames yields (seq, frame, t) with t in seconds of video time,
+        which stands in for capture time as the scheduler's clock. Yields
+        the tracking state after each frame (without frame_age). Seconds
+        spent per stage (decode, preprocess, face, hands, features) are
+        added to `timings`.
         """
-        palm_centers = []
-        for hand in hands_list:
-            palm = hand.landmark[9]  # Middle of palm
-            palm_centers.append(np.array([palm.x, palm.y]))
-
-        min_dist = 999.0
-        for i in range(len(palm_centers)):
-            for j in range(i + 1, len(palm_centers)):
-                dist = np.linalg.norm(palm_centers[i] - palm_centers[j])
-                min_dist = min(min_dist, dist)
-
-        return float(np.clip(min_dist, 0, 1))
+        self._load_models()
+        if timings is None:
+            timings = {}
+        frames = iter(frames)
+        while True:
+            started = time.perf_counter()
+            item = next(frames, None)
+            timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - started
+            if item is None:
+                return
+            seq, frame, t = item
+
+            started = time.perf_counter()
+            models, frame_rgb = self._prepare(seq, frame, t)
+            timings["preprocess"] = timings.get("preprocess", 0.0) + time.perf_counter() - started
+            if models:
+                self._publish(seq, t, self._infer(models, frame_rgb, t, timings), inferred=False)
+
+            with self.lock:
+                state = dict(self.state)
+            yield state
@@ -0,0 +1,140 @@
+"""
+Offline replay of recorded video through ConnectionTracker.
+
+Feeds a video file, or every video in a directory (in name order),
+through the same analysis as live tracking, as fast as the CPU allows,
+with no camera attached. Per-frame states are written as JSON lines and
+a throughput report (frames per second, per-stage timings) is printed
+at the end.
+
+By default every model runs on every frame. With --live-rates the
+configured scheduler rates (VISION_FACE_FPS, VISION_HAND_FPS) apply in
+video time instead, reproducing what the live tracker would compute.
+
+Run from the project root:
+    python -m vision.replay recordings/ --out states.jsonl
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+
+from vision.inference_scheduler import InferenceScheduler
+from vision.mediapipe_tracker import ConnectionTracker
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+STAGES = ("decode", "preprocess", "face", "hands", "features")
+
+
+class VideoSource:
+    """
+    Frames from a video file or a directory of videos, as (seq, frame, t).
+    seq and t (seconds of video time) keep increasing across files.
+    """
+
+    def __init__(self, path):
+        if os.path.isdir(path):
+            self.paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        else:
+            self.paths = [path]
+        if not self.paths:
+            raise ValueError(f"No videos found in {path}")
+        self.current = None  # (path, frame index, t) of the last frame yielded
+
+    def __iter__(self):
+        seq = 0
+        offset = 0.0
+        for path in self.paths:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f"Replay: could not open {path}", file=sys.stderr)
+                continue
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            index = 0
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    seq += 1
+                    t = offset + index / fps
+                    self.current = (path, index, t)
+                    yield seq, frame, t
+                    index += 1
+            finally:
+                cap.release()
+            offset += index / fps
+
+
+def every_frame_scheduler():
+    """Scheduler whose rates are far above any video's frame rate."""
+    return InferenceScheduler(face_rate=1000.0, hand_rate=1000.0, cpu_budget=0,
+                              max_rate=1000.0)
+
+
+def run(source, out, live_rates=False):
+    """
+    Replay `source` (file or directory path) and write one JSON line per
+    frame to `out`. Returns the throughput report dict.
+    """
+    scheduler = InferenceScheduler() if live_rates else every_frame_scheduler()
+    tracker = ConnectionTracker(scheduler=scheduler, pipeline="off")
+    video = VideoSource(source)
+    timings = {stage: 0.0 for stage in STAGES}
+
+    frames = 0
+    started = time.perf_counter()
+    for state in tracker.replay(video, timings):
+        path, index, t = video.current
+        frames += 1
+        out.write(json.dumps({
+            "source": os.path.basename(path),
+            "frame": index,
+            "t": round(t, 3),
+            **state,
+        }) + "\n")
+    elapsed = time.perf_counter() - started
+
+    per_frame = frames or 1
+    return {
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages_ms_per_frame": {
+            stage: round(timings[stage] * 1000 / per_frame, 3) for stage in STAGES
+        },
+        "models": {
+            m: {k: v for k, v in scheduler.get_stats()[m].items() if k in ("avg_ms", "skipped")}
+            for m in scheduler.MODELS
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded video through ConnectionTracker")
+    parser.add_argument("source", help="Video file or directory of videos")
+    parser.add_argument("--out", help="Write per-frame states here (JSON lines; default stdout)")
+    parser.add_argument("--live-rates", action="store_true",
+                        help="Apply the configured per-model rates in video time")
+    args = parser.parse_args()
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        report = run(args.source, out, live_rates=args.live_rates)
+    finally:
+        if args.out:
+            out.close()
+
+    # Report on stderr so it never mixes into a state stream on stdout
+    print(json.dumps(report, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()